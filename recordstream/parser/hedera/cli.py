@@ -1,36 +1,170 @@
 import datetime as dt
+import json
+import os
+from typing import List
 
 import typer
 
 from hedera.config import settings
+from hedera.records import benchmark
 from hedera.records.downloader import RecordFileDownloader
 from hedera.records.orchestrator import RecordFileOrchestrator
+from hedera.util.backfill import format_backfill_summary
+from hedera.util.progress_index import ProgressIndex, create_progress
 
 dt_fmt: str = "%Y-%m-%dT%H:%M:%S.%f"
 
 app = typer.Typer()
+bench_app = typer.Typer(help="Benchmarks")
+app.add_typer(bench_app, name="bench")
+progress_app = typer.Typer(help="Progress index of the parsed record files")
+app.add_typer(progress_app, name="progress")
 default_now = dt.datetime.strftime(dt.datetime.utcnow(), dt_fmt)
 
 
+def echo_backfill_summary(results: list) -> None:
+    """
+    Print the files and transactions of each backfill partition, exit with an error if a partition failed
+    """
+    typer.echo(format_backfill_summary(results))
+    if any(result["error"] for result in results):
+        raise typer.Exit(code=1)
+
+
 @app.command()
 def record_file_downloader(
-    network: str = "mainnet", directory: str = ".", log_level: str = settings.LOG_LEVEL, backfill_marker: str = None
+    network: str = "mainnet",
+    directory: str = ".",
+    log_level: str = settings.LOG_LEVEL,
+    backfill_marker: str = None,
+    backfill_from: str = typer.Option(None, help="First day or hour to backfill, e.g. 2022-10-14 or 2022-10-14T01"),
+    backfill_to: str = typer.Option(None, help="Last day or hour to backfill, included (defaults to backfill-from)"),
+    backfill_partition: str = typer.Option(settings.BACKFILL_PARTITION, help="Backfill partitions: day/hour"),
+    backfill_parallelism: int = typer.Option(settings.BACKFILL_PARALLELISM, help="Partitions backfilled at once"),
+    metrics_port: int = typer.Option(settings.DOWNLOADER_METRICS_PORT, help="Serve Prometheus metrics on this port"),
 ):
-    cli_options = {"network": network, "log_dir": directory, "log_level": log_level, "backfill_marker": backfill_marker}
+    cli_options = {
+        "network": network,
+        "log_dir": directory,
+        "log_level": log_level,
+        "backfill_marker": backfill_marker,
+        "backfill_from": backfill_from,
+        "backfill_to": backfill_to,
+        "backfill_partition": backfill_partition,
+        "backfill_parallelism": backfill_parallelism,
+        "metrics_port": metrics_port,
+    }
 
     rfd = RecordFileDownloader(cli_options)
-    rfd.run()
+    if backfill_from:
+        echo_backfill_summary(rfd.run_backfill())
+    else:
+        rfd.run()
 
 
 @app.command()
 def record_file_orchestrator(
-    network: str = "mainnet", directory: str = ".", log_level: str = settings.LOG_LEVEL, backfill_marker: str = None
+    network: str = "mainnet",
+    directory: str = ".",
+    log_level: str = settings.LOG_LEVEL,
+    backfill_marker: str = None,
+    executor: str = typer.Option(settings.PARSER_EXECUTOR, help="Where transactions are parsed: ray/processes/inline"),
+    watch: bool = typer.Option(settings.ORCHESTRATOR_WATCH, help="Wait for new record files with inotify"),
+    backfill_from: str = typer.Option(None, help="First day or hour to backfill, e.g. 2022-10-14 or 2022-10-14T01"),
+    backfill_to: str = typer.Option(None, help="Last day or hour to backfill, included (defaults to backfill-from)"),
+    backfill_partition: str = typer.Option(settings.BACKFILL_PARTITION, help="Backfill partitions: day/hour"),
+    backfill_parallelism: int = typer.Option(settings.BACKFILL_PARALLELISM, help="Partitions backfilled at once"),
+    metrics_port: int = typer.Option(settings.ORCHESTRATOR_METRICS_PORT, help="Serve Prometheus metrics on this port"),
+    output_sink: str = typer.Option(
+        settings.OUTPUT_SINK, help="Where parsed transactions go: file/segments/elasticsearch/parquet"
+    ),
 ):
 
-    cli_options = {"network": network, "log_dir": directory, "log_level": log_level, "backfill_marker": backfill_marker}
+    cli_options = {
+        "network": network,
+        "log_dir": directory,
+        "log_level": log_level,
+        "backfill_marker": backfill_marker,
+        "executor": executor,
+        "watch": watch,
+        "backfill_from": backfill_from,
+        "backfill_to": backfill_to,
+        "backfill_partition": backfill_partition,
+        "backfill_parallelism": backfill_parallelism,
+        "metrics_port": metrics_port,
+        "output_sink": output_sink,
+    }
 
     rfo = RecordFileOrchestrator(cli_options)
-    rfo.run()
+    if backfill_from:
+        echo_backfill_summary(rfo.run_backfill())
+    else:
+        rfo.run()
+
+
+@bench_app.command("parse")
+def bench_parse(
+    files: List[str] = typer.Argument(None, help="Record files or glob patterns (defaults to the test record files)"),
+    engine: str = settings.PARSER_ENGINE,
+    scales: str = typer.Option("", help="Comma separated scale factors of synthetic files made from the v6 files"),
+    stages: str = typer.Option(",".join(benchmark.BENCH_STAGES), help="Comma separated stages to run"),
+    repeat: int = 3,
+    output: str = typer.Option(None, help="Write the results to this JSON file"),
+    baseline: str = typer.Option(None, help="JSON results of a previous run to compare against"),
+    max_regression: float = typer.Option(
+        None, help="Exit with an error if a stage is slower than the baseline by more than this fraction"
+    ),
+):
+    results = benchmark.run_parse_benchmark(
+        files or benchmark.DEFAULT_BENCH_FILES,
+        engine=engine,
+        scales=[int(scale) for scale in scales.split(",") if scale],
+        repeat=repeat,
+        stages=[stage for stage in stages.split(",") if stage],
+    )
+    comparisons = benchmark.compare_results(results, benchmark.load_results(baseline)) if baseline else None
+    typer.echo(benchmark.format_results(results, comparisons))
+    if output:
+        benchmark.write_results(results, output)
+
+    regressions = benchmark.find_regressions(comparisons or [], max_regression)
+    for regression in regressions:
+        typer.echo(f"Regression: {regression['dataset']} {regression['stage']} {regression['change']:+.1%}", err=True)
+    if regressions:
+        raise typer.Exit(code=1)
+
+
+@progress_app.command("files")
+def progress_files(
+    start: str = typer.Option(None, help="First file time, e.g. 2022-10-14 or 2022-10-14T01_00_00"),
+    end: str = typer.Option(None, help="File time the range ends before"),
+    status: str = typer.Option(None, help="processing or processed"),
+):
+    index = create_progress("sqlite")
+    for row in index.files(start, end, status):
+        typer.echo(json.dumps(row))
+    index.close()
+
+
+@progress_app.command("reset")
+def progress_reset(
+    start: str = typer.Option(None, help="First file time, e.g. 2022-10-14 or 2022-10-14T01_00_00"),
+    end: str = typer.Option(None, help="File time the range ends before"),
+    status: str = typer.Option(None, help="processing or processed"),
+):
+    index = create_progress("sqlite")
+    typer.echo(f"{index.reset(start, end, status)} files will be parsed again")
+    index.close()
+
+
+@progress_app.command("migrate")
+def progress_migrate(
+    root: str = typer.Option(settings.PARSED_RECORD_STREAM_FILES_PATH, help="Directory holding the record files"),
+    remove_markers: bool = typer.Option(False, help="Delete the marker files once imported"),
+):
+    index = ProgressIndex(settings.PROGRESS_INDEX_PATH or os.path.join(root or ".", "progress.sqlite3"))
+    typer.echo(f"Imported {index.migrate_markers(root, remove=remove_markers)} marker files")
+    index.close()
 
 
 if __name__ == "__main__":
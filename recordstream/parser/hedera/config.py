@@ -32,6 +32,35 @@ class Settings(BaseSettings):
     PARSED_RECORD_STREAM_FILES_PATH: str = os.getenv("PARSED_RECORD_STREAM_FILES_PATH")
     LOG_LEVEL: str = os.getenv("LOG_LEVEL")
 
+    # Decompress .rcd.gz files in memory instead of writing a decompressed .rcd copy next to them
+    RCD_GZ_IN_MEMORY: bool = os.getenv("RCD_GZ_IN_MEMORY", "True")
+
+    # Engine used to parse transactions: "pydantic" validates through the pydantic models, "fast" reads the protobuf
+    # messages directly and produces the same output
+    PARSER_ENGINE: str = os.getenv("PARSER_ENGINE", "pydantic")
+    # Encoding of the bytes fields in the parser output: "hex", "base64" or "raw" (left as bytes, for binary sinks)
+    BYTES_ENCODING: str = os.getenv("BYTES_ENCODING", "hex")
+    # YAML/JSON projection profile listing the output fields to keep per txn_type (all fields if not set)
+    OUTPUT_PROFILE: str = os.getenv("OUTPUT_PROFILE")
+    # Output schema: "flat" numbered keys (record.accountNum.1, ...) or "compact" arrays of objects (record.transfers,
+    # ...) for the transfer lists, token transfers and contract logs
+    OUTPUT_SCHEMA: str = os.getenv("OUTPUT_SCHEMA", "flat")
+    # Split v6 record files into serialized transactions decoded by the parser workers instead of decoding them when
+    # the files are loaded
+    DECODE_IN_WORKERS: bool = os.getenv("DECODE_IN_WORKERS", "False")
+    # Where the orchestrator parses transactions: "ray" actors, "processes" (local process pool) or "inline"
+    PARSER_EXECUTOR: str = os.getenv("PARSER_EXECUTOR", "ray")
+    # Number of long-lived parser workers the orchestrator runs, 0 for one per CPU core
+    PARSER_POOL_SIZE: int = os.getenv("PARSER_POOL_SIZE", 0)
+    # How the orchestrator sizes the chunks sent to the parser workers: "latency" adapts the chunk size to keep the
+    # parse latency of a chunk close to CHUNK_TARGET_LATENCY, "throughput" adapts it to maximise the parsed
+    # transactions per second, "fixed" always uses CHUNK_SIZE
+    CHUNK_GOAL: str = os.getenv("CHUNK_GOAL", "latency")
+    # Number of transactions per chunk (initial size for the adaptive goals)
+    CHUNK_SIZE: int = os.getenv("CHUNK_SIZE", 500)
+    # Target parse latency of a chunk in seconds for the "latency" goal
+    CHUNK_TARGET_LATENCY: float = os.getenv("CHUNK_TARGET_LATENCY", 1.0)
+
     # Ray tmp directory for session data
     RAY_TMP_DIR: str = os.getenv("RAY_TMP_DIR", "/tmp/ray/")
 
@@ -42,6 +71,56 @@ class Settings(BaseSettings):
     DOWNLOADER_LOOP_SLEEP: int = os.getenv("DOWNLOADER_LOOP_SLEEP", 5)
     # Orchestrator sleep time between consecutive parses
     ORCHESTRATOR_LOOP_SLEEP: int = os.getenv("ORCHESTRATOR_LOOP_SLEEP", 1)
+    # Orchestrator discovers new record files from inotify events instead of scanning the day directory every loop
+    # (ORCHESTRATOR_LOOP_SLEEP is then the longest wait for an event, which bounds the day rollover delay)
+    ORCHESTRATOR_WATCH: bool = os.getenv("ORCHESTRATOR_WATCH", "False")
+    # Backfill ranges (--backfill-from/--backfill-to) are split into "day" or "hour" partitions, this many partitions
+    # are downloaded or parsed at the same time
+    BACKFILL_PARTITION: str = os.getenv("BACKFILL_PARTITION", "day")
+    BACKFILL_PARALLELISM: int = os.getenv("BACKFILL_PARALLELISM", 4)
+    # Port of the orchestrator's and the downloader's Prometheus metrics endpoint (http://METRICS_ADDR:port/metrics),
+    # not served if not set
+    ORCHESTRATOR_METRICS_PORT: int = os.getenv("ORCHESTRATOR_METRICS_PORT")
+    DOWNLOADER_METRICS_PORT: int = os.getenv("DOWNLOADER_METRICS_PORT")
+    METRICS_ADDR: str = os.getenv("METRICS_ADDR", "127.0.0.1")
+    # How the orchestrator records the parsed record files: "sqlite" progress index or "markers" (<file>_processed
+    # marker files next to the record files)
+    PROGRESS_INDEX: str = os.getenv("PROGRESS_INDEX", "sqlite")
+    # SQLite progress index file, progress.sqlite3 in PARSED_RECORD_STREAM_FILES_PATH if not set
+    PROGRESS_INDEX_PATH: str = os.getenv("PROGRESS_INDEX_PATH")
+    # With the progress index, the output is staged and committed (fsynced) in batches once this many bytes are staged
+    # or the oldest staged transaction is this many seconds old - and at the end of every orchestrator batch
+    OUTPUT_COMMIT_BYTES: int = os.getenv("OUTPUT_COMMIT_BYTES", 8 * 1024 * 1024)
+    OUTPUT_COMMIT_SECONDS: float = os.getenv("OUTPUT_COMMIT_SECONDS", 5.0)
+    # With marker files, the output is written (and the files marked as processed) once this many bytes are buffered
+    # or the oldest buffered transaction is this many seconds old - and at the end of every orchestrator batch
+    OUTPUT_FLUSH_BYTES: int = os.getenv("OUTPUT_FLUSH_BYTES", 1024 * 1024)
+    OUTPUT_FLUSH_SECONDS: float = os.getenv("OUTPUT_FLUSH_SECONDS", 1.0)
+    # Where the orchestrator writes the parsed transactions: "file" (recordstreams.json), "segments" (compressed
+    # segments in the recordstreams directory), "elasticsearch" (_bulk requests to ELASTICSEARCH_URL) or "parquet"
+    # (recordstreams.parquet directory, needs pyarrow)
+    OUTPUT_SINK: str = os.getenv("OUTPUT_SINK", "file")
+    ELASTICSEARCH_URL: str = os.getenv("ELASTICSEARCH_URL", "http://localhost:9200")
+    ELASTICSEARCH_INDEX: str = os.getenv("ELASTICSEARCH_INDEX", "recordstreams")
+    ELASTICSEARCH_API_KEY: str = os.getenv("ELASTICSEARCH_API_KEY")
+    # A bulk request is sent once it holds this many transactions or bytes, this many requests are sent at a time
+    ELASTICSEARCH_BULK_DOCS: int = os.getenv("ELASTICSEARCH_BULK_DOCS", 1000)
+    ELASTICSEARCH_BULK_BYTES: int = os.getenv("ELASTICSEARCH_BULK_BYTES", 5 * 1024 * 1024)
+    ELASTICSEARCH_MAX_IN_FLIGHT: int = os.getenv("ELASTICSEARCH_MAX_IN_FLIGHT", 4)
+    # Times items rejected with 429 (or failed requests) are sent again, and timeout of a request in seconds
+    ELASTICSEARCH_MAX_RETRIES: int = os.getenv("ELASTICSEARCH_MAX_RETRIES", 5)
+    ELASTICSEARCH_TIMEOUT: float = os.getenv("ELASTICSEARCH_TIMEOUT", 30.0)
+    # Transactions of a family, date and hour written per Parquet row group, and compression codec of the files
+    PARQUET_ROW_GROUP_SIZE: int = os.getenv("PARQUET_ROW_GROUP_SIZE", 65536)
+    PARQUET_COMPRESSION: str = os.getenv("PARQUET_COMPRESSION", "zstd")
+    # A Parquet file stays open across commits until it holds this many bytes or is this many seconds old
+    PARQUET_FILE_MAX_BYTES: int = os.getenv("PARQUET_FILE_MAX_BYTES", 256 * 1024 * 1024)
+    PARQUET_FILE_MAX_SECONDS: float = os.getenv("PARQUET_FILE_MAX_SECONDS", 3600.0)
+    # Compression of the output segments, "gzip" or "zstd" (needs zstandard), a segment is closed and the next one of
+    # its hour started once it holds this many compressed bytes or is this many seconds old
+    OUTPUT_SEGMENT_COMPRESSION: str = os.getenv("OUTPUT_SEGMENT_COMPRESSION", "gzip")
+    OUTPUT_SEGMENT_MAX_BYTES: int = os.getenv("OUTPUT_SEGMENT_MAX_BYTES", 256 * 1024 * 1024)
+    OUTPUT_SEGMENT_MAX_SECONDS: float = os.getenv("OUTPUT_SEGMENT_MAX_SECONDS", 3600.0)
 
     # Retention days used by mirror-node-cleaner for cleanup
     MIRROR_NODE_CLEANER_RETENTION_DAYS: int = os.getenv("MIRROR_NODE_CLEANER_RETENTION_DAYS", 7)
@@ -9,6 +9,8 @@ import urllib3
 
 from hedera.config import settings
 from hedera.errors import BucketSwitchError, DownloaderCheckerError
+from hedera.util import metrics
+from hedera.util.backfill import backfill_partitions, format_backfill_summary, run_partitions
 from hedera.util.downloadMethods import GoogleDownloader
 
 os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = settings.GOOGLE_APP_CREDENTIALS
@@ -38,6 +40,75 @@ class RecordFileDownloader:
         """
         Initialise input parameters
         """
+        metrics_port = self.options.get("metrics_port") or settings.DOWNLOADER_METRICS_PORT
+        self.metrics_server = None
+        if metrics_port:
+            self.metrics_server = metrics.start_metrics_server(metrics_port, settings.METRICS_ADDR)
+            self.logger.info(f"Serving metrics on {settings.METRICS_ADDR}:{self.metrics_server.server_address[1]}")
+
+    def close(self) -> None:
+        """
+        Stop the metrics endpoint
+        """
+        metrics.stop_metrics_server(self.metrics_server)
+        self.metrics_server = None
+
+    def download_partition(self, partition) -> dict:
+        """
+        Download the record files of a backfill partition, retrying timeouts like run()
+
+        :param partition: BackfillPartition
+
+        :returns: Number of files downloaded
+        """
+        i = 1
+        while True:
+            try:
+                # One downloader per partition, they run in different threads
+                downloader = GoogleDownloader(settings.LOG_DIR + "/rcd-metadata.json", settings.RECORDS_FILE_EXTENSION)
+                files = downloader.run(
+                    settings.HEDERA_BUCKET_NAME,
+                    settings.RECORDS_FILES_PATH,
+                    settings.PARSED_RECORD_STREAM_FILES_DIR,
+                    settings.RECORDS_BUCKET_PREFIX,
+                    "/",
+                    partition.label,
+                    metadata=True,
+                    follow=False,
+                )
+                return {"files": files}
+            except (requests.exceptions.ReadTimeout, urllib3.exceptions.ReadTimeoutError, socket.timeout) as ex:
+                metrics.ERRORS.inc(stage="download", exception=type(ex).__name__)
+                if i == 9:
+                    raise
+                backoff = 2**i
+                self.logger.error(f"Downloading {partition.label} timed out, retry #{i}, sleeping {backoff} seconds")
+                i += 1
+                time.sleep(backoff)
+
+    def run_backfill(self) -> list:
+        """
+        Download the record files of the backfill range (backfill_from to backfill_to), split into day or hour
+        partitions downloaded concurrently, and stop once they are all downloaded
+
+        :returns: Files downloaded per partition, see run_partitions
+        """
+        partitions = backfill_partitions(
+            self.options["backfill_from"],
+            self.options.get("backfill_to"),
+            self.options.get("backfill_partition") or settings.BACKFILL_PARTITION,
+        )
+        try:
+            results = run_partitions(
+                partitions,
+                self.download_partition,
+                int(self.options.get("backfill_parallelism") or settings.BACKFILL_PARALLELISM),
+                self.logger,
+            )
+        finally:
+            self.close()
+        self.logger.info(f"Backfill summary:\n{format_backfill_summary(results)}")
+        return results
 
     def run(self) -> None:
         """
@@ -77,6 +148,7 @@ class RecordFileDownloader:
                         # sleep before the next file check
                         time.sleep(settings.DOWNLOADER_LOOP_SLEEP)
                     except (requests.exceptions.ReadTimeout, urllib3.exceptions.ReadTimeoutError, socket.timeout) as ex:
+                        metrics.ERRORS.inc(stage="download", exception=type(ex).__name__)
                         self.logger.error(
                             f"Downloader timed out, retry #{i}\n" f"Sleeping for {backoff} seconds and then restarting"
                         )
@@ -91,3 +163,5 @@ class RecordFileDownloader:
         except Exception as ex:
             self.logger.exception("Unexpected error downloading files")
             time.sleep(5)
+        finally:
+            self.close()
@@ -0,0 +1,301 @@
+"""
+Elasticsearch output - the parsed transactions are streamed to Elasticsearch in NDJSON _bulk requests instead of being
+appended to recordstreams.json
+
+    writer thread       batches the transactions in bulk requests of up to bulk_docs documents / bulk_bytes bytes
+    request threads     send up to max_in_flight bulk requests at a time on a pooled HTTP session, items rejected with
+                        429 (and requests failing with 429, 5xx or a connection error) are sent again with a backoff
+
+Items rejected for other reasons (mapping errors and the like) are appended to the dead letter file as _bulk NDJSON
+lines, so they can be sent again with a single _bulk request once the cause is fixed. Without a dead letter file, they
+fail the bulk request like exhausted retries do.
+
+Each document's _id is derived from its transaction hash and consensus timestamp, so sending a transaction again
+overwrites it instead of duplicating it. A file is only marked as processed in the progress tracking once every bulk
+request holding its transactions has been acknowledged - after a crash, files are parsed and sent again from their
+first transaction.
+"""
+
+import concurrent.futures
+import hashlib
+import logging
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from hedera.config import settings
+from hedera.errors import ElasticsearchSinkError
+from hedera.util import metrics
+from hedera.util.json_lines import dumps
+
+
+def get_document_id(txn: dict) -> str:
+    """
+    _id of a parsed transaction - its consensus timestamp and transaction hash
+
+    :param txn: Parsed transaction
+    """
+    seconds = txn.get("record.consensusTimestamp.seconds")
+    if seconds is not None:
+        consensus_time = f"{seconds}.{int(txn.get('record.consensusTimestamp.nanos') or 0):09d}"
+    else:
+        consensus_time = txn.get("consensusTimestamp", "")
+    txn_hash = txn.get("record.transactionHash")
+    if not txn_hash:
+        # Projected out, the document itself identifies the transaction
+        txn_hash = hashlib.sha256(dumps({k: v for k, v in txn.items() if k != "@processed"})).hexdigest()
+    return f"{consensus_time}-{txn_hash}"
+
+
+class ElasticsearchOutput:
+    """
+    Output sending the transactions to Elasticsearch in _bulk requests. Used as the pipeline's progress tracking, so
+    that files are only finished once their transactions are indexed
+    """
+
+    def __init__(
+        self,
+        url: str,
+        index: str,
+        progress,
+        bulk_docs: int = None,
+        bulk_bytes: int = None,
+        max_in_flight: int = None,
+        max_retries: int = None,
+        retry_backoff: float = 0.5,
+        timeout: float = None,
+        api_key: str = None,
+        dead_letter_path: str = None,
+        logger: logging.Logger = None,
+    ):
+        """
+        :param url: Elasticsearch URL, e.g. http://localhost:9200
+        :param index: Index the transactions are written to
+        :param progress: Progress tracking of the files, MarkerProgress or ProgressIndex
+        :param bulk_docs: Maximum number of documents per bulk request (defaults to settings.ELASTICSEARCH_BULK_DOCS)
+        :param bulk_bytes: Maximum size of a bulk request body (defaults to settings.ELASTICSEARCH_BULK_BYTES)
+        :param max_in_flight: Number of bulk requests sent at the same time, and size of the connection pool
+            (defaults to settings.ELASTICSEARCH_MAX_IN_FLIGHT)
+        :param max_retries: Number of times rejected items are sent again before failing (defaults to
+            settings.ELASTICSEARCH_MAX_RETRIES)
+        :param retry_backoff: Seconds to wait before the first retry, doubled on every retry
+        :param timeout: Timeout of a bulk request in seconds (defaults to settings.ELASTICSEARCH_TIMEOUT)
+        :param api_key: Elasticsearch API key (defaults to settings.ELASTICSEARCH_API_KEY)
+        :param dead_letter_path: NDJSON file the items rejected for reasons other than 429 are appended to, they fail
+            the bulk request if not set
+        :param logger: logger
+        """
+        self.url = url.rstrip("/")
+        self.index = index
+        self.progress = progress
+        self.bulk_docs = int(bulk_docs or settings.ELASTICSEARCH_BULK_DOCS)
+        self.bulk_bytes = int(bulk_bytes or settings.ELASTICSEARCH_BULK_BYTES)
+        self.max_in_flight = int(max_in_flight or settings.ELASTICSEARCH_MAX_IN_FLIGHT)
+        self.max_retries = int(settings.ELASTICSEARCH_MAX_RETRIES if max_retries is None else max_retries)
+        self.retry_backoff = retry_backoff
+        self.timeout = float(timeout or settings.ELASTICSEARCH_TIMEOUT)
+        self.logger = logger or logging.getLogger(__name__)
+        self.dead_letter_path = dead_letter_path
+        self.dead_letter = None
+        self.dead_letter_lock = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_in_flight)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["Content-Type"] = "application/x-ndjson"
+        api_key = api_key or settings.ELASTICSEARCH_API_KEY
+        if api_key:
+            self.session.headers["Authorization"] = f"ApiKey {api_key}"
+        self.executor = concurrent.futures.ThreadPoolExecutor(self.max_in_flight, thread_name_prefix="es-bulk")
+        self.slots = threading.Semaphore(self.max_in_flight)
+
+        # (action, document) lines of the next bulk request
+        self.items = []
+        self.items_bytes = 0
+        self.lock = threading.Lock()
+        # Bulk requests are numbered from 1, all requests up to acknowledged succeeded
+        self.submitted = 0
+        self.acknowledged = 0
+        self.completed = set()
+        self.futures = set()
+        self.errors = []
+        # Files waiting for their bulk requests - (last request holding their transactions, path, txn_count)
+        self.finishing = []
+        self.indexed = 0
+
+    def start(self, path: str) -> int:
+        """
+        Mark a file as being processed
+
+        :returns: 0, a file is sent again from its first transaction
+        """
+        self.progress.start(path)
+        return 0
+
+    def write(self, txns: list) -> None:
+        """
+        Add parsed transactions to the next bulk request, sending it once it is full
+        """
+        for txn in txns:
+            action = dumps({"index": {"_index": self.index, "_id": get_document_id(txn)}})
+            document = dumps(txn)
+            size = len(action) + len(document) + 2
+            if self.items and self.items_bytes + size > self.bulk_bytes:
+                self._submit()
+            self.items.append((action, document))
+            self.items_bytes += size
+            if len(self.items) >= self.bulk_docs:
+                self._submit()
+
+    def written(self, segments: list) -> None:
+        self._finish_acknowledged()
+
+    def finish(self, path: str, txn_count: int, output_offset: int = None) -> None:
+        """
+        Mark a file as processed once the bulk requests holding its transactions are acknowledged
+        """
+        last_request = self.submitted + 1 if self.items else self.submitted
+        self.finishing.append((last_request, path, txn_count))
+        self._finish_acknowledged()
+
+    def _submit(self) -> None:
+        """
+        Send the next bulk request, waiting if max_in_flight requests are being sent
+        """
+        items, self.items, self.items_bytes = self.items, [], 0
+        self._raise_errors()
+        self.slots.acquire()
+        self.submitted += 1
+        future = self.executor.submit(self._send, items)
+        with self.lock:
+            self.futures.add(future)
+        future.add_done_callback(lambda future, request=self.submitted: self._completed(future, request))
+
+    def _completed(self, future: concurrent.futures.Future, request: int) -> None:
+        with self.lock:
+            self.futures.discard(future)
+            if future.exception() is not None:
+                self.errors.append(future.exception())
+            else:
+                self.indexed += future.result()
+                self.completed.add(request)
+                while self.acknowledged + 1 in self.completed:
+                    self.acknowledged += 1
+                    self.completed.remove(self.acknowledged)
+        self.slots.release()
+
+    def _send(self, items: list) -> int:
+        """
+        Send a bulk request, sending the items rejected with 429 again until they are all indexed
+
+        :param items: List of (action, document) lines
+        :returns: Number of documents indexed
+        """
+        indexed = 0
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(self.retry_backoff * 2 ** (attempt - 1))
+            start = time.monotonic()
+            body = b"".join(action + b"\n" + document + b"\n" for action, document in items)
+            try:
+                response = self.session.post(f"{self.url}/_bulk", data=body, timeout=self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as ex:
+                self.logger.warning(f"Bulk request failed, retry #{attempt + 1}: {ex}")
+                metrics.ERRORS.inc(stage="index", exception=type(ex).__name__)
+                continue
+            metrics.STAGE_LATENCY.observe(time.monotonic() - start, stage="index")
+            if response.status_code == 429 or response.status_code >= 500:
+                self.logger.warning(f"Bulk request rejected with {response.status_code}, retry #{attempt + 1}")
+                metrics.ERRORS.inc(stage="index", exception=f"http_{response.status_code}")
+                continue
+            if response.status_code >= 400:
+                raise ElasticsearchSinkError(f"Bulk request failed with {response.status_code}: {response.text[:1000]}")
+
+            rejected = []
+            failed = []
+            accepted = 0
+            for (action, document), item in zip(items, response.json()["items"]):
+                result = next(iter(item.values()))
+                if result["status"] == 429:
+                    rejected.append((action, document))
+                elif result["status"] >= 300:
+                    # Mapping errors and the like, sending the document again wouldn't help
+                    error = result.get("error", {})
+                    self.logger.error(f"Document {result.get('_id')} was not indexed: {error}")
+                    metrics.ERRORS.inc(stage="index", exception=error.get("type", f"http_{result['status']}"))
+                    failed.append((action, document))
+                else:
+                    accepted += 1
+            if failed:
+                self._dead_letter(failed)
+            indexed += accepted
+            metrics.DOCUMENTS_INDEXED.inc(accepted)
+            if not rejected:
+                return indexed
+            self.logger.warning(f"{len(rejected)} documents rejected with 429, retry #{attempt + 1}")
+            items = rejected
+        raise ElasticsearchSinkError(f"Bulk request still failing after {self.max_retries} retries")
+
+    def _dead_letter(self, items: list) -> None:
+        """
+        Append items that can't be indexed to the dead letter file, synced before their bulk request is acknowledged
+
+        :param items: List of (action, document) lines
+        """
+        if self.dead_letter_path is None:
+            raise ElasticsearchSinkError(f"{len(items)} documents were not indexed and there is no dead letter file")
+        with self.dead_letter_lock:
+            if self.dead_letter is None:
+                self.dead_letter = open(self.dead_letter_path, "ab")
+            self.dead_letter.write(b"".join(action + b"\n" + document + b"\n" for action, document in items))
+            self.dead_letter.flush()
+            os.fsync(self.dead_letter.fileno())
+        self.logger.warning(f"{len(items)} documents written to {self.dead_letter_path}")
+
+    def _raise_errors(self) -> None:
+        with self.lock:
+            if self.errors:
+                raise ElasticsearchSinkError("Bulk request failed") from self.errors[0]
+
+    def _finish_acknowledged(self) -> None:
+        """
+        Mark the files whose bulk requests are all acknowledged as processed
+        """
+        self._raise_errors()
+        with self.lock:
+            acknowledged = self.acknowledged
+        while self.finishing and self.finishing[0][0] <= acknowledged:
+            _, path, txn_count = self.finishing.pop(0)
+            self.progress.finish(path, txn_count)
+
+    def commit(self) -> None:
+        """
+        Send the last bulk request and wait for every request to be acknowledged
+        """
+        if self.items:
+            self._submit()
+        with self.lock:
+            futures = list(self.futures)
+        concurrent.futures.wait(futures)
+        self._finish_acknowledged()
+
+    def tell(self) -> int:
+        """
+        :returns: Number of documents indexed
+        """
+        with self.lock:
+            return self.indexed
+
+    def close(self) -> None:
+        """
+        Wait for the bulk requests in flight and close the session. Files with transactions that were never
+        acknowledged aren't finished in the progress tracking
+        """
+        self.executor.shutdown(wait=True)
+        self.session.close()
+        if self.dead_letter is not None:
+            self.dead_letter.close()
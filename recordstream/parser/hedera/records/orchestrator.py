@@ -1,20 +1,23 @@
+import itertools
 import logging
 import os
-import pathlib
+import threading
 import time
 
-import jsonlines
 import pendulum
-import ray
 
 from hedera.config import settings
-from hedera.errors import FileScanError, ParserLoopError
-from hedera.records.record_file_parser import (
-    RcdParser,
-    parse_transaction_v5,
-    parse_transaction_v6,
-)
-from hedera.util.utilities import scan_for_new_files
+from hedera.errors import BackfillError, FileScanError, FileWatchError, ParserLoopError
+from hedera.records.chunk_controller import create_chunk_controller
+from hedera.records.output import SharedOutput, create_output
+from hedera.records.parser_pool import create_parser_executor
+from hedera.records.pipeline import RecordFilePipeline
+from hedera.records.record_file_parser import RcdParser
+from hedera.records.segment_sink import SegmentedOutput
+from hedera.util import json_lines, metrics
+from hedera.util.backfill import backfill_partitions, format_backfill_summary, run_partitions
+from hedera.util.file_watcher import RecordFileWatcher
+from hedera.util.progress_index import create_progress
 
 
 class RecordFileOrchestrator:
@@ -28,13 +31,13 @@ class RecordFileOrchestrator:
         self.logger = None
         self.__init_log__()
         self.parser = RcdParser()
-        self.ray_chunk_size = 500
-        self.txn_list_size = 5000
+        self.progress = create_progress(logger=self.logger)
         try:
-            self.writer = jsonlines.open(
+            self.output = create_output(
                 settings.PARSER_OUTPUT_DIR + "/recordstreams" + ".json",
-                mode="a",
-                flush=True,
+                self.progress,
+                self.logger,
+                self.options.get("output_sink"),
             )
         except FileNotFoundError as ex:
             self.logger.exception(f"Error creating {settings.LOG_DIR + '/recordstreams' + '.json'}: {ex}")
@@ -42,8 +45,22 @@ class RecordFileOrchestrator:
         except Exception as ex:
             self.logger.exception(f"Error opening {settings.LOG_DIR + '/recordstreams' + '.json'}: {ex}")
             raise
-        
-        ray.init(_temp_dir=settings.RAY_TMP_DIR)
+        self.logger.info(f"JSON lines encoder: {json_lines.ENCODER}")
+
+        # Parser workers are started once and reused for every chunk
+        executor = self.options.get("executor") or settings.PARSER_EXECUTOR
+        self.executor = create_parser_executor(executor, settings.PARSER_POOL_SIZE)
+        if executor != "inline" and self.parser.engine == "fast":
+            # The fast engine's protobuf messages can't be sent to other processes, the workers decode them
+            self.parser.decode_in_workers = True
+        # Kept across batches, so the chunk size keeps adapting to the load
+        self.controller = create_chunk_controller(self.executor.size, logger=self.logger)
+
+        metrics_port = self.options.get("metrics_port") or settings.ORCHESTRATOR_METRICS_PORT
+        self.metrics_server = None
+        if metrics_port:
+            self.metrics_server = metrics.start_metrics_server(metrics_port, settings.METRICS_ADDR)
+            self.logger.info(f"Serving metrics on {settings.METRICS_ADDR}:{self.metrics_server.server_address[1]}")
 
     def __init_log__(self):
         """
@@ -55,110 +72,107 @@ class RecordFileOrchestrator:
 
     def parse_txns(self, files_to_parse: list, rcd_dir: str) -> None:
         """
-        Logic to parse transactions
+        Logic to parse transactions - files are read, decoded, parsed on the executor and written in a pipeline,
+        the output is committed once they are all written
 
         :param files_to_parse: List of record files to be
         :param rcd_dir: Location of rcd files
         """
-        v5_txns = []
-        v6_txns = []
-        v5_chunked_list = []
-        v6_chunked_list = []
-
-        for f in files_to_parse[:]:
-            start = time.time()
-            self.logger.debug(f)
-            pathlib.Path(f"{f}_processed").touch()
-            txns, version = self.parser.load_txns(f, rcd_dir)
-            if version == "v5":
-                v5_txns.extend(txns)
-                if len(v5_txns) > self.txn_list_size or f == files_to_parse[-1]:
-                    self.write_to_file(self.ray_v5_parser(v5_txns, v5_chunked_list, self.ray_chunk_size))
-                    v5_txns = []
-                    v5_chunked_list = []
-            if version == "v6":
-                v6_txns.extend(txns)
-                if len(v6_txns) > self.txn_list_size or f == files_to_parse[-1]:
-                    self.write_to_file(self.ray_v6_parser(v6_txns, v6_chunked_list, self.ray_chunk_size))
-                    v6_txns = []
-                    v6_chunked_list = []
-            files_to_parse.remove(f)
-
-            end = time.time()
-            self.logger.debug(f"Parsed {f} in {end-start} seconds.")
-
-    def ray_v5_parser(self, v5_txns: list, v5_chunked_list: list, chunk_size: int) -> list:
-        """
-        Uses ray remote to parse v5 transactions
-
-        :param v6_txns: List of v5 transactions to be processes
-        :param v6_chunked_list: List of list of v5 transactions to be processed in parallel
-        :param chunk_size: Num of transactions in the sub lists
-
-        :return parsed_txns: Processed transactions
-        """
-        parsed_txns = []
-        for i in range(0, len(v5_txns), chunk_size):
-            v5_chunked_list.append(v5_txns[i : i + chunk_size])
-
-        parsed_txns.extend(
-            ray.get(
-                [
-                    parse_transaction_v5.remote(
-                        chunk,
-                        pendulum.now("UTC").isoformat("T")[:26] + "Z",
-                        self.logger,
-                    )
-                    for chunk in v5_chunked_list
-                ]
-            )
+        pipeline = RecordFilePipeline(
+            self.parser,
+            self.executor,
+            self.write_to_file,
+            self.logger,
+            controller=self.controller,
+            progress=self.output,
         )
+        pipeline.run(files_to_parse, rcd_dir)
+        self.output.commit()
+        self.logger.info(f"Chunk controller: {self.controller.metrics()}")
 
-        return parsed_txns
-
-    def ray_v6_parser(self, v6_txns: list, v6_chunked_list: list[list], chunk_size: int) -> list:
+    def write_to_file(self, parsed_txns: list) -> None:
         """
-        Uses ray remote to parse v6 transactions
+        Write list of transactions to file
 
-        :param v6_txns: List of v6 transactions to be processes
-        :param v6_chunked_list: List of list of v6 transactions to be processed in parallel
-        :param chunk_size: Num of transactions in the sub lists
+        :param parsed_txns: List of processed transactions
+        """
+        self.output.write(parsed_txns)
 
-        :return parsed_txns: Processed transactions
+    def parse_partition(self, partition, lock: threading.Lock, workers: int) -> dict:
         """
-        parsed_txns = []
-        for i in range(0, len(v6_txns), chunk_size):
-            v6_chunked_list.append(v6_txns[i : i + chunk_size])
+        Parse the record files of a backfill partition, concurrently with the other partitions - the partitions share
+        the executor and the output, each has its own pipeline and chunk controller
 
-        parsed_txns.extend(
-            ray.get(
-                [
-                    parse_transaction_v6.remote(
-                        chunk,
-                        pendulum.now("UTC").isoformat("T")[:26] + "Z",
-                        self.logger,
-                    )
-                    for chunk in v6_chunked_list
-                ]
-            )
+        :param partition: BackfillPartition
+        :param lock: Lock of the shared output
+        :param workers: Share of the executor's workers of the partition, sizes its chunk controller
+
+        :returns: Number of files and transactions parsed
+        """
+        rcd_dir = partition.directory(settings.PARSED_RECORD_STREAM_FILES_PATH)
+        files_to_parse = [f for f in self.progress.scan(rcd_dir, "rcd") if partition.matches(f)]
+        files_found = len(files_to_parse)
+        metrics.FILES_DISCOVERED.inc(files_found, source="directory")
+        output = SharedOutput(self.output, lock)
+        pipeline = RecordFilePipeline(
+            self.parser,
+            self.executor,
+            output.write,
+            self.logger,
+            controller=create_chunk_controller(workers, logger=self.logger),
+            progress=output,
         )
+        pipeline.run(files_to_parse, rcd_dir)
+        output.commit()
+        return {"files": files_found - len(files_to_parse), "txns": output.txns}
 
-        return parsed_txns
+    def run_backfill(self) -> list:
+        """
+        Parse the record files of the backfill range (backfill_from to backfill_to), split into day or hour partitions
+        parsed concurrently, and stop once they are all parsed
 
-    def write_to_file(self, parsed_txns: list) -> None:
+        :returns: Files and transactions parsed per partition, see run_partitions
         """
-        Write list of transactions to file
+        granularity = self.options.get("backfill_partition") or settings.BACKFILL_PARTITION
+        parallelism = int(self.options.get("backfill_parallelism") or settings.BACKFILL_PARALLELISM)
+        if parallelism > 1 and isinstance(self.output, SegmentedOutput):
+            # A commit would count the segment bytes of another partition's file that is only partly written
+            self.logger.warning("The segments output can't be shared by concurrent partitions, parsing them in turn")
+            parallelism = 1
+        # The executor's workers are split between the partitions parsed at the same time
+        workers = max(1, self.executor.size // parallelism)
+        try:
+            partitions = backfill_partitions(
+                self.options["backfill_from"], self.options.get("backfill_to"), granularity
+            )
+            lock = threading.Lock()
+            results = run_partitions(
+                partitions, lambda partition: self.parse_partition(partition, lock, workers), parallelism, self.logger
+            )
+            self.logger.info(f"Backfill summary:\n{format_backfill_summary(results)}")
+            return results
+        except BackfillError as ex:
+            self.logger.exception(f"Error backfilling record files:\n{ex}")
+            raise
+        finally:
+            self.close()
 
-        :param parsed_txns: List of processed transactions
+    def close(self) -> None:
         """
-        for txn_list in parsed_txns:
-            for txn in txn_list:
-                self.writer.write(txn)
+        Stop the executor and the metrics endpoint, close the output and the progress tracking
+        """
+        self.executor.shutdown()
+        self.output.close()
+        self.progress.close()
+        metrics.stop_metrics_server(self.metrics_server)
+        self.metrics_server = None
 
     def run(self):
         """
-        Orchestration to parse downloaded record files
+        Orchestration to parse downloaded record files - the day directory is scanned every loop, or in watch mode
+        scanned once and then watched for the files the downloader moves into it
         """
+        watcher = RecordFileWatcher("rcd", self.logger, progress=self.progress) if self.options.get("watch") else None
         try:
             while True:
 
@@ -171,17 +185,25 @@ class RecordFileOrchestrator:
                     month = self.options["backfill_marker"].split("-")[1]
                     day = self.options["backfill_marker"].split("-")[2]
 
+                rcd_dir = f"{settings.PARSED_RECORD_STREAM_FILES_PATH}{year}/{month}/{day}/"
                 try:
-                    files_to_parse = scan_for_new_files(
-                        f"{settings.PARSED_RECORD_STREAM_FILES_PATH}{year}/{month}/{day}/",
-                        "rcd",
-                    )
-                    files_to_parse.sort()
+                    if watcher is None:
+                        files_to_parse = self.progress.scan(rcd_dir, "rcd")
+                    elif watcher.path != rcd_dir:
+                        # Startup or day rollover
+                        files_to_parse = watcher.watch_day(rcd_dir)
+                    else:
+                        files_to_parse = watcher.wait_for_files(settings.ORCHESTRATOR_LOOP_SLEEP)
+                        if not files_to_parse:
+                            continue
                     files_parsed = len(files_to_parse)
+                    metrics.FILES_DISCOVERED.inc(files_parsed, source="directory")
 
                     batch_start = time.time()
 
-                    self.parse_txns(files_to_parse, f"{settings.PARSED_RECORD_STREAM_FILES_PATH}{year}/{month}/{day}/")
+                    # Late files of the previous day are returned at day rollover, each directory is parsed on its own
+                    for file_dir, files in itertools.groupby(files_to_parse, os.path.dirname):
+                        self.parse_txns(list(files), f"{file_dir}/")
 
                     batch_end = time.time()
                     self.logger.info(f"Batch processed in {batch_end-batch_start} seconds.")
@@ -191,8 +213,9 @@ class RecordFileOrchestrator:
                         f"Number of files parsed:  {(files_parsed)}"
                     )
 
-                    time.sleep(settings.ORCHESTRATOR_LOOP_SLEEP)
-                except FileScanError as ex:
+                    if watcher is None:
+                        time.sleep(settings.ORCHESTRATOR_LOOP_SLEEP)
+                except (FileScanError, FileWatchError) as ex:
                     raise FileScanError("Error scanning through files") from ex
                 except Exception as ex:
                     raise ParserLoopError("Failed to parse files") from ex
@@ -201,3 +224,7 @@ class RecordFileOrchestrator:
             self.logger.exception(f"Error scanning through files: \n{ex}")
         except Exception as ex:
             self.logger.exception(f"Unexpected error with rcd parser:\n{ex}")
+        finally:
+            if watcher is not None:
+                watcher.close()
+            self.close()
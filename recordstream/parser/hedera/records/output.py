@@ -0,0 +1,331 @@
+"""
+Orchestrator output - the parsed transactions appended to a JSON lines file
+
+    LineOutput       buffered JSON lines writer, flushed by size or age (used with marker files)
+    CommittedOutput  crash-safe batches committed together with the progress index
+    SharedOutput     handle of one of the pipelines writing to the same output concurrently (backfill partitions)
+
+With OUTPUT_SINK=segments, the transactions are written to compressed segments partitioned by consensus hour instead
+(see hedera.records.segment_sink), with OUTPUT_SINK=elasticsearch, they are sent to Elasticsearch (see
+hedera.records.elasticsearch_sink), with OUTPUT_SINK=parquet they are written to Parquet files partitioned by txn_type
+family and consensus hour (see hedera.records.parquet_sink).
+
+Both are used as the pipeline's progress tracking (start, written, finish), wrapping the orchestrator's progress
+tracking, so that the output offsets are recorded with the files.
+
+CommittedOutput stages the transactions in <output>.staging and commits them in batches:
+
+    1. the staging file is flushed and fsynced
+    2. the files of the batch (transactions committed per file, files finished) and the output offsets the batch
+       starts and ends at are recorded in one progress index transaction
+    3. the staging file is appended to the output, which is fsynced
+    4. the staging file is emptied
+
+The staging file is the redo log of the batch - if the process stops after 2, the next start appends it again from
+the batch start offset, if it stops before 2, the staged transactions are dropped and their files resume from the
+transactions committed in the index. The output only ever holds complete batches and every transaction is written
+exactly once, with one fsync per batch instead of a flush per transaction.
+"""
+
+import logging
+import os
+import threading
+import time
+
+from hedera.config import settings
+from hedera.records.elasticsearch_sink import ElasticsearchOutput
+from hedera.records.parquet_sink import ParquetOutput
+from hedera.records.segment_sink import SegmentedOutput
+from hedera.util.json_lines import BufferedLineWriter, encode_lines
+from hedera.util.progress_index import ProgressIndex
+
+
+class LineOutput:
+    """
+    JSON lines output, the transactions are encoded in memory and written with one write once OUTPUT_FLUSH_BYTES are
+    buffered or the oldest buffered transaction is OUTPUT_FLUSH_SECONDS old. Files are only marked as processed once
+    their transactions are flushed
+    """
+
+    def __init__(self, path: str, progress, flush_bytes: int = None, flush_seconds: float = None):
+        """
+        :param path: Output file, appended to
+        :param progress: Progress tracking of the files, MarkerProgress or ProgressIndex
+        :param flush_bytes: Flush once this many bytes are buffered (defaults to settings.OUTPUT_FLUSH_BYTES)
+        :param flush_seconds: Flush once the first buffered transaction is this old (defaults to
+            settings.OUTPUT_FLUSH_SECONDS)
+        """
+        self.path = path
+        self.progress = progress
+        self.output = open(path, mode="ab")
+        self.writer = BufferedLineWriter(
+            self.output,
+            flush_bytes or settings.OUTPUT_FLUSH_BYTES,
+            settings.OUTPUT_FLUSH_SECONDS if flush_seconds is None else flush_seconds,
+        )
+        # Files waiting for their transactions to be flushed - (path, txn_count)
+        self.finishing = []
+
+    def start(self, path: str) -> int:
+        return self.progress.start(path)
+
+    def write(self, txns: list) -> None:
+        if self.writer.write_all(txns):
+            self._finish_flushed()
+
+    def written(self, segments: list) -> None:
+        self.progress.written(segments)
+
+    def finish(self, path: str, txn_count: int, output_offset: int = None) -> None:
+        self.finishing.append((path, txn_count))
+        if self.writer.due():
+            self.commit()
+
+    def _finish_flushed(self) -> None:
+        for path, txn_count in self.finishing:
+            self.progress.finish(path, txn_count, self.tell())
+        self.finishing.clear()
+
+    def tell(self) -> int:
+        return self.writer.tell()
+
+    def commit(self) -> None:
+        """
+        Flush the buffered transactions and mark their files as processed
+        """
+        self.writer.flush()
+        self._finish_flushed()
+
+    def close(self) -> None:
+        """
+        Flush the buffered transactions, mark their files as processed and close the output
+        """
+        self.commit()
+        self.writer.close()
+        self.output.close()
+
+
+class CommittedOutput:
+    """
+    Output committed in batches with the progress index. Used as the pipeline's progress tracking, so that the
+    transactions written for each file are committed with the output
+    """
+
+    def __init__(
+        self,
+        path: str,
+        index: ProgressIndex,
+        commit_bytes: int = None,
+        commit_seconds: float = None,
+        logger: logging.Logger = None,
+    ):
+        """
+        :param path: Output file, appended to
+        :param index: Progress index the batches are committed with
+        :param commit_bytes: Commit once this many bytes are staged (defaults to settings.OUTPUT_COMMIT_BYTES)
+        :param commit_seconds: Commit once the first staged transaction is this old (defaults to
+            settings.OUTPUT_COMMIT_SECONDS)
+        :param logger: logger
+        """
+        self.path = os.path.abspath(path)
+        self.index = index
+        self.commit_bytes = int(commit_bytes or settings.OUTPUT_COMMIT_BYTES)
+        self.commit_seconds = float(commit_seconds or settings.OUTPUT_COMMIT_SECONDS)
+        self.logger = logger or logging.getLogger(__name__)
+        self.lock = threading.Lock()
+        # Transactions of the files in the staged batch - {path: [committed transactions, finished]}
+        self.files = {}
+        self.staged_since = None
+
+        self.recover()
+        self.staging = open(f"{self.path}.staging", "w+b")
+
+    def recover(self) -> None:
+        """
+        Bring the output back to its last committed batch
+        """
+        open(self.path, "ab").close()
+        size = os.path.getsize(self.path)
+        batch_start, committed = self.index.output_offsets(self.path)
+        if committed is None or size > committed:
+            if committed is not None:
+                self.logger.warning(f"{self.path} was appended to outside of the committed batches, adopting it")
+            self.index.set_output_offsets(self.path, size, size)
+        elif size < committed:
+            # Stopped while appending the last committed batch, append it again from the staging file
+            staging = f"{self.path}.staging"
+            if size < batch_start or not os.path.exists(staging) or os.path.getsize(staging) < committed - batch_start:
+                raise RuntimeError(f"Can't recover {self.path}, the last committed batch is missing")
+            self.logger.warning(f"Appending the last committed batch to {self.path} again")
+            with open(staging, "rb") as f_in, open(self.path, "r+b") as f_out:
+                f_out.truncate(batch_start)
+                f_out.seek(batch_start)
+                self._copy(f_in, f_out, committed - batch_start)
+
+    @staticmethod
+    def _copy(f_in, f_out, length: int) -> None:
+        f_in.seek(0)
+        remaining = length
+        while remaining:
+            data = f_in.read(min(remaining, 1024 * 1024))
+            f_out.write(data)
+            remaining -= len(data)
+        f_out.flush()
+        os.fsync(f_out.fileno())
+
+    def start(self, path: str) -> int:
+        """
+        Mark a file as being processed
+
+        :returns: Number of transactions of the file already committed, to be skipped
+        """
+        committed_txns = self.index.start(path)
+        with self.lock:
+            self.files[path] = [committed_txns, False]
+        return committed_txns
+
+    def write(self, txns: list) -> None:
+        """
+        Stage parsed transactions
+        """
+        if self.staged_since is None:
+            self.staged_since = time.monotonic()
+        self.staging.write(encode_lines(txns))
+
+    def written(self, segments: list) -> None:
+        """
+        Record the transactions of each file the last written chunk held, committing the batch if it is due
+
+        :param segments: List of (file, number of transactions) of the chunk
+        """
+        with self.lock:
+            for path, n_txns in segments:
+                self.files[path][0] += n_txns
+        self._commit_if_due()
+
+    def finish(self, path: str, txn_count: int, output_offset: int = None) -> None:
+        """
+        Mark a file as processed once its batch is committed
+        """
+        with self.lock:
+            self.files[path][1] = True
+        self._commit_if_due()
+
+    def _commit_if_due(self) -> None:
+        if self.staged_since is None:
+            return
+        if self.staging.tell() >= self.commit_bytes or time.monotonic() - self.staged_since >= self.commit_seconds:
+            self.commit()
+
+    def commit(self) -> None:
+        """
+        Commit the staged batch
+        """
+        with self.lock:
+            files = {path: tuple(state) for path, state in self.files.items()}
+            self.files = {path: state for path, state in self.files.items() if not state[1]}
+        if not files and self.staged_since is None:
+            return
+
+        length = self.staging.tell()
+        self.staging.flush()
+        os.fsync(self.staging.fileno())
+        _, batch_start = self.index.output_offsets(self.path)
+        self.index.commit_batch(files, self.path, batch_start, batch_start + length)
+
+        with open(self.path, "ab") as f_out:
+            self._copy(self.staging, f_out, length)
+        self.staging.seek(0)
+        self.staging.truncate()
+        self.staged_since = None
+
+    def tell(self) -> int:
+        return self.index.output_offsets(self.path)[1]
+
+    def close(self) -> None:
+        """
+        Close the staging file, a batch that wasn't committed is dropped
+        """
+        self.staging.close()
+
+
+class SharedOutput:
+    """
+    Handle of a LineOutput, CommittedOutput or ParquetOutput shared by pipelines running concurrently. A chunk's
+    transactions are only written with the transactions each file had in it, both under the shared lock, so that a
+    batch committed by another pipeline never holds transactions its files' progress doesn't count. A SegmentedOutput
+    can't be shared, its commits cover the partly written files of every pipeline
+    """
+
+    def __init__(self, output, lock: threading.Lock):
+        """
+        :param output: Shared output
+        :param lock: Lock of the shared output, the same for every handle
+        """
+        self.output = output
+        self.lock = lock
+        self.pending = []
+        self.txns = 0
+
+    def start(self, path: str) -> int:
+        with self.lock:
+            return self.output.start(path)
+
+    def write(self, txns: list) -> None:
+        """
+        Hold the parsed transactions of a chunk until their files are known
+        """
+        self.pending.extend(txns)
+
+    def written(self, segments: list) -> None:
+        with self.lock:
+            self.output.write(self.pending)
+            self.output.written(segments)
+        self.txns += len(self.pending)
+        self.pending = []
+
+    def finish(self, path: str, txn_count: int, output_offset: int = None) -> None:
+        with self.lock:
+            self.output.finish(path, txn_count, output_offset)
+
+    def tell(self) -> int:
+        with self.lock:
+            return self.output.tell()
+
+    def commit(self) -> None:
+        with self.lock:
+            self.output.commit()
+
+
+OUTPUT_SINKS = ("file", "segments", "elasticsearch", "parquet")
+
+
+def create_output(path: str, progress, logger: logging.Logger = None, sink: str = None):
+    """
+    Create the orchestrator output
+
+    :param path: Output file
+    :param progress: Progress tracking of the orchestrator, batches are committed with it if it is a ProgressIndex
+    :param logger: logger
+    :param sink: One of OUTPUT_SINKS (defaults to settings.OUTPUT_SINK)
+
+    :returns: CommittedOutput, LineOutput, SegmentedOutput, ElasticsearchOutput or ParquetOutput
+    """
+    sink = sink or settings.OUTPUT_SINK
+    if sink not in OUTPUT_SINKS:
+        raise ValueError(f"Unknown output sink {sink}, expected one of {', '.join(OUTPUT_SINKS)}")
+    if sink == "segments":
+        return SegmentedOutput(os.path.splitext(path)[0], progress, logger=logger)
+    if sink == "elasticsearch":
+        return ElasticsearchOutput(
+            settings.ELASTICSEARCH_URL,
+            settings.ELASTICSEARCH_INDEX,
+            progress,
+            dead_letter_path=os.path.splitext(path)[0] + ".rejected.ndjson",
+            logger=logger,
+        )
+    if sink == "parquet":
+        return ParquetOutput(os.path.splitext(path)[0] + ".parquet", progress, logger=logger)
+    if isinstance(progress, ProgressIndex):
+        return CommittedOutput(path, progress, logger=logger)
+    return LineOutput(path, progress)
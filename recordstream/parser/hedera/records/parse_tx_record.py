@@ -2,9 +2,19 @@ from typing import List, Union
 
 from pydantic import validate_arguments
 
+from hedera.errors import ParseTxnRecordError
 from hedera.models.tx_record import TransactionRecord, TxRecordParsed
 from hedera.util.utilities import parse_flat_fields
 
+# Transaction record output fields that hold bytes, encoded with the configured bytes encoding
+RECORD_BYTES_FIELDS = {
+    "topic_running_hash",
+    "transfer_list",
+    "token_transfer_list",
+    "contract_create_result",
+    "contract_call_result",
+}
+
 
 @validate_arguments()
 def parseTxRecord(transaction_record: TransactionRecord) -> TxRecordParsed:
@@ -15,6 +25,16 @@ def parseTxRecord(transaction_record: TransactionRecord) -> TxRecordParsed:
 
     :returns TxRecordParsed(**output): Dictionary key fields in the transaction record object
     """
+    # Optional in the model, but every record has them
+    if transaction_record.receipt is None:
+        raise ParseTxnRecordError("Missing required field receipt")
+    if transaction_record.transactionID is None:
+        raise ParseTxnRecordError("Missing required field transactionID")
+    if transaction_record.transactionID.transactionValidStart is None:
+        raise ParseTxnRecordError("Missing required field transactionID.transactionValidStart")
+    if transaction_record.transactionID.accountID is None:
+        raise ParseTxnRecordError("Missing required field transactionID.accountID")
+
     output = {
         "status": transaction_record.receipt.status,
         "currentRate.hbarEquiv": transaction_record.receipt.exchangeRate.currentRate.hbarEquiv,
@@ -43,7 +63,7 @@ def parseTxRecord(transaction_record: TransactionRecord) -> TxRecordParsed:
         "transfer_list": transaction_record.transferList.accountAmounts,
         "token_transfer_list": transaction_record.tokenTransferLists,
         "contract_create_result": transaction_record.contractCreateResult,
-        "contract_call_result": transaction_record.contractCallResult
+        "contract_call_result": transaction_record.contractCallResult,
     }
 
     return TxRecordParsed(**output)
@@ -0,0 +1,320 @@
+"""
+Staged record file pipeline - file reader -> decoder -> parallel parse -> ordered writer
+
+Each stage runs in its own thread and hands its output to the next one through a bounded queue, so reading the next
+files, decoding transactions, parsing chunks on the executor and writing the output overlap, and a slow stage makes
+the stages before it wait (backpressure) instead of piling up transactions in memory:
+
+    reader      opens the record files (iter_txns - decompression, header checks)
+    decoder     decodes the transactions and groups them in chunks, across small files
+    dispatcher  submits the chunks to the parser executor, at most max_in_flight chunks are submitted and not yet
+                written
+    writer      (calling thread) writes the parsed chunks in the order they were submitted - file order, then
+                consensus order within a file
+
+The chunk size and the number of chunks in flight are read from a chunk controller (see
+hedera.records.chunk_controller) on every chunk, the writer reports the latency of each chunk to it. The stages update
+the metrics of hedera.util.metrics (bytes read, transactions decoded and parsed, stage latencies, queue depths, lag).
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from typing import Callable, List
+
+import pendulum
+
+from hedera.records.chunk_controller import FixedChunkController
+from hedera.records.record_file_parser import LOAD_TXNS_ERRORS, RcdParser, SignatureStats
+from hedera.util import metrics
+from hedera.util.progress_index import MarkerProgress
+
+# Marks the end of the items of a queue
+_DONE = object()
+
+
+class _Stopped(Exception):
+    """Raised in a stage when another stage failed and the pipeline is stopping"""
+
+    pass
+
+
+class RecordFilePipeline:
+    """
+    Pipeline parsing a list of record files with an executor (see hedera.records.parser_pool)
+    """
+
+    def __init__(
+        self,
+        parser: RcdParser,
+        executor,
+        write: Callable[[list], None],
+        logger: logging.Logger,
+        chunk_size: int = 500,
+        queue_size: int = None,
+        file_queue_size: int = 2,
+        controller=None,
+        progress=None,
+        output_offset: Callable[[], int] = None,
+    ):
+        """
+        :param parser: Parser used to load the record files
+        :param executor: Parser executor the chunks are submitted to
+        :param write: Called with each list of parsed transactions, in order
+        :param logger: logger
+        :param chunk_size: Number of transactions per chunk submitted to the executor, if no controller is given
+        :param queue_size: Maximum number of chunks waiting to be submitted and, if no controller is given, of chunks in
+            flight (defaults to twice the number of executor workers)
+        :param file_queue_size: Maximum number of opened files waiting to be decoded
+        :param controller: Chunk controller deciding the chunk size and the number of chunks in flight (defaults to a
+            FixedChunkController of chunk_size and queue_size)
+        :param progress: Progress tracking of the record files, MarkerProgress (default) or ProgressIndex
+        :param output_offset: Returns the offset of the output, recorded with each file once its transactions are
+            written
+        """
+        self.parser = parser
+        self.executor = executor
+        self.write = write
+        self.logger = logger
+        self.queue_size = queue_size or 2 * getattr(executor, "size", 1)
+        self.file_queue_size = file_queue_size
+        self.controller = controller or FixedChunkController(chunk_size, self.queue_size)
+        self.progress = progress or MarkerProgress()
+        self.output_offset = output_offset
+        self.stop = threading.Event()
+        self.errors = []
+        # SignatureStats of the files whose transactions are being written
+        self.signature_stats = {}
+        # Chunks submitted and not yet written
+        self.in_flight = 0
+        self.in_flight_changed = threading.Condition()
+
+    def _put(self, q: queue.Queue, item) -> None:
+        while True:
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                if self.stop.is_set():
+                    raise _Stopped()
+
+    def _get(self, q: queue.Queue):
+        while True:
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                if self.stop.is_set():
+                    raise _Stopped()
+
+    def _stage(self, target: Callable, *args) -> threading.Thread:
+        """
+        Start a stage thread, stopping the whole pipeline if it fails
+        """
+
+        def run():
+            try:
+                target(*args)
+            except _Stopped:
+                pass
+            except BaseException as ex:
+                self.errors.append(ex)
+                self.stop.set()
+
+        thread = threading.Thread(target=run, name=f"pipeline-{target.__name__}", daemon=True)
+        thread.start()
+        return thread
+
+    def read(self, files_to_parse: List[str], rcd_dir: str, files: queue.Queue) -> None:
+        """
+        Reader stage - open the record files
+
+        :param files_to_parse: Record files, in order
+        :param rcd_dir: Location of rcd files
+        :param files: Output queue of (file, start time, loaded transactions, transactions to skip) tuples
+        """
+        for f in files_to_parse:
+            start = time.time()
+            self.logger.debug(f)
+            # Transactions already committed by a previous run that stopped in the middle of the file
+            skip = self.progress.start(f)
+            loaded = self.parser.iter_txns(f, rcd_dir, batch_size=self.controller.chunk_size)
+            metrics.STAGE_LATENCY.observe(time.time() - start, stage="read")
+            if os.path.exists(f):
+                metrics.BYTES_READ.inc(os.path.getsize(f))
+            self._put(files, (f, start, loaded, skip))
+        self._put(files, _DONE)
+
+    def decode(self, files: queue.Queue, chunks: queue.Queue) -> None:
+        """
+        Decoder stage - decode the transactions and group them in chunks
+
+        :param files: Input queue of the reader stage
+        :param chunks: Output queue of ("chunk", version, transactions, [[file, number of transactions], ...]) and
+            ("file", file, start time, number of transactions) items, a file item follows the chunk holding the last
+            transactions of the file
+        """
+        pending, pending_version, pending_files, segments = [], None, [], []
+
+        def flush():
+            nonlocal pending, segments
+            if pending:
+                self._put(chunks, ("chunk", pending_version, pending, segments))
+                pending, segments = [], []
+            for item in pending_files:
+                self._put(chunks, item)
+            pending_files.clear()
+
+        while (item := self._get(files)) is not _DONE:
+            f, start, loaded, skip = item
+            decode_start = time.time()
+            n_txns = 0
+            if loaded is not None:
+                batches, version = loaded
+                if version != pending_version:
+                    flush()
+                    pending_version = version
+                try:
+                    for batch in batches:
+                        for txn in batch:
+                            n_txns += 1
+                            if n_txns <= skip:
+                                continue
+                            if not segments or segments[-1][0] != f:
+                                segments.append([f, 0])
+                            segments[-1][1] += 1
+                            pending.append(txn)
+                            if len(pending) >= self.controller.chunk_size:
+                                flush()
+                except LOAD_TXNS_ERRORS as ex:
+                    self.parser.log_load_txns_error(f, ex)
+                metrics.TXNS_DECODED.inc(max(n_txns - skip, 0), version=version)
+                metrics.STAGE_LATENCY.observe(time.time() - decode_start, stage="decode")
+            pending_files.append(("file", f, start, n_txns))
+            if not pending:
+                flush()
+        flush()
+        self._put(chunks, _DONE)
+
+    def _acquire_in_flight(self) -> None:
+        """
+        Wait until another chunk can be submitted
+        """
+        with self.in_flight_changed:
+            while self.in_flight >= self.controller.max_in_flight:
+                self.in_flight_changed.wait(timeout=0.1)
+                if self.stop.is_set():
+                    raise _Stopped()
+            self.in_flight += 1
+
+    def _release_in_flight(self) -> None:
+        with self.in_flight_changed:
+            self.in_flight -= 1
+            self.in_flight_changed.notify()
+
+    def dispatch(self, chunks: queue.Queue, results: queue.Queue) -> None:
+        """
+        Dispatcher stage - submit the chunks to the executor
+
+        :param chunks: Input queue of the decoder stage
+        :param results: Output queue of ("chunk", future, number of transactions, [submit time, parsed time],
+            segments) and ("file", file, start time, number of transactions) items, in input order
+        """
+        while (item := self._get(chunks)) is not _DONE:
+            if item[0] == "chunk":
+                _, version, chunk, segments = item
+                self._acquire_in_flight()
+                timestamp = pendulum.now("UTC").isoformat("T")[:26] + "Z"
+                times = [time.monotonic(), None]
+                future = self.executor.submit(version, chunk, timestamp)
+
+                def parsed(_, times=times):
+                    times[1] = time.monotonic()
+
+                future.add_done_callback(parsed)
+                item = ("chunk", future, len(chunk), times, segments)
+            self._put(results, item)
+        self._put(results, _DONE)
+
+    def write_chunk(self, future, n_txns: int, times: list, segments: list, results: queue.Queue) -> None:
+        """
+        Writer stage - write a parsed chunk and report its latency to the controller
+
+        :param future: Future of the parsed chunk
+        :param n_txns: Number of transactions of the chunk
+        :param times: Submit time and parsed time of the chunk
+        :param segments: Number of transactions of each file in the chunk
+        :param results: Input queue of the dispatcher stage, its parsed chunks count as ready to be written
+        """
+        writer_waited = not future.done()
+        parsed_txns = future.result()
+        with results.mutex:
+            queued = list(results.queue)
+        ready = 1 + sum(1 for item in queued if item is not _DONE and item[0] == "chunk" and item[1].done())
+        latency = (times[1] or time.monotonic()) - times[0]
+        self.controller.record(n_txns, latency, ready, writer_waited)
+        metrics.STAGE_LATENCY.observe(latency, stage="parse")
+        for txn_type, count in Counter(txn.get("txn_type") for txn in parsed_txns).items():
+            metrics.TXNS_PARSED.inc(count, txn_type=txn_type or "UNKNOWN")
+        for exception, count in getattr(parsed_txns, "errors", {}).items():
+            metrics.ERRORS.inc(count, stage="parse", exception=exception)
+        for f, stats in getattr(parsed_txns, "signature_stats", {}).items():
+            self.signature_stats.setdefault(f, SignatureStats()).update(stats)
+
+        write_start = time.monotonic()
+        self.write(parsed_txns)
+        self.progress.written(segments)
+        metrics.STAGE_LATENCY.observe(time.monotonic() - write_start, stage="write")
+        self._release_in_flight()
+
+    def run(self, files_to_parse: List[str], rcd_dir: str) -> None:
+        """
+        Parse the record files, writing the transactions in order. Files are removed from files_to_parse once all
+        their transactions have been written
+
+        :param files_to_parse: Record files, in order
+        :param rcd_dir: Location of rcd files
+        """
+        files = queue.Queue(maxsize=self.file_queue_size)
+        chunks = queue.Queue(maxsize=self.queue_size)
+        # Bounded by the chunks in flight
+        results = queue.Queue()
+        threads = [
+            self._stage(self.read, list(files_to_parse), rcd_dir, files),
+            self._stage(self.decode, files, chunks),
+            self._stage(self.dispatch, chunks, results),
+        ]
+
+        try:
+            while (item := self._get(results)) is not _DONE:
+                metrics.QUEUE_DEPTH.set(files.qsize(), queue="files")
+                metrics.QUEUE_DEPTH.set(chunks.qsize(), queue="chunks")
+                metrics.QUEUE_DEPTH.set(results.qsize(), queue="results")
+                metrics.QUEUE_DEPTH.set(self.in_flight, queue="in_flight")
+                if item[0] == "chunk":
+                    self.write_chunk(*item[1:], results)
+                else:
+                    _, f, start, n_txns = item
+                    self.progress.finish(f, n_txns, self.output_offset() if self.output_offset else None)
+                    files_to_parse.remove(f)
+                    metrics.STAGE_LATENCY.observe(time.time() - start, stage="file")
+                    metrics.observe_consensus_lag(f, "parse")
+                    stats = self.signature_stats.pop(f, SignatureStats())
+                    self.logger.debug(f"Signature stats for {f}: {json.dumps(stats.as_dict())}")
+                    for key_type, count in stats.key_type_counts.items():
+                        metrics.SIGNATURES.inc(count, key_type=key_type)
+                    self.logger.debug(f"Parsed {f} in {time.time() - start} seconds.")
+        except _Stopped:
+            pass
+        except BaseException:
+            self.stop.set()
+            raise
+        finally:
+            for thread in threads:
+                thread.join()
+
+        if self.errors:
+            raise self.errors[0]
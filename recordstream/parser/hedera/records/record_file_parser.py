@@ -1,12 +1,13 @@
+import functools
 import gzip
 import logging
 import os
 import pathlib
 import shutil
-from typing import Union
+from collections import Counter
+from typing import Iterable, Union
 
-import pendulum
-import ray
+from google.protobuf.message import Message
 from pydantic.error_wrappers import ValidationError
 
 from hedera.config import settings
@@ -24,56 +25,24 @@ from hedera.errors import (
 )
 from hedera.models.tx_item import TransactionItem, UnknownType
 from hedera.models.tx_record import TransactionRecord
+from hedera.records.compact_schema import OUTPUT_SCHEMAS, compact_txn
+from hedera.records.fast_parser import parse_transaction_item_fast, parse_transaction_record_fast
 from hedera.records.parse_tx_item import (
+    ITEM_BYTES_FIELDS,
+    TRANSACTION_TYPE_PARSERS,
+    get_transaction_data_type,
     parseCommon,
-    parseConsensusCreateTopic,
-    parseConsensusDeleteTopic,
-    parseConsensusSubmitMessage,
-    parseConsensusUpdateTopic,
-    parseContractCall,
-    parseContractCreateInstance,
-    parseContractDelete,
-    parseContractUpdateInstance,
-    parseCryptoApproveAllowance,
-    parseCryptoCreateAccount,
-    parseCryptoDelete,
-    parseCryptoDeleteAllowance,
-    parseCryptoTransfer,
-    parseCryptoUpdateAccount,
-    parseEthereumTransaction,
-    parseFileAppend,
-    parseFileCreate,
-    parseFileDelete,
-    parseFileUpdate,
-    parseNodeStakeUpdate,
-    parseScheduleCreate,
-    parseScheduleDelete,
-    parseScheduleSign,
-    parseTokenAssociate,
-    parseTokenBurn,
-    parseTokenCreation,
-    parseTokenDeletion,
-    parseTokenDissociate,
-    parseTokenFeeScheduleUpdate,
-    parseTokenFreeze,
-    parseTokenGrantKyc,
-    parseTokenList,
-    parseTokenMint,
-    parseTokenPause,
-    parseTokenRevokeKyc,
-    parseTokenUnfreeze,
-    parseTokenUnpause,
-    parseTokenUpdate,
-    parseTokenWipe,
-    parseTransferListItem,
     parseUnknownType,
 )
 from hedera.records.parse_tx_record import (
+    RECORD_BYTES_FIELDS,
     parseSmartContractInfo,
     parseTokenTransferList,
     parseTransferListRecord,
     parseTxRecord,
 )
+from hedera.records.projection import ProjectionPlan, load_projection_profile
+from hedera.util import metrics
 from hedera.util.common.serializable import RecordStreamObject
 from hedera.util.common.stream import SerializableDataInputStream
 from hedera.util.proto_pb import (
@@ -84,22 +53,136 @@ from hedera.util.proto_pb import (
     transaction_record_pb2,
 )
 from hedera.util.protobuf_to_dict import protobuf_to_dict
-from hedera.util.utilities import dict_bytes_to_hex
+from hedera.util.utilities import (
+    encode_nested_bytes,
+    format_epoch_seconds,
+    get_bytes_encoder,
+    iter_message_fields,
+)
+
+
+def get_signature_key_types(sig_pairs: Iterable) -> list:
+    """
+    Key types of the signatures of a transaction, read from the "signature" oneof of each SignaturePair
+
+    :param sig_pairs: SignaturePair messages of the transaction's sigMap
+
+    :returns: List of key types (e.g., ["ed25519", "ECDSA_secp256k1"]), one per signature
+    """
+    key_types = []
+    for sig_pair in sig_pairs:
+        key_type = sig_pair.WhichOneof("signature")
+        if key_type is None:
+            # Pairs without a signature only carry the public key prefix
+            if not sig_pair.pubKeyPrefix:
+                raise ParseSignKeysError("Signature pair without a signature or public key prefix")
+            key_type = "pubKeyPrefix"
+        key_types.append(key_type)
+    return key_types
+
+
+def count_signature_key_types(key_types: list) -> dict:
+    """
+    Signature stats of a single transaction
+
+    :param key_types: Key types of the transaction's signatures (see get_signature_key_types)
+
+    :returns: Dictionary with the number of signatures and the number of signatures per key type
+    """
+    return {"txn_sign_count": len(key_types), "txn_sign_key_counts": dict(Counter(key_types))}
+
+
+class SignatureStats:
+    """
+    Aggregate signature stats of the transactions of a record file
+    """
+
+    def __init__(self):
+        self.txn_count = 0
+        self.sign_count = 0
+        self.max_txn_sign_count = 0
+        self.key_type_counts = Counter()
+        self.txn_sign_count_histogram = Counter()
 
+    def add(self, key_types: list) -> None:
+        """
+        Add the signatures of a transaction
+
+        :param key_types: Key types of the transaction's signatures (see get_signature_key_types)
+        """
+        self.txn_count += 1
+        self.sign_count += len(key_types)
+        self.max_txn_sign_count = max(self.max_txn_sign_count, len(key_types))
+        self.key_type_counts.update(key_types)
+        self.txn_sign_count_histogram[len(key_types)] += 1
+
+    def update(self, other: "SignatureStats") -> None:
+        """
+        Add the stats of other transactions of the file, e.g. parsed in another chunk
 
-@ray.remote
-def parse_transaction_v5(chunk: list, timestamp: str, logger: logging.Logger) -> dict:
+        :param other: Stats to add
+        """
+        self.txn_count += other.txn_count
+        self.sign_count += other.sign_count
+        self.max_txn_sign_count = max(self.max_txn_sign_count, other.max_txn_sign_count)
+        self.key_type_counts.update(other.key_type_counts)
+        self.txn_sign_count_histogram.update(other.txn_sign_count_histogram)
+
+    def as_dict(self) -> dict:
+        """
+        :returns: Dictionary of the stats, with key type counts and the number of transactions per signature count
+        """
+        return {
+            "txn_count": self.txn_count,
+            "sign_count": self.sign_count,
+            "max_txn_sign_count": self.max_txn_sign_count,
+            "key_type_counts": dict(self.key_type_counts),
+            "txn_sign_count_histogram": {str(k): v for k, v in sorted(self.txn_sign_count_histogram.items())},
+        }
+
+
+# Field number of the record stream items in a RecordStreamFile
+RECORD_STREAM_ITEMS_FIELD = record_stream_file_pb2.RecordStreamFile.DESCRIPTOR.fields_by_name[
+    "record_stream_items"
+].number
+
+# Errors raised while loading an rcd file that are logged and skipped rather than stopping the parser
+LOAD_TXNS_ERRORS = (
+    FileNotFoundError,
+    AssertionError,
+    RecordFormatVersionError,
+    NameError,
+    AttributeError,
+)
+
+
+def _count_error(errors: Counter, ex: Exception) -> None:
+    if errors is not None:
+        errors[type(ex).__name__] += 1
+
+
+def parse_txn_chunk_v5(
+    chunk: list,
+    timestamp: str,
+    logger: logging.Logger,
+    parser: "RcdParser" = None,
+    errors: Counter = None,
+    signature_stats: dict = None,
+) -> dict:
     """
-    Methods to parse transactions (ray method)
+    Methods to parse transactions
     WARNING: This method is untested as this transaction format is no longer used by Hedera - we're
     leaving it in the parser in case we ever need to backfill historical data that uses this format
 
     :param chunk: array of dictionaries - each dict has a txn object to process and a corresponding filename
     :param timestamp: timestamp the transaction is processed by metrika
     :param logger: logger
+    :param parser: RcdParser to reuse between chunks (a new one is created if not set)
+    :param errors: Counter of the skipped transactions per exception class name, updated if set
+    :param signature_stats: Unused, the signatures of v5 transactions aren't read
     :returns parsed_txns: Flattened dictionary of relevant info from the transaction item
     """
-    parser = RcdParser()
+    parser = parser or RcdParser()
     parsed_txns = []
 
     for txn in chunk:
@@ -107,26 +190,30 @@ def parse_transaction_v5(chunk: list, timestamp: str, logger: logging.Logger) ->
             transaction_item_dict = parser.create_v5_transaction_body(txn["txn_object"])
             transaction_record_dict = parser.create_v5_transaction_record(txn["txn_object"])
             tx_item = parser.parse_transaction_item(transaction_item_dict)
-            tx_record = parser.parse_transaction_record(transaction_record_dict)
+            tx_record = parser.parse_transaction_record(transaction_record_dict, tx_item["txn_type"])
             output = {**tx_record, **tx_item}
             output = parser.reclassify_token_txns(output)
             output = parser.add_txn_metadata(output, timestamp, txn["filename"])
-            output = dict_bytes_to_hex(output)
+            output = parser.project_fields(output)
+            output = parser.compact_fields(output)
             parsed_txns.append(output)
 
         except TypeError as ex:
+            _count_error(errors, ex)
             logger.exception(
                 f"Transaction object is incorrect type in {txn['filename']}.\n"
                 f"Skipping transaction and moving to next one:\n {ex}"
             )
             continue
         except ValidationError as ex:
+            _count_error(errors, ex)
             logger.exception(
                 f"Missing field for a transaction in {txn['filename']}.\n "
                 f"Skipping transaction and moving to next one:\n {ex}"
             )
             continue
         except AttributeError as ex:
+            _count_error(errors, ex)
             logger.exception(
                 f"Missing attribute for a transaction in {txn['filename']}.\n "
                 f"Skipping transaction and moving to next one:\n {ex}"
@@ -139,6 +226,7 @@ def parse_transaction_v5(chunk: list, timestamp: str, logger: logging.Logger) ->
             AddTxnMetadataError,
             CreateTimestampError,
         ) as ex:
+            _count_error(errors, ex)
             logger.exception(
                 f"Unexpected error parsing transaction in{txn['filename']}.\n "
                 f"Skipping transaction and moving to next one:\n {ex}"
@@ -151,44 +239,62 @@ def parse_transaction_v5(chunk: list, timestamp: str, logger: logging.Logger) ->
     return parsed_txns
 
 
-@ray.remote
-def parse_transaction_v6(chunk: list, timestamp: str, logger: logging.Logger) -> dict:
+def parse_txn_chunk_v6(
+    chunk: list,
+    timestamp: str,
+    logger: logging.Logger,
+    parser: "RcdParser" = None,
+    errors: Counter = None,
+    signature_stats: dict = None,
+) -> dict:
     """
-    Methods to parse transactions (ray method)
+    Methods to parse transactions
 
     :param chunk: array of dictionaries - each dict has a txn object to process and a corresponding filename
     :param timestamp: timestamp the transaction is processed by metrika
     :param logger: logger
+    :param parser: RcdParser to reuse between chunks (a new one is created if not set)
+    :param errors: Counter of the skipped transactions per exception class name, updated if set
+    :param signature_stats: SignatureStats of the transactions per filename, updated if set
 
     :returns: Flattened dictionary of relevant info from the transaction item
     """
-    parser = RcdParser()
+    parser = parser or RcdParser()
     parsed_txns = []
 
     for txn in chunk:
         try:
-            tx_item = parser.parse_transaction_item(txn["transaction_body"])
-            tx_record = parser.parse_transaction_record(txn["transaction_record"])
+            if "record_stream_item" in txn:
+                txn = parser.load_record_stream_item(txn["record_stream_item"], txn["filename"])
+            if signature_stats is not None:
+                signature_stats.setdefault(txn["filename"], SignatureStats()).add(txn["txn_sign_keys"])
+            tx_item = parser.parse_transaction_item(txn["transaction_body"], txn.get("transaction_data_type"))
+            tx_record = parser.parse_transaction_record(txn["transaction_record"], tx_item["txn_type"])
             output = {**tx_record, **tx_item}
             output = {**output, **{"txn_sign_keys": txn["txn_sign_keys"]}}
+            output.update(count_signature_key_types(txn["txn_sign_keys"]))
             output = parser.reclassify_token_txns(output)
             output = parser.add_txn_metadata(output, timestamp, txn["filename"])
-            output = dict_bytes_to_hex(output)
+            output = parser.project_fields(output)
+            output = parser.compact_fields(output)
             parsed_txns.append(output)
 
         except TypeError as ex:
+            _count_error(errors, ex)
             logger.exception(
                 f"Transaction object is incorrect type in {txn['filename']}.\n"
                 f"Skipping transaction and moving to next one:\n {ex}"
             )
             continue
         except ValidationError as ex:
+            _count_error(errors, ex)
             logger.exception(
                 f"Missing field for a transaction in {txn['filename']}.\n "
                 f"Skipping transaction and moving to next one:\n {ex}"
             )
             continue
         except AttributeError as ex:
+            _count_error(errors, ex)
             logger.exception(
                 f"Missing attribute for a transaction in {txn['filename']}.\n "
                 f"Skipping transaction and moving to next one:\n {ex}"
@@ -202,6 +308,7 @@ def parse_transaction_v6(chunk: list, timestamp: str, logger: logging.Logger) ->
             CreateTimestampError,
             ParseSignKeysError,
         ) as ex:
+            _count_error(errors, ex)
             logger.exception(
                 f"Unexpected error parsing transaction in{txn['filename']}.\n "
                 f"Skipping transaction and moving to next one:\n {ex}"
@@ -214,12 +321,64 @@ def parse_transaction_v6(chunk: list, timestamp: str, logger: logging.Logger) ->
     return parsed_txns
 
 
+# Parsing engines - the fast engine skips the protobuf -> dict -> pydantic conversions and parses the messages directly
+PARSER_ENGINES = ("pydantic", "fast")
+
+# txn_type of a transaction item -> txn_types reclassify_token_txns can turn it into
+RECLASSIFIED_TXN_TYPES = {
+    "CRYPTOTRANSFER": ("NFTTRANSFER", "TOKENTRANSFERS"),
+    "TOKENWIPE": ("NFTWIPE",),
+    "TOKENBURN": ("NFTBURN",),
+    "TOKENMINT": ("NFTMINT",),
+    "TOKENCREATION": ("NFTCREATION",),
+}
+
+
+@functools.lru_cache(maxsize=None)
+def get_projection_plan(filename: str) -> ProjectionPlan:
+    """
+    Load and compile a projection profile once per process
+
+    :param filename: YAML/JSON projection profile
+
+    :returns: Compiled projection plan
+    """
+    return ProjectionPlan(load_projection_profile(filename), RECLASSIFIED_TXN_TYPES)
+
+
 class RcdParser:
-    def __init__(self):
+    def __init__(
+        self,
+        engine: str = None,
+        bytes_encoding: str = None,
+        output_profile: str = None,
+        decode_in_workers: bool = None,
+        output_schema: str = None,
+    ):
         """
         Constructor - Do All the initializations here.
+
+        :param engine: Parsing engine, one of PARSER_ENGINES (defaults to settings.PARSER_ENGINE)
+        :param bytes_encoding: Encoding of the bytes fields in the output, one of BYTES_ENCODINGS (defaults to
+            settings.BYTES_ENCODING)
+        :param output_profile: YAML/JSON projection profile of the output fields to keep per txn_type (defaults to
+            settings.OUTPUT_PROFILE, all fields are kept if not set)
+        :param decode_in_workers: Load v6 transactions as serialized record stream items, decoded by the workers
+            parsing them, instead of decoding them while loading (defaults to settings.DECODE_IN_WORKERS)
+        :param output_schema: "flat" numbered keys or "compact" arrays for the transfer lists, token transfers and
+            contract logs, one of OUTPUT_SCHEMAS (defaults to settings.OUTPUT_SCHEMA)
         """
         self.logger = logging.getLogger(__name__)
+        self.engine = engine or settings.PARSER_ENGINE
+        if self.engine not in PARSER_ENGINES:
+            raise ValueError(f"Unknown parser engine {self.engine}, expected one of {PARSER_ENGINES}")
+        self.bytes_encoder = get_bytes_encoder(bytes_encoding or settings.BYTES_ENCODING)
+        output_profile = output_profile or settings.OUTPUT_PROFILE
+        self.projection = get_projection_plan(str(output_profile)) if output_profile else None
+        self.decode_in_workers = settings.DECODE_IN_WORKERS if decode_in_workers is None else decode_in_workers
+        self.output_schema = output_schema or settings.OUTPUT_SCHEMA
+        if self.output_schema not in OUTPUT_SCHEMAS:
+            raise ValueError(f"Unknown output schema {self.output_schema}, expected one of {OUTPUT_SCHEMAS}")
 
     def __del__(self):
         """
@@ -269,38 +428,161 @@ class RcdParser:
         :returns objs: List of transcations in file
         :returns version: Version of file format
         """
+        txns, version = self.iter_v6_file(rcd_name, filename)
+        return list(txns), version
+
+    def iter_v6_file(self, rcd_name, filename, batch_size=None):
+        """
+        Open/read protobuf formatted rcd files, converting the transactions lazily
+
+        :param rcd_name: Full pth of file to open/read
+        :param filename: Filename to track in data/logs
+        :param batch_size: Yield lists of up to batch_size transactions instead of single transactions
+
+        :returns txns: Generator of transactions in file
+        :returns version: Version of file format
+        """
         with open(rcd_name, "rb") as f:
             pathlib.Path(f"{rcd_name}_processed").touch()
-            objs = []
-            record_stream_file = record_stream_file_pb2.RecordStreamFile()
-            version = int.from_bytes(f.read(4), "big")
-            f_read = f.read()
-            record_stream_file.ParseFromString(f_read)
-            record_stream_items = record_stream_file.record_stream_items
-            if len(record_stream_items) > 0:
-                objs = []
-                for i in record_stream_items:
-                    transaction_body = transaction_body_pb2.TransactionBody()
-                    if len(i.transaction.signedTransactionBytes) > 0:
-                        signed_transaction = transaction_contents_pb2.SignedTransaction()
-                        signed_transaction.ParseFromString(i.transaction.signedTransactionBytes)
-                        transaction_body.ParseFromString(signed_transaction.bodyBytes)
-                        txn_keys = [list(protobuf_to_dict(k).keys())[-1] for k in signed_transaction.sigMap.sigPair]
-                    else:
-                        transaction_body.ParseFromString(i.transaction.bodyBytes)
-                        txn_keys = [list(protobuf_to_dict(k).keys())[-1] for k in i.transaction.sigMap.sigPair]
-
-                    transaction_record = protobuf_to_dict(i.record)
-                    objs.append(
-                        {
-                            "filename": filename,
-                            "transaction_record": transaction_record,
-                            "transaction_body": protobuf_to_dict(transaction_body),
-                            "txn_sign_keys": txn_keys,
-                        }
-                    )
-
-            return objs, f"v{version}"
+            return self.iter_v6_bytes(f.read(), filename, batch_size)
+
+    def iter_v6_bytes(self, data: bytes, filename, batch_size=None):
+        """
+        Read protobuf formatted rcd file contents that are already in memory, converting the transactions lazily
+
+        :param data: Contents of the rcd file
+        :param filename: Filename to track in data/logs
+        :param batch_size: Yield lists of up to batch_size transactions instead of single transactions
+
+        :returns txns: Generator of transactions in file
+        :returns version: Version of file format
+        """
+        version = int.from_bytes(data[:4], "big")
+        if self.decode_in_workers:
+            # Only split the file into the serialized items, they're decoded by load_record_stream_item
+            txns = (
+                {"filename": filename, "record_stream_item": item}
+                for item in iter_message_fields(memoryview(data)[4:], RECORD_STREAM_ITEMS_FIELD)
+            )
+            return self._batch(txns, batch_size), f"v{version}"
+
+        record_stream_file = record_stream_file_pb2.RecordStreamFile()
+        record_stream_file.ParseFromString(memoryview(data)[4:])
+
+        txns = self._iter_record_stream_items(record_stream_file.record_stream_items, filename)
+        return self._batch(txns, batch_size), f"v{version}"
+
+    def _iter_record_stream_items(self, record_stream_items, filename):
+        """
+        Convert record stream items to transaction dictionaries one at a time
+
+        :param record_stream_items: record stream items of a RecordStreamFile
+        :param filename: Filename to track in data/logs
+
+        :returns: Generator of transactions, without the ones whose signatures can't be read
+        """
+        for i in record_stream_items:
+            try:
+                txn = self.decode_record_stream_item(i, filename)
+            except ParseSignKeysError as ex:
+                metrics.ERRORS.inc(stage="decode", exception=type(ex).__name__)
+                self.logger.exception(
+                    f"Unexpected error decoding transaction in {filename}.\n "
+                    f"Skipping transaction and moving to next one:\n {ex}"
+                )
+                continue
+            yield txn
+
+    def decode_record_stream_item(self, item, filename) -> dict:
+        """
+        Convert a record stream item to a transaction dictionary
+
+        :param item: RecordStreamItem message
+        :param filename: Filename to track in data/logs
+
+        :returns: Transaction dictionary
+        """
+        transaction_body = transaction_body_pb2.TransactionBody()
+        if len(item.transaction.signedTransactionBytes) > 0:
+            signed_transaction = transaction_contents_pb2.SignedTransaction()
+            signed_transaction.ParseFromString(item.transaction.signedTransactionBytes)
+            transaction_body.ParseFromString(signed_transaction.bodyBytes)
+            txn_keys = get_signature_key_types(signed_transaction.sigMap.sigPair)
+        else:
+            transaction_body.ParseFromString(item.transaction.bodyBytes)
+            txn_keys = get_signature_key_types(item.transaction.sigMap.sigPair)
+
+        return {
+            "filename": filename,
+            "transaction_record": self._to_engine_input(item.record),
+            "transaction_body": self._to_engine_input(transaction_body),
+            "transaction_data_type": transaction_body.WhichOneof("data"),
+            "txn_sign_keys": txn_keys,
+        }
+
+    def load_record_stream_item(self, data: bytes, filename) -> dict:
+        """
+        Decode a serialized record stream item split from a record file by a parser with decode_in_workers set
+
+        :param data: Serialized RecordStreamItem
+        :param filename: Filename to track in data/logs
+
+        :returns: Transaction dictionary
+        """
+        item = record_stream_file_pb2.RecordStreamItem()
+        item.ParseFromString(data)
+        return self.decode_record_stream_item(item, filename)
+
+    def _iter_v5_objects(self, f, dis, filename):
+        """
+        Read record stream objects from a v5 rcd file one at a time
+
+        :param f: open rcd file, closed once all objects have been read
+        :param dis: data input stream positioned after the file header
+        :param filename: Filename to track in data/logs
+
+        :returns: Generator of transactions
+        """
+        with f:
+            while dis.available():
+                object = dis.readSerializable(True, None)
+                if isinstance(object, RecordStreamObject):
+                    yield {"filename": filename, "txn_object": object}
+
+    def _to_engine_input(self, message: Message) -> Union[dict, Message]:
+        """
+        Convert a protobuf message to the input of the parsing engine
+
+        :param message: protobuf message
+
+        :returns: The message itself for the fast engine, the message as a dictionary for the pydantic engine
+        """
+        if self.engine == "fast":
+            return message
+        return protobuf_to_dict(message)
+
+    @staticmethod
+    def _batch(txns, batch_size):
+        """
+        Group a generator of transactions into lists of up to batch_size transactions
+
+        :param txns: Generator of transactions
+        :param batch_size: Max num of transactions per list, transactions are passed through as-is if None
+
+        :returns: Generator of transactions or lists of transactions
+        """
+        if batch_size is None:
+            yield from txns
+            return
+
+        batch = []
+        for txn in txns:
+            batch.append(txn)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
 
     def create_v5_transaction_body(self, object: bytes) -> dict:
         """
@@ -322,7 +604,7 @@ class RcdParser:
             else:
                 transaction_body.ParseFromString(transaction.bodyBytes)
 
-            return protobuf_to_dict(transaction_body)
+            return self._to_engine_input(transaction_body)
         except Exception as ex:
             raise CreateTransactionItemError("Unexpected error creating transaction item") from ex
 
@@ -338,118 +620,49 @@ class RcdParser:
             transaction_record = transaction_record_pb2.TransactionRecord()
             transaction_record.ParseFromString(object.transactionRecord)
 
-            return protobuf_to_dict(transaction_record)
+            return self._to_engine_input(transaction_record)
 
         except Exception as ex:
             raise CreateTransactionRecordError("Unexpected error creating transaction record") from ex
 
-    def parse_transaction_item(self, transaction_item_dict: dict) -> dict:
+    def parse_transaction_item(self, transaction_item_dict: Union[dict, Message], data_type: str = None) -> dict:
         """
         Parses info out of the hedera transaction item
 
-        :param transaction_item_dict: dict data collected when a transaction is submitted to the hedera network
+        :param transaction_item_dict: dict data collected when a transaction is submitted to the hedera network, or
+            the TransactionBody protobuf message to parse it with the fast engine
+        :param data_type: Transaction body type (TransactionBody.WhichOneof("data")), looked up if not provided
 
         :returns: Flattened dictionary of relevant info from the transaction item
         """
         try:
+            if isinstance(transaction_item_dict, Message):
+                if data_type is None:
+                    data_type = transaction_item_dict.WhichOneof("data")
+                _, _, fast_parser = TRANSACTION_TYPE_PARSERS.get(data_type, (None, None, None))
+                if fast_parser is None and data_type in TRANSACTION_TYPE_PARSERS:
+                    return self.parse_transaction_item(protobuf_to_dict(transaction_item_dict), data_type)
+                tx_item_output = parse_transaction_item_fast(transaction_item_dict, data_type, fast_parser)
+                return self.encode_bytes_fields(tx_item_output, ITEM_BYTES_FIELDS, tx_item_output.get("txn_type"))
+
             tx_item = TransactionItem(**transaction_item_dict)
             tx_item_common = parseCommon(tx_item)
 
-            if tx_item.consensusSubmitMessage is not None:
-                tx_item_type = parseConsensusSubmitMessage(tx_item.consensusSubmitMessage)
-            elif tx_item.consensusCreateTopic is not None:
-                tx_item_type = parseConsensusCreateTopic(tx_item.consensusCreateTopic)
-            elif tx_item.consensusUpdateTopic is not None:
-                tx_item_type = parseConsensusUpdateTopic(tx_item.consensusUpdateTopic)
-            elif tx_item.consensusDeleteTopic is not None:
-                tx_item_type = parseConsensusDeleteTopic(tx_item.consensusDeleteTopic)
-            elif tx_item.cryptoTransfer is not None:
-                tx_item_type = parseCryptoTransfer(tx_item.cryptoTransfer)
-                if tx_item_type.transferList is not None and tx_item_type.transferList["accountAmounts"] is not None:
-                    transfer_list = parseTransferListItem(tx_item_type.transferList)
-                    tx_item_type = {
-                        **tx_item_type.dict(exclude_none=True),
-                        **transfer_list,
-                    }
-                    del tx_item_type["transferList"]
-            elif tx_item.cryptoCreateAccount is not None:
-                tx_item_type = parseCryptoCreateAccount(tx_item.cryptoCreateAccount)
-            elif tx_item.cryptoUpdateAccount is not None:
-                tx_item_type = parseCryptoUpdateAccount(tx_item.cryptoUpdateAccount)
-            elif tx_item.cryptoDelete is not None:
-                tx_item_type = parseCryptoDelete(tx_item.cryptoDelete)
-            elif tx_item.fileUpdate is not None:
-                tx_item_type = parseFileUpdate(tx_item.fileUpdate)
-            elif tx_item.fileAppend is not None:
-                tx_item_type = parseFileAppend(tx_item.fileAppend)
-            elif tx_item.fileDelete is not None:
-                tx_item_type = parseFileDelete(tx_item.fileDelete)
-            elif tx_item.fileCreate is not None:
-                tx_item_type = parseFileCreate(tx_item.fileCreate)
-            elif tx_item.scheduleSign is not None:
-                tx_item_type = parseScheduleSign(tx_item.scheduleSign)
-            elif tx_item.scheduleCreate is not None:
-                tx_item_type = parseScheduleCreate(tx_item.scheduleCreate)
-            elif tx_item.scheduleDelete is not None:
-                tx_item_type = parseScheduleDelete(tx_item.scheduleDelete)
-            elif tx_item.tokenCreation is not None:
-                tx_item_type = parseTokenCreation(tx_item.tokenCreation)
-            elif tx_item.tokenAssociate is not None:
-                tx_item_type = parseTokenAssociate(tx_item.tokenAssociate)
-                token_list = parseTokenList(tx_item_type.tokenList)
-                tx_item_type = {
-                    **tx_item_type.dict(exclude_none=True),
-                    **token_list,
-                }
-                del tx_item_type["tokenList"]
-            elif tx_item.tokenDissociate is not None:
-                tx_item_type = parseTokenDissociate(tx_item.tokenDissociate)
-                token_list = parseTokenList(tx_item_type.tokenList)
-                tx_item_type = {
-                    **tx_item_type.dict(exclude_none=True),
-                    **token_list,
-                }
-                del tx_item_type["tokenList"]
-            elif tx_item.tokenGrantKyc is not None:
-                tx_item_type = parseTokenGrantKyc(tx_item.tokenGrantKyc)
-            elif tx_item.tokenRevokeKyc is not None:
-                tx_item_type = parseTokenRevokeKyc(tx_item.tokenRevokeKyc)
-            elif tx_item.tokenMint is not None:
-                tx_item_type = parseTokenMint(tx_item.tokenMint)
-            elif tx_item.tokenFreeze is not None:
-                tx_item_type = parseTokenFreeze(tx_item.tokenFreeze)
-            elif tx_item.tokenUnfreeze is not None:
-                tx_item_type = parseTokenUnfreeze(tx_item.tokenUnfreeze)
-            elif tx_item.tokenPause is not None:
-                tx_item_type = parseTokenPause(tx_item.tokenPause)
-            elif tx_item.tokenUnpause is not None:
-                tx_item_type = parseTokenUnpause(tx_item.tokenUnpause)
-            elif tx_item.tokenDeletion is not None:
-                tx_item_type = parseTokenDeletion(tx_item.tokenDeletion)
-            elif tx_item.tokenUpdate is not None:
-                tx_item_type = parseTokenUpdate(tx_item.tokenUpdate)
-            elif tx_item.tokenBurn is not None:
-                tx_item_type = parseTokenBurn(tx_item.tokenBurn)
-            elif tx_item.tokenWipe is not None:
-                tx_item_type = parseTokenWipe(tx_item.tokenWipe)
-            elif tx_item.contractCreateInstance is not None:
-                tx_item_type = parseContractCreateInstance(tx_item.contractCreateInstance)
-            elif tx_item.contractUpdateInstance is not None:
-                tx_item_type = parseContractUpdateInstance(tx_item.contractUpdateInstance)
-            elif tx_item.contractCall is not None:
-                tx_item_type = parseContractCall(tx_item.contractCall)
-            elif tx_item.contractDeleteInstance is not None:
-                tx_item_type = parseContractDelete(tx_item.contractDeleteInstance)
-            elif tx_item.ethereumTransaction is not None:
-                tx_item_type = parseEthereumTransaction(tx_item.ethereumTransaction)
-            elif tx_item.cryptoApproveAllowance is not None:
-                tx_item_type = parseCryptoApproveAllowance(tx_item.cryptoApproveAllowance)
-            elif tx_item.cryptoDeleteAllowance is not None:
-                tx_item_type = parseCryptoDeleteAllowance(tx_item.cryptoDeleteAllowance)
-            elif tx_item.token_fee_schedule_update is not None:
-                tx_item_type = parseTokenFeeScheduleUpdate(tx_item.token_fee_schedule_update)
-            elif tx_item.node_stake_update is not None:
-                tx_item_type = parseNodeStakeUpdate(tx_item.node_stake_update)
+            if data_type not in TRANSACTION_TYPE_PARSERS:
+                data_type = get_transaction_data_type(transaction_item_dict)
+
+            tx_item_data = None
+            if data_type is not None:
+                # Types that aren't part of the TransactionItem model are passed to their parser as raw dicts
+                tx_item_data = getattr(tx_item, data_type, None)
+                if tx_item_data is None:
+                    tx_item_data = transaction_item_dict.get(data_type)
+
+            if tx_item_data is not None:
+                parser, post_process, _ = TRANSACTION_TYPE_PARSERS[data_type]
+                tx_item_type = parser(tx_item_data)
+                if post_process is not None:
+                    tx_item_type = post_process(tx_item_type)
             else:
                 unknown_type = UnknownType(**{"txn_type": "OTHER"})
                 tx_item_type = parseUnknownType(unknown_type)
@@ -465,7 +678,7 @@ class RcdParser:
                     **tx_item_type.dict(by_alias=True, exclude_none=True),
                 }
 
-            return tx_item_output
+            return self.encode_bytes_fields(tx_item_output, ITEM_BYTES_FIELDS, tx_item_output.get("txn_type"))
 
         except AttributeError:
             raise
@@ -476,15 +689,24 @@ class RcdParser:
         except Exception as ex:
             raise ParseTxnItemError("Unexpected error parsing transaction item") from ex
 
-    def parse_transaction_record(self, transaction_record_dict: dict) -> dict:
+    def parse_transaction_record(self, transaction_record_dict: Union[dict, Message], txn_type: str = None) -> dict:
         """
         Parses info out of the hedera transaction record
 
-        :param transaction_record_dict: dict of data collected after a transaction is processed by the hedera network
+        :param transaction_record_dict: dict of data collected after a transaction is processed by the hedera network,
+            or the TransactionRecord protobuf message to parse it with the fast engine
+        :param txn_type: txn_type of the parsed transaction item, the nested fields (RECORD_BYTES_FIELDS) the
+            projection profile drops for it aren't converted - flat fields are removed later by project_fields
 
         :returns: Flattened dictionary of relevant info from the transaction item
         """
         try:
+            if isinstance(transaction_record_dict, Message):
+                tx_record_output = parse_transaction_record_fast(
+                    transaction_record_dict, self.skipped_fields(RECORD_BYTES_FIELDS, txn_type)
+                )
+                return self.encode_bytes_fields(tx_record_output, RECORD_BYTES_FIELDS, txn_type)
+
             tx_record = TransactionRecord(**transaction_record_dict)
             tx_record_common = parseTxRecord(tx_record).dict(by_alias=True, exclude_none=True)
             tx_record_output = tx_record_common
@@ -505,7 +727,7 @@ class RcdParser:
                 smart_contract_info = parseSmartContractInfo(tx_record.contractCallResult)
                 tx_record_output = {**tx_record_output, **smart_contract_info}
 
-            return tx_record_output
+            return self.encode_bytes_fields(tx_record_output, RECORD_BYTES_FIELDS, txn_type)
 
         except AttributeError:
             raise
@@ -516,6 +738,63 @@ class RcdParser:
         except Exception as ex:
             raise ParseTxnRecordError("Unexpected error parsing transaction record") from ex
 
+    def skipped_fields(self, fields: set, txn_type: str = None) -> frozenset:
+        """
+        Nested fields the projection profile drops for a txn_type, skipped before conversion
+
+        :param fields: Output fields to check
+        :param txn_type: txn_type of the parsed transaction item, nothing is dropped if None
+
+        :returns: Fields of fields that don't have to be converted
+        """
+        if self.projection is None or txn_type is None:
+            return frozenset()
+        return frozenset(field for field in fields if not self.projection.needs(txn_type, field))
+
+    def encode_bytes_fields(self, output: dict, bytes_fields: set, txn_type: str = None) -> dict:
+        """
+        Encode the fields of a parsed transaction that hold bytes with the configured bytes encoding - fields the
+        projection profile drops are removed instead
+
+        :param output: Flattened dictionary of a parsed transaction item or record
+        :param bytes_fields: Output fields that hold bytes
+        :param txn_type: txn_type of the parsed transaction item
+
+        :returns: Flattened dictionary with the bytes fields encoded
+        """
+        skipped_fields = self.skipped_fields(bytes_fields, txn_type)
+        for field in bytes_fields:
+            if field in output:
+                if field in skipped_fields:
+                    del output[field]
+                elif self.bytes_encoder is not None:
+                    output[field] = encode_nested_bytes(output[field], self.bytes_encoder)
+        return output
+
+    def project_fields(self, d: dict) -> dict:
+        """
+        Restrict a parsed transaction to the output fields of its txn_type in the projection profile
+
+        :param d: Flattened dictionary of the parsed transaction, after reclassification
+
+        :returns: Flattened dictionary with only the fields to output
+        """
+        if self.projection is None:
+            return d
+        return self.projection.project(d)
+
+    def compact_fields(self, d: dict) -> dict:
+        """
+        Replace the numbered keys of a parsed transaction with the arrays of the compact output schema
+
+        :param d: Flattened dictionary of the parsed transaction, after projection
+
+        :returns: d with the flat output schema, the compact dictionary otherwise
+        """
+        if self.output_schema != "compact":
+            return d
+        return compact_txn(d)
+
     def reclassify_token_txns(self, d: dict) -> dict:
         """
         By default, fungible token transactions are the same as nfts in the hedera transaction record/item - logic
@@ -600,14 +879,9 @@ class RcdParser:
         """
         try:
             if nanos is not None:
-                ts = (
-                    pendulum.from_timestamp(int(str(seconds))).isoformat("T")[:19]
-                    + "."
-                    + str(round(int(str(nanos)) / 10**6))
-                    + "Z"
-                )
+                ts = format_epoch_seconds(int(seconds)) + "." + str(round(int(nanos) / 10**6)) + "Z"
             else:
-                ts = pendulum.from_timestamp(seconds).isoformat("T")[:19] + ".000Z"
+                ts = format_epoch_seconds(int(seconds)) + ".000Z"
             return ts
 
         except Exception as ex:
@@ -624,8 +898,31 @@ class RcdParser:
         :returns objs: List of transcations in file
         :returns version: Version of file format
         """
+        loaded = self.iter_txns(filename, path)
+        if loaded is not None:
+            txns, version = loaded
+            try:
+                return list(txns), version
+            except LOAD_TXNS_ERRORS as ex:
+                self.log_load_txns_error(filename, ex)
+
+    def iter_txns(self, filename, path, batch_size=None):
+        """
+        Streaming version of load_txns - the file is opened and its header validated straight away, but the
+        transactions are only decoded as the returned generator is consumed
+
+        :param filename: The recordstream/RCD file to be loaded
+        :param path: Path to recordstream/RCD file
+        :param batch_size: Yield lists of up to batch_size transactions instead of single transactions
+
+        :returns txns: Generator of transactions in file
+        :returns version: Version of file format
+        """
         try:
-            if filename.split(".")[-2] == "rcd":
+            if filename.split(".")[-2] == "rcd" and settings.RCD_GZ_IN_MEMORY:
+                with gzip.open(filename, "rb") as f_in:
+                    return self.iter_v6_bytes(f_in.read(), filename, batch_size)
+            elif filename.split(".")[-2] == "rcd":
                 rcd_file_basename = os.path.basename(filename)
                 index = rcd_file_basename.rindex(".")
                 rcd_name = path + rcd_file_basename[:index]
@@ -633,25 +930,33 @@ class RcdParser:
                     with open(rcd_name, "wb") as f_out:
                         shutil.copyfileobj(f_in, f_out)
                     f_out.close()
-                return self.read_v6_file(rcd_name, filename)
+                return self.iter_v6_file(rcd_name, filename, batch_size)
             else:
-                with open(filename, "rb") as f:
-                    objs = []
+                f = open(filename, "rb")
+                try:
                     dis = SerializableDataInputStream(f)
                     self.check_version(dis, filename)
-                    while dis.available():
-                        object = dis.readSerializable(True, None)
-                        if isinstance(object, RecordStreamObject):
-                            objs.append({"filename": filename, "txn_object": object})
-                    return objs, "v5"
+                except BaseException:
+                    f.close()
+                    raise
+                return self._batch(self._iter_v5_objects(f, dis, filename), batch_size), "v5"
+
+        except LOAD_TXNS_ERRORS as ex:
+            self.log_load_txns_error(filename, ex)
+
+    def log_load_txns_error(self, filename: str, ex: Exception) -> None:
+        """
+        Log an error raised while loading the transactions of an rcd file
 
-        except FileNotFoundError as ex:
+        :param filename: The recordstream/RCD file being loaded
+        :param ex: Exception raised
+        """
+        metrics.ERRORS.inc(stage="load", exception=type(ex).__name__)
+        if isinstance(ex, FileNotFoundError):
             self.logger.exception(f"{filename} not found: {ex}")
-        except AssertionError as ex:
+        elif isinstance(ex, AssertionError):
             self.logger.exception(f"Mismatch between expected record format version found in {filename}:\n {ex}")
-        except RecordFormatVersionError as ex:
+        elif isinstance(ex, RecordFormatVersionError):
             self.logger.exception(f"Unexpected error when checking record version in {filename}:\n {ex}")
-        except NameError as ex:
-            self.logger.exception(f"{ex}")
-        except AttributeError as ex:
+        else:
             self.logger.exception(f"{ex}")
@@ -0,0 +1,461 @@
+"""
+Segmented output - the parsed transactions are written to compressed JSON lines segments partitioned by consensus hour
+instead of being appended to one ever-growing recordstreams.json
+
+    recordstreams/
+        manifest.jsonl                  segments with their committed size, transactions and consensus time range
+        2022/10/14/00-00001.jsonl.gz    transactions of 2022-10-14 00:00 - 01:00
+        2022/10/14/00-00002.jsonl.gz    once 00-00001 reached OUTPUT_SEGMENT_MAX_BYTES or OUTPUT_SEGMENT_MAX_SECONDS
+
+Segments are compressed while they are written, with gzip or zstd (needs zstandard). Every commit ends the gzip member
+(or zstd frame) of the segments written to, fsyncs them and appends their committed size, transaction count and time
+range to the manifest - a segment is a sequence of complete members, readable up to its committed size while it is
+still written to. The record files are only marked as processed once their transactions are committed.
+
+On start, the segments still open in the manifest are truncated to their committed size and closed, and the segments
+that were never committed are removed - their record files are parsed again.
+
+Readers open the segments of a time range from the manifest:
+
+    for segment in find_segments("outputs/recordstreams", "2022-10-14T00:00:00Z", "2022-10-14T06:00:00Z"):
+        for txn in read_segment(segment["path"], segment["bytes"]):
+            ...
+"""
+
+import datetime
+import glob
+import gzip
+import io
+import json
+import logging
+import os
+import time
+from typing import BinaryIO, Iterator, List, Optional
+
+import pendulum
+
+from hedera.config import settings
+from hedera.errors import SegmentOutputError
+from hedera.util.json_lines import encode_lines
+
+SEGMENT_COMPRESSIONS = ("gzip", "zstd")
+
+SEGMENT_EXTENSIONS = {"gzip": ".jsonl.gz", "zstd": ".jsonl.zst"}
+
+MANIFEST = "manifest.jsonl"
+
+# Partition of the transactions without a consensus time, unknown-00001.jsonl.gz, ...
+UNKNOWN_PARTITION = "unknown"
+
+
+def _import_zstandard():
+    try:
+        import zstandard
+    except ImportError as ex:
+        raise SegmentOutputError("zstd segments need zstandard (poetry install -E zstd)") from ex
+    return zstandard
+
+
+def get_consensus_ns(txn: dict) -> Optional[int]:
+    """
+    :param txn: Parsed transaction
+
+    :returns: Consensus time of the transaction in nanoseconds since the epoch, None if it doesn't have one
+    """
+    seconds = txn.get("record.consensusTimestamp.seconds")
+    if seconds is not None:
+        return int(seconds) * 10**9 + int(txn.get("record.consensusTimestamp.nanos") or 0)
+    consensus_time = txn.get("consensusTimestamp")
+    if consensus_time:
+        return _parse_time(consensus_time)
+    return None
+
+
+def _parse_time(value: str) -> int:
+    """
+    :param value: Time, e.g. 2022-10-14T00:00:00.626345694Z or 2022-10-14
+
+    :returns: Nanoseconds since the epoch
+    """
+    parsed = pendulum.parse(value, tz="UTC")
+    fraction = value[20:].rstrip("Z") if len(value) > 20 and value[19] == "." else ""
+    nanos = int(fraction.ljust(9, "0")[:9]) if fraction.isdigit() else parsed.microsecond * 1000
+    return int(parsed.replace(microsecond=0).timestamp()) * 10**9 + nanos
+
+
+def format_consensus_ns(ns: Optional[int]) -> Optional[str]:
+    """
+    :returns: Consensus time as 2022-10-14T00:00:00.626345694Z, ordered like the times it formats
+    """
+    if ns is None:
+        return None
+    seconds, nanos = divmod(ns, 10**9)
+    return f"{datetime.datetime.fromtimestamp(seconds, datetime.timezone.utc):%Y-%m-%dT%H:%M:%S}.{nanos:09d}Z"
+
+
+def segment_partition(consensus_ns: Optional[int]) -> str:
+    """
+    :returns: Hour partition of a consensus time, e.g. 2022/10/14/00
+    """
+    if consensus_ns is None:
+        return UNKNOWN_PARTITION
+    return f"{datetime.datetime.fromtimestamp(consensus_ns // 10**9, datetime.timezone.utc):%Y/%m/%d/%H}"
+
+
+class Segment:
+    """
+    Compressed JSON lines segment of an hour partition
+    """
+
+    def __init__(self, directory: str, name: str, compression: str):
+        """
+        :param directory: Output directory
+        :param name: Segment path relative to the output directory, e.g. 2022/10/14/00-00001.jsonl.gz
+        :param compression: "gzip" or "zstd"
+        """
+        self.name = name
+        self.path = os.path.join(directory, name)
+        self.compression = compression
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.raw = open(self.path, "xb")
+        self.stream = None
+        self.opened = time.monotonic()
+        self.txns = 0
+        self.start_ns = None
+        self.end_ns = None
+        # Transactions of the segment in the manifest
+        self.committed = 0
+
+    def write(self, data: bytes, txns: int, start_ns: Optional[int], end_ns: Optional[int]) -> None:
+        """
+        :param data: Encoded JSON lines
+        :param txns: Number of transactions in data
+        :param start_ns: First consensus time of the transactions
+        :param end_ns: Last consensus time of the transactions
+        """
+        if self.stream is None:
+            if self.compression == "zstd":
+                self.stream = _import_zstandard().ZstdCompressor().stream_writer(self.raw, closefd=False)
+            else:
+                self.stream = gzip.GzipFile(filename="", mode="wb", compresslevel=6, fileobj=self.raw, mtime=0)
+        self.stream.write(data)
+        self.txns += txns
+        if start_ns is not None:
+            self.start_ns = start_ns if self.start_ns is None else min(self.start_ns, start_ns)
+            self.end_ns = end_ns if self.end_ns is None else max(self.end_ns, end_ns)
+
+    def size(self) -> int:
+        """
+        :returns: Compressed bytes written so far
+        """
+        return self.raw.tell()
+
+    def end_member(self) -> None:
+        """
+        End the gzip member (zstd frame) being written and fsync the segment
+        """
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+        self.raw.flush()
+        os.fsync(self.raw.fileno())
+
+    def close(self) -> None:
+        self.end_member()
+        self.raw.close()
+
+    def entry(self, status: str) -> dict:
+        """
+        :param status: "open" or "closed"
+
+        :returns: Manifest entry of the segment
+        """
+        return {
+            "segment": self.name,
+            "status": status,
+            "bytes": self.size() if not self.raw.closed else os.path.getsize(self.path),
+            "txns": self.txns,
+            "start": format_consensus_ns(self.start_ns),
+            "end": format_consensus_ns(self.end_ns),
+        }
+
+
+class SegmentedOutput:
+    """
+    Output writing the transactions to compressed segments rotated by size or age. Used as the pipeline's progress
+    tracking, so that files are only finished once their transactions are committed
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        progress,
+        compression: str = None,
+        max_bytes: int = None,
+        max_seconds: float = None,
+        logger: logging.Logger = None,
+    ):
+        """
+        :param directory: Output directory, created if needed
+        :param progress: Progress tracking of the files, MarkerProgress or ProgressIndex
+        :param compression: "gzip" or "zstd" (defaults to settings.OUTPUT_SEGMENT_COMPRESSION)
+        :param max_bytes: A segment is closed once it holds this many compressed bytes (defaults to
+            settings.OUTPUT_SEGMENT_MAX_BYTES)
+        :param max_seconds: A segment is closed once it is this many seconds old (defaults to
+            settings.OUTPUT_SEGMENT_MAX_SECONDS)
+        :param logger: logger
+        """
+        self.compression = compression or settings.OUTPUT_SEGMENT_COMPRESSION
+        if self.compression not in SEGMENT_COMPRESSIONS:
+            raise ValueError(
+                f"Unknown segment compression {self.compression}, expected one of {', '.join(SEGMENT_COMPRESSIONS)}"
+            )
+        if self.compression == "zstd":
+            _import_zstandard()
+        self.directory = directory
+        self.progress = progress
+        self.max_bytes = int(max_bytes or settings.OUTPUT_SEGMENT_MAX_BYTES)
+        self.max_seconds = float(max_seconds or settings.OUTPUT_SEGMENT_MAX_SECONDS)
+        self.logger = logger or logging.getLogger(__name__)
+        self.manifest = os.path.join(directory, MANIFEST)
+        os.makedirs(directory, exist_ok=True)
+
+        # Open segment of each partition, segments closed since the last commit
+        self.segments = {}
+        self.rotated = []
+        # Last segment number of each partition
+        self.sequences = {}
+        # Files whose transactions are written once the segments are committed - (path, txn_count)
+        self.finishing = []
+        self.committed_txns = 0
+        self.recover()
+
+    def recover(self) -> None:
+        """
+        Truncate the segments still open in the manifest to their committed size and close them, remove the segments
+        that were never committed
+        """
+        if os.path.exists(self.manifest):
+            with open(self.manifest, "r+b") as f:
+                data = f.read()
+                # A manifest entry cut short by a crash
+                if not data.endswith(b"\n") and data:
+                    f.truncate(data.rfind(b"\n") + 1)
+        entries = read_manifest(self.directory)
+        closed = []
+        for entry in entries:
+            path = os.path.join(self.directory, entry["segment"])
+            if entry["status"] == "open" and os.path.exists(path):
+                self.logger.warning(f"Truncating {path} to its committed {entry['bytes']} bytes")
+                with open(path, "r+b") as f:
+                    f.truncate(entry["bytes"])
+                    os.fsync(f.fileno())
+                closed.append({**entry, "status": "closed"})
+            partition, sequence = entry["segment"].split(".")[0].rsplit("-", 1)
+            self.sequences[partition] = max(self.sequences.get(partition, 0), int(sequence))
+        if closed:
+            self._append_manifest(closed)
+
+        known = {entry["segment"] for entry in entries}
+        for extension in SEGMENT_EXTENSIONS.values():
+            for path in glob.glob(os.path.join(self.directory, "**", f"*{extension}"), recursive=True):
+                if os.path.relpath(path, self.directory) not in known:
+                    self.logger.warning(f"Removing uncommitted segment {path}")
+                    os.remove(path)
+
+    def _append_manifest(self, entries: List[dict]) -> None:
+        with open(self.manifest, "ab") as f:
+            f.write(encode_lines(entries))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def start(self, path: str) -> int:
+        """
+        Mark a file as being processed
+
+        :returns: 0, a file is written again from its first transaction
+        """
+        self.progress.start(path)
+        return 0
+
+    def write(self, txns: list) -> None:
+        """
+        Write parsed transactions to the segments of their consensus hours, closing the segments that are due
+        """
+        partitions = {}
+        for txn in txns:
+            consensus_ns = get_consensus_ns(txn)
+            partitions.setdefault(segment_partition(consensus_ns), []).append((consensus_ns, txn))
+        for partition, partition_txns in partitions.items():
+            times = [consensus_ns for consensus_ns, _ in partition_txns if consensus_ns is not None]
+            segment = self._segment(partition)
+            segment.write(
+                encode_lines(txn for _, txn in partition_txns),
+                len(partition_txns),
+                min(times) if times else None,
+                max(times) if times else None,
+            )
+            if self._due(segment):
+                self._rotate(partition)
+
+    def _segment(self, partition: str) -> Segment:
+        if partition not in self.segments:
+            self.sequences[partition] = self.sequences.get(partition, 0) + 1
+            name = f"{partition}-{self.sequences[partition]:05d}{SEGMENT_EXTENSIONS[self.compression]}"
+            self.segments[partition] = Segment(self.directory, name, self.compression)
+        return self.segments[partition]
+
+    def _due(self, segment: Segment) -> bool:
+        return segment.size() >= self.max_bytes or time.monotonic() - segment.opened >= self.max_seconds
+
+    def _rotate(self, partition: str) -> None:
+        segment = self.segments.pop(partition)
+        segment.close()
+        self.rotated.append(segment)
+
+    def written(self, segments: list) -> None:
+        pass
+
+    def finish(self, path: str, txn_count: int, output_offset: int = None) -> None:
+        """
+        Mark a file as processed once its transactions are committed
+        """
+        self.finishing.append((path, txn_count))
+
+    def commit(self) -> None:
+        """
+        Commit the segments written to in the manifest, closing the segments that are due, and mark the files whose
+        transactions they hold as processed
+        """
+        for partition, segment in list(self.segments.items()):
+            if self._due(segment):
+                self._rotate(partition)
+        entries = [segment.entry("closed") for segment in self.rotated]
+        written = [segment for segment in self.segments.values() if segment.txns > segment.committed]
+        for segment in written:
+            segment.end_member()
+            entries.append(segment.entry("open"))
+        if entries:
+            self._append_manifest(entries)
+        for segment in self.rotated + written:
+            self.committed_txns += segment.txns - segment.committed
+            segment.committed = segment.txns
+        self.rotated.clear()
+        for path, txn_count in self.finishing:
+            self.progress.finish(path, txn_count)
+        self.finishing.clear()
+
+    def tell(self) -> int:
+        """
+        :returns: Number of transactions committed
+        """
+        return self.committed_txns
+
+    def close(self) -> None:
+        """
+        Close the segments - if any transactions aren't committed, the segments are left open in the manifest for
+        recover() to truncate on the next start
+        """
+        uncommitted = self.rotated or any(segment.txns > segment.committed for segment in self.segments.values())
+        if not uncommitted:
+            entries = []
+            for segment in self.segments.values():
+                segment.close()
+                entries.append(segment.entry("closed"))
+            if entries:
+                self._append_manifest(entries)
+        else:
+            for segment in self.segments.values():
+                segment.raw.close()
+        self.segments.clear()
+        self.rotated.clear()
+
+
+def read_manifest(directory: str) -> List[dict]:
+    """
+    :param directory: Segmented output directory
+
+    :returns: Last manifest entry of each segment, in the order the segments were created
+    """
+    entries = {}
+    path = os.path.join(directory, MANIFEST)
+    if not os.path.exists(path):
+        return []
+    with open(path, "rb") as f:
+        for line in f:
+            if line.endswith(b"\n"):
+                entry = json.loads(line)
+                entries[entry["segment"]] = entry
+    return list(entries.values())
+
+
+def find_segments(directory: str, start: str = None, end: str = None) -> List[dict]:
+    """
+    Committed segments holding transactions of a consensus time range
+
+    :param directory: Segmented output directory
+    :param start: Start of the range, e.g. 2022-10-14T00:00:00Z or 2022-10-14 (no start if None)
+    :param end: End of the range, included (no end if None)
+
+    :returns: Manifest entries of the segments, with their "path"
+    """
+    start = format_consensus_ns(_parse_time(start)) if start else None
+    end = format_consensus_ns(_parse_time(end)) if end else None
+    segments = []
+    for entry in read_manifest(directory):
+        if not entry["txns"]:
+            continue
+        if (start or end) and entry["start"] is None:
+            continue
+        if (start and entry["end"] < start) or (end and entry["start"] > end):
+            continue
+        if not os.path.exists(os.path.join(directory, entry["segment"])):
+            # Removed by retention
+            continue
+        segments.append({**entry, "path": os.path.join(directory, entry["segment"])})
+    return segments
+
+
+class _LimitedReader(io.RawIOBase):
+    """
+    First length bytes of a file
+    """
+
+    def __init__(self, f: BinaryIO, length: int):
+        self.f = f
+        self.remaining = length
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        n = self.f.readinto(memoryview(b)[: min(len(b), self.remaining)])
+        self.remaining -= n
+        return n
+
+
+def read_segment(path: str, length: int = None) -> Iterator[dict]:
+    """
+    :param path: Segment file
+    :param length: Committed size of the segment (from the manifest), the whole file if None
+
+    :returns: Iterator of the transactions of the segment
+    """
+    with open(path, "rb") as f:
+        raw = io.BufferedReader(_LimitedReader(f, os.path.getsize(path) if length is None else length))
+        if path.endswith(SEGMENT_EXTENSIONS["zstd"]):
+            stream = _import_zstandard().ZstdDecompressor().stream_reader(raw, read_across_frames=True)
+        else:
+            stream = gzip.GzipFile(fileobj=raw, mode="rb")
+        pending = b""
+        while True:
+            chunk = stream.read(1024 * 1024)
+            if not chunk:
+                break
+            lines = (pending + chunk).split(b"\n")
+            pending = lines.pop()
+            for line in lines:
+                if line:
+                    yield json.loads(line)
+        if pending:
+            yield json.loads(pending)
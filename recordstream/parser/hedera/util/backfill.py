@@ -0,0 +1,151 @@
+"""
+Backfill ranges - a range of record file times split into day or hour partitions, processed concurrently
+
+    partitions = backfill_partitions("2022-10-14", "2022-10-16", "day")
+    results = run_partitions(partitions, process, parallelism=4)
+    print(format_backfill_summary(results))
+
+process is called with each partition and returns the number of files (and transactions) it processed, the
+partitions are processed by a thread pool and the results are returned in partition order, with the partitions that
+failed reporting their error instead of stopping the others.
+"""
+
+import concurrent.futures
+import logging
+import os
+import time
+from typing import Callable, List
+
+import pendulum
+
+from hedera.errors import BackfillError
+
+BACKFILL_PARTITIONS = ("day", "hour")
+
+_PARTITION_FORMATS = {"day": "YYYY-MM-DD", "hour": "YYYY-MM-DDTHH"}
+
+
+class BackfillPartition:
+    """
+    Day or hour of record files of a backfill range
+    """
+
+    def __init__(self, start: pendulum.DateTime, granularity: str):
+        """
+        :param start: Start of the partition
+        :param granularity: "day" or "hour"
+        """
+        self.start = start
+        self.granularity = granularity
+        # Record file names start with their time, e.g. 2022-10-14T01_00_00.626345694Z.rcd.gz, so the partition's
+        # label is also the prefix of its file names (and of its blob names in the bucket)
+        self.label = start.format(_PARTITION_FORMATS[granularity])
+
+    def __repr__(self) -> str:
+        return f"BackfillPartition({self.label})"
+
+    def directory(self, root: str) -> str:
+        """
+        :param root: Directory holding the year/month/day directories of the record files
+
+        :returns: Day directory of the partition's record files
+        """
+        return f"{root}{self.start.format('YYYY')}/{self.start.format('MM')}/{self.start.format('DD')}/"
+
+    def matches(self, path: str) -> bool:
+        """
+        :returns: True if the record file belongs to the partition
+        """
+        return os.path.basename(path).startswith(self.label)
+
+
+def backfill_partitions(start: str, end: str = None, granularity: str = "day") -> List[BackfillPartition]:
+    """
+    Split a range of record file times into partitions
+
+    :param start: First day or hour of the range, e.g. 2022-10-14 or 2022-10-14T01
+    :param end: Last day or hour of the range, included (defaults to start)
+    :param granularity: "day" or "hour" partitions
+
+    :returns: List of partitions, in time order
+    """
+    if granularity not in BACKFILL_PARTITIONS:
+        raise ValueError(f"Unknown backfill partition {granularity}, expected one of {', '.join(BACKFILL_PARTITIONS)}")
+    try:
+        first = pendulum.parse(start, tz="UTC").start_of(granularity)
+        last = pendulum.parse(end or start, tz="UTC").start_of(granularity)
+    except ValueError as ex:
+        raise BackfillError(f"Invalid backfill range {start} - {end}") from ex
+    if last < first:
+        raise BackfillError(f"Backfill range ends before it starts: {start} - {end}")
+    starts = pendulum.period(first, last).range(f"{granularity}s")
+    return [BackfillPartition(partition_start, granularity) for partition_start in starts]
+
+
+def run_partitions(
+    partitions: List[BackfillPartition],
+    process: Callable[[BackfillPartition], dict],
+    parallelism: int = 1,
+    logger: logging.Logger = None,
+) -> List[dict]:
+    """
+    Process the partitions concurrently
+
+    :param partitions: Partitions of the backfill range
+    :param process: Called with each partition, returns a dict with the number of "files" and "txns" it processed
+    :param parallelism: Number of partitions processed at the same time
+    :param logger: logger
+
+    :returns: List of results - partition, files, txns, seconds and error (None if the partition succeeded) - in
+        partition order
+    """
+    logger = logger or logging.getLogger(__name__)
+
+    def run(partition: BackfillPartition) -> dict:
+        start = time.monotonic()
+        result = {"partition": partition.label, "files": 0, "txns": None, "seconds": 0.0, "error": None}
+        logger.info(f"Backfilling {partition.label}")
+        try:
+            result.update(process(partition))
+        except Exception as ex:
+            logger.exception(f"Error backfilling {partition.label}")
+            result["error"] = str(ex) or type(ex).__name__
+        result["seconds"] = round(time.monotonic() - start, 3)
+        logger.info(f"Backfilled {partition.label}: {result['files']} files in {result['seconds']} seconds")
+        return result
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, int(parallelism))) as executor:
+        return list(executor.map(run, partitions))
+
+
+def format_backfill_summary(results: List[dict]) -> str:
+    """
+    :param results: Results of run_partitions
+
+    :returns: Table of the files and transactions of each partition, with the totals
+    """
+    rows = [
+        [
+            result["partition"],
+            str(result["files"]),
+            "-" if result["txns"] is None else str(result["txns"]),
+            f"{result['seconds']:.1f}s",
+            f"failed: {result['error']}" if result["error"] else "ok",
+        ]
+        for result in results
+    ]
+    txns = [result["txns"] for result in results if result["txns"] is not None]
+    failed = sum(1 for result in results if result["error"])
+    rows.append(
+        [
+            "total",
+            str(sum(result["files"] for result in results)),
+            str(sum(txns)) if txns else "-",
+            "",
+            f"{failed} failed" if failed else "ok",
+        ]
+    )
+    header = ["partition", "files", "txns", "time", "status"]
+    widths = [max(len(row[i]) for row in rows + [header]) for i in range(len(header))]
+    lines = ["  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip() for row in [header] + rows]
+    return "\n".join(lines)
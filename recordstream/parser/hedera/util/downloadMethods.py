@@ -24,6 +24,7 @@ from hedera.errors import (
     GetBlobMetadataError,
     GetMarkerError,
 )
+from hedera.util import metrics
 
 
 class GoogleDownloader:
@@ -32,7 +33,7 @@ class GoogleDownloader:
         Constructor - Do All the initializations here.
         """
         self.logger = logging.getLogger(__name__)
-    
+
         try:
             if not os.path.isfile(json_file_name):
                 with jsonlines.open(json_file_name, mode="w") as jj:
@@ -343,7 +344,8 @@ class GoogleDownloader:
         marker=None,
         metadata=False,
         file_time=None,
-    ):
+        follow=True,
+    ) -> int:
         """
         This method is an entry point of the main execution logic of the script.
         Includes logic and calls all the methods needed
@@ -358,7 +360,12 @@ class GoogleDownloader:
         :param marker: Marker to scan specific date for blobs, default is current date
         :param metadata: Collect metadata or not, default is to not collect metadata
         :param file_time: File time in blob name (used to limit amount of files downloaded)
+        :param follow: Move the marker to the current date once every file is downloaded and scan again, a single scan
+            of the marker (a backfill partition) otherwise
+
+        :returns: Number of files downloaded
         """
+        downloaded = 0
         try:
             enforce_redownload = True
             if marker is None:
@@ -377,6 +384,7 @@ class GoogleDownloader:
                 already_downloaded_files = 0
                 for blob in blobs:
                     if "sig" not in blob.name:
+                        metrics.FILES_DISCOVERED.inc(source="bucket")
                         self.logger.debug(str(i) + ". - " + blob.name)
                         download_file_location = self.create_relevant_folders(
                             local_path, download_to_directory, blob.name
@@ -392,10 +400,14 @@ class GoogleDownloader:
                             if file_time is not None:
                                 if file_time in blob.name:
                                     self.download_file(blob, temp_download_file_location, download_file_location)
+                                    downloaded += 1
                             else:
                                 self.download_file(blob, temp_download_file_location, download_file_location)
+                                downloaded += 1
                     i += 1
                 self.logger.debug("Processed a list of {} blobs".format(blobs.num_results))
+                if not follow:
+                    break
                 if i == 0:  # Switch buckets if there were no files downloaded
                     prefix = self.switch_bucket(settings.ALT_NODES.split(","))
 
@@ -429,11 +441,17 @@ class GoogleDownloader:
             raise
         except Exception as ex:
             raise DownloadRunError("Unexpected error in download files loop") from ex
+        return downloaded
 
     def download_file(self, blob, temp_download_file_location, download_file_location):
         self.logger.debug("Downloading file {} ".format(blob.name))
+        start = time.monotonic()
         blob.download_to_filename(temp_download_file_location)
         os.rename(
             temp_download_file_location,
             download_file_location,
         )
+        metrics.STAGE_LATENCY.observe(time.monotonic() - start, stage="download")
+        metrics.FILES_DOWNLOADED.inc()
+        metrics.BYTES_DOWNLOADED.inc(int(blob.size or 0))
+        metrics.observe_consensus_lag(download_file_location, "download")
@@ -0,0 +1,204 @@
+"""
+Event-driven discovery of new record files
+
+The downloader writes each file to a temporary location and os.rename()s it into the day directory once it is
+complete, so an inotify IN_MOVED_TO event on the day directory means a record file is ready to be parsed. The
+watcher only scans the day directory (progress scan) once, when it starts watching it - at startup and at day
+rollover - or when the kernel's event queue overflowed, to pick up files that arrived while it wasn't watching.
+
+inotify is used through libc (Linux only), elsewhere the watcher falls back to polling scans.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+import time
+from typing import List
+
+from hedera.errors import FileWatchError
+from hedera.util.progress_index import MarkerProgress
+from hedera.util.utilities import is_record_file_name
+
+# inotify(7) flags and events
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+IN_MOVED_TO = 0x00000080
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+
+# struct inotify_event header - wd, mask, cookie, len - followed by len bytes of NUL padded name
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class Inotify:
+    """
+    Minimal inotify(7) binding - watch directories and read their events
+    """
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library("c")
+        try:
+            self.libc = ctypes.CDLL(libc_name or "libc.so.6", use_errno=True)
+            self.libc.inotify_init1
+        except (OSError, AttributeError) as ex:
+            raise FileWatchError("inotify is not available on this platform") from ex
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise FileWatchError(f"inotify_init1 failed: {os.strerror(ctypes.get_errno())}")
+
+    def add_watch(self, path: str, mask: int) -> int:
+        """
+        Watch a directory
+
+        :param path: Directory to watch
+        :param mask: inotify events to watch for
+
+        :returns: Watch descriptor
+        """
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), ctypes.c_uint32(mask | IN_ONLYDIR))
+        if wd < 0:
+            raise FileWatchError(f"Error watching {path}: {os.strerror(ctypes.get_errno())}")
+        return wd
+
+    def rm_watch(self, wd: int) -> None:
+        """
+        Stop watching a directory, ignoring watches the kernel already removed
+        """
+        if self.libc.inotify_rm_watch(self.fd, wd) < 0 and ctypes.get_errno() != errno.EINVAL:
+            raise FileWatchError(f"Error removing watch {wd}: {os.strerror(ctypes.get_errno())}")
+
+    def read(self, timeout: float) -> list:
+        """
+        Wait for events
+
+        :param timeout: Seconds to wait for the first event
+
+        :returns: List of (watch descriptor, mask, name) events, empty if none arrived before the timeout
+        """
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+            offset += length
+            events.append((wd, mask, name))
+        return events
+
+    def close(self) -> None:
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class RecordFileWatcher:
+    """
+    Watches the day directory the downloader moves record files into
+    """
+
+    def __init__(self, type: str = "rcd", logger: logging.Logger = None, use_inotify: bool = True, progress=None):
+        """
+        :param type: type of file to watch for
+        :param logger: logger
+        :param use_inotify: Use inotify if available, otherwise poll with scans
+        :param progress: Progress tracking of the parsed files, MarkerProgress (default) or ProgressIndex
+        """
+        self.type = type
+        self.progress = progress or MarkerProgress()
+        self.logger = logger or logging.getLogger(__name__)
+        self.path = None
+        self.wd = None
+        self.inotify = None
+        if use_inotify:
+            try:
+                self.inotify = Inotify()
+            except FileWatchError as ex:
+                self.logger.warning(f"{ex}, polling for new files instead")
+
+    def scan(self, path: str) -> List[str]:
+        """
+        Reconciliation scan of a directory
+
+        :returns: Sorted list of files to be parsed
+        """
+        return self.progress.scan(path, self.type)
+
+    def watch_day(self, path: str) -> List[str]:
+        """
+        Start watching a day directory (created if missing), then scan it for the files that arrived before the
+        watch. At day rollover the previous day directory is scanned one last time for late files
+
+        :param path: Day directory
+        :returns: Sorted list of files to be parsed
+        """
+        files = []
+        if self.path is not None and self.path != path:
+            files.extend(self.scan(self.path))
+        if self.wd is not None:
+            self.inotify.rm_watch(self.wd)
+            self.wd = None
+        self.path = path
+        if self.inotify is not None:
+            os.makedirs(path, exist_ok=True)
+            self.wd = self.inotify.add_watch(path, IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF)
+        # Scanning after adding the watch so that no file is missed, a file can be both scanned and notified
+        files.extend(self.scan(path))
+        self.logger.debug(f"Watching {path}, {len(files)} files found by the reconciliation scan")
+        return files
+
+    def wait_for_files(self, timeout: float) -> List[str]:
+        """
+        Wait for new files in the watched day directory
+
+        :param timeout: Seconds to wait for a file
+        :returns: Sorted list of files to be parsed, empty if none arrived before the timeout
+        """
+        if self.path is None:
+            raise FileWatchError("No directory is watched, call watch_day first")
+        if self.inotify is None:
+            time.sleep(timeout)
+            return self.scan(self.path)
+
+        files = set()
+        for wd, mask, name in self.inotify.read(timeout):
+            if mask & IN_Q_OVERFLOW:
+                self.logger.warning(f"inotify queue overflow, scanning {self.path}")
+                files.update(self.scan(self.path))
+            elif wd != self.wd:
+                continue
+            elif mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                # The day directory is gone, watch it again (recreated) on the next call
+                self.logger.warning(f"{self.path} was removed or moved")
+                self.wd = None
+                path, self.path = self.path, None
+                files.update(self.watch_day(path))
+            elif mask & IN_MOVED_TO and is_record_file_name(name, self.type):
+                files.add(os.path.join(self.path, name))
+        return sorted(f for f in files if not self.progress.is_done(f))
+
+    def close(self) -> None:
+        if self.inotify is not None:
+            self.inotify.close()
+            self.inotify = None
+        self.wd = None
+        self.path = None
+
+    @property
+    def event_driven(self) -> bool:
+        """
+        True if the watcher gets inotify events, False if it polls
+        """
+        return self.inotify is not None
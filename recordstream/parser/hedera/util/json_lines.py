@@ -0,0 +1,109 @@
+"""
+JSON lines encoding of the parsed transactions - orjson when it is installed, the json module otherwise
+
+    writer = BufferedLineWriter(open("recordstreams.json", "ab"), flush_bytes=1024 * 1024, flush_seconds=1.0)
+    writer.write_all(txns)      # encoded in memory, written with one write() once the buffer is due
+    writer.flush()
+
+Both encoders write compact lines (no spaces) in UTF-8. orjson can't encode integers over 64 bits, those transactions
+are encoded with the json module.
+"""
+
+import json
+import time
+from typing import BinaryIO, Iterable
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ENCODER = "orjson" if orjson is not None else "json"
+
+
+def _json_dumps(obj) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps(obj) -> bytes:
+    """
+    :param obj: Parsed transaction, or any JSON serializable value
+
+    :returns: Compact UTF-8 JSON of the value
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+        except orjson.JSONEncodeError:
+            pass
+    return _json_dumps(obj)
+
+
+def encode_lines(objs: Iterable) -> bytes:
+    """
+    :returns: The values as JSON lines, each ending with a newline
+    """
+    return b"".join(dumps(obj) + b"\n" for obj in objs)
+
+
+class BufferedLineWriter:
+    """
+    JSON lines writer encoding into an in-memory buffer, written to the file with one write() once it holds
+    flush_bytes bytes or its first line is flush_seconds old
+    """
+
+    def __init__(self, f: BinaryIO, flush_bytes: int, flush_seconds: float):
+        """
+        :param f: File opened in binary mode
+        :param flush_bytes: Flush once the buffer holds this many bytes
+        :param flush_seconds: Flush once the first buffered line is this many seconds old
+        """
+        self.f = f
+        self.flush_bytes = int(flush_bytes)
+        self.flush_seconds = float(flush_seconds)
+        self.buffer = bytearray()
+        self.buffered_since = None
+
+    def __len__(self) -> int:
+        return len(self.buffer)
+
+    def write_all(self, objs: Iterable) -> bool:
+        """
+        Buffer values as JSON lines, flushing if the buffer is due
+
+        :returns: True if the buffer was flushed
+        """
+        if self.buffered_since is None:
+            self.buffered_since = time.monotonic()
+        self.buffer += encode_lines(objs)
+        if self.due():
+            self.flush()
+            return True
+        return False
+
+    def due(self) -> bool:
+        """
+        :returns: True if the buffer holds flush_bytes bytes or its first line is flush_seconds old
+        """
+        if self.buffered_since is None:
+            return False
+        return len(self.buffer) >= self.flush_bytes or time.monotonic() - self.buffered_since >= self.flush_seconds
+
+    def flush(self) -> None:
+        """
+        Write the buffer to the file and flush it
+        """
+        if self.buffer:
+            self.f.write(self.buffer)
+            self.buffer.clear()
+        self.f.flush()
+        self.buffered_since = None
+
+    def tell(self) -> int:
+        """
+        :returns: Offset of the end of the flushed lines
+        """
+        return self.f.tell()
+
+    def close(self) -> None:
+        self.flush()
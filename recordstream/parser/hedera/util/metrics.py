@@ -0,0 +1,290 @@
+"""
+Metrics of the downloader and orchestrator stages, served in the Prometheus text exposition format
+
+The metrics are module level and shared by every stage of the process, the stages update them and
+start_metrics_server serves them on http://<addr>:<port>/metrics:
+
+    hedera_record_files_discovered_total     record files found, in the bucket (downloader) or directory (orchestrator)
+    hedera_record_files_downloaded_total     record files downloaded
+    hedera_record_bytes_downloaded_total     bytes of the downloaded record files
+    hedera_record_bytes_read_total           bytes of the record files read by the orchestrator
+    hedera_transactions_decoded_total        transactions decoded, per record file format version
+    hedera_transactions_parsed_total         transactions parsed, per txn_type
+    hedera_documents_indexed_total           transactions indexed by the Elasticsearch output
+    hedera_signatures_total                  signatures of the parsed transactions, per key type
+    hedera_errors_total                      errors per stage and exception class (transactions skipped, files that
+                                             couldn't be loaded or downloaded)
+    hedera_stage_latency_seconds             latency histogram per stage - read and decode a file, parse and write a
+                                             chunk, file (from reading to writing its last transaction), download
+    hedera_queue_depth                       items waiting in each queue of the pipeline, chunks in flight
+    hedera_consensus_lag_seconds             wall clock minus the consensus time of the last record file parsed
+                                             (orchestrator) or downloaded (downloader)
+"""
+
+import datetime
+import http.server
+import logging
+import math
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Tuple
+
+from hedera.util.utilities import get_datetime_from_filename
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    labels = list(labels)
+    if not labels:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')) for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class Metric:
+    """
+    Metric family - a value per combination of label values
+    """
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        """
+        :param name: Metric name
+        :param documentation: HELP text
+        :param labels: Label names
+        """
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} expects the labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def get(self, **labels):
+        """
+        :returns: Value of the labels (None if never set)
+        """
+        with self.lock:
+            return self.values.get(self._key(labels))
+
+    def reset(self) -> None:
+        with self.lock:
+            self.values.clear()
+
+    def samples(self) -> List[Tuple[str, tuple, float]]:
+        """
+        :returns: List of (sample name, labels, value)
+        """
+        with self.lock:
+            return [(self.name, tuple(zip(self.label_names, key)), value) for key, value in sorted(self.values.items())]
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}" for name, labels, value in self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        if amount < 0:
+            raise ValueError(f"{self.name} can only be increased")
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        """
+        :param buckets: Upper bounds of the buckets, +Inf is added
+        """
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self.lock:
+            # [count per bucket, sum, count]
+            state = self.values.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def get(self, **labels):
+        """
+        :returns: (sum, count) of the observations of the labels (None if never observed)
+        """
+        with self.lock:
+            state = self.values.get(self._key(labels))
+            return None if state is None else (state[1], state[2])
+
+    def samples(self) -> List[Tuple[str, tuple, float]]:
+        samples = []
+        with self.lock:
+            for key, (counts, total, count) in sorted(self.values.items()):
+                labels = tuple(zip(self.label_names, key))
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    samples.append((f"{self.name}_bucket", labels + (("le", _format_value(bound)),), cumulative))
+                samples.append((f"{self.name}_sum", labels, total))
+                samples.append((f"{self.name}_count", labels, count))
+        return samples
+
+
+class MetricsRegistry:
+    """
+    Metrics served together
+    """
+
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: Tuple[str, ...] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labels))
+
+    def histogram(
+        self, name: str, documentation: str, labels: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def render(self) -> str:
+        """
+        :returns: The metrics in the Prometheus text exposition format
+        """
+        return "\n".join(metric.render() for metric in self.metrics.values()) + "\n"
+
+    def reset(self) -> None:
+        for metric in self.metrics.values():
+            metric.reset()
+
+
+REGISTRY = MetricsRegistry()
+
+FILES_DISCOVERED = REGISTRY.counter(
+    "hedera_record_files_discovered_total", "Record files found in the bucket or the record file directory", ("source",)
+)
+FILES_DOWNLOADED = REGISTRY.counter("hedera_record_files_downloaded_total", "Record files downloaded")
+BYTES_DOWNLOADED = REGISTRY.counter("hedera_record_bytes_downloaded_total", "Bytes of the downloaded record files")
+BYTES_READ = REGISTRY.counter("hedera_record_bytes_read_total", "Bytes of the record files read by the orchestrator")
+TXNS_DECODED = REGISTRY.counter(
+    "hedera_transactions_decoded_total", "Transactions decoded, per record file format version", ("version",)
+)
+TXNS_PARSED = REGISTRY.counter("hedera_transactions_parsed_total", "Transactions parsed, per txn_type", ("txn_type",))
+DOCUMENTS_INDEXED = REGISTRY.counter(
+    "hedera_documents_indexed_total", "Transactions indexed by the Elasticsearch output"
+)
+SIGNATURES = REGISTRY.counter(
+    "hedera_signatures_total", "Signatures of the parsed transactions, per key type", ("key_type",)
+)
+ERRORS = REGISTRY.counter("hedera_errors_total", "Errors per stage and exception class", ("stage", "exception"))
+STAGE_LATENCY = REGISTRY.histogram("hedera_stage_latency_seconds", "Latency of each stage in seconds", ("stage",))
+QUEUE_DEPTH = REGISTRY.gauge("hedera_queue_depth", "Items waiting in each queue of the pipeline", ("queue",))
+CONSENSUS_LAG = REGISTRY.gauge(
+    "hedera_consensus_lag_seconds",
+    "Wall clock minus the consensus time of the last record file parsed or downloaded",
+    ("stage",),
+)
+
+
+def observe_consensus_lag(path: str, stage: str) -> None:
+    """
+    Set the consensus lag of a stage from the time in the name of the record file it last handled
+
+    :param path: Record file, e.g. 2022-10-14T00_00_00.626345694Z.rcd.gz
+    :param stage: "parse" or "download"
+    """
+    try:
+        consensus_time = get_datetime_from_filename(os.path.basename(path))
+    except (IndexError, ValueError):
+        return
+    CONSENSUS_LAG.set(time.time() - consensus_time.replace(tzinfo=datetime.timezone.utc).timestamp(), stage=stage)
+
+
+class _MetricsHandler(http.server.BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.getLogger(__name__).debug(format % args)
+
+
+def start_metrics_server(
+    port: int, addr: str = "127.0.0.1", registry: MetricsRegistry = REGISTRY
+) -> http.server.ThreadingHTTPServer:
+    """
+    Serve the metrics in a background thread
+
+    :param port: Port to listen on, 0 for any free port (server.server_address has the port)
+    :param addr: Address to listen on
+    :param registry: Metrics to serve
+
+    :returns: HTTP server, stopped with shutdown()
+    """
+    handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry})
+    server = http.server.ThreadingHTTPServer((addr, int(port)), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True)
+    thread.start()
+    return server
+
+
+def stop_metrics_server(server: http.server.ThreadingHTTPServer) -> None:
+    """
+    Stop a server started by start_metrics_server
+    """
+    if server is not None:
+        server.shutdown()
+        server.server_close()
@@ -43,22 +43,66 @@ def enum_label_name(field, value):
 
 
 def protobuf_to_dict(pb, type_callable_map=TYPE_CALLABLE_MAP, use_enum_labels=False):
-    result_dict = {}
-    extensions = {}
-    for field, value in pb.ListFields():
-        type_callable = _get_field_value_adaptor(pb, field, type_callable_map, use_enum_labels)
+    return _get_conversion_plan(pb.DESCRIPTOR, type_callable_map, use_enum_labels)(pb)
+
+
+# Conversion plans compiled per message type, keyed by (DESCRIPTOR.full_name, id(type_callable_map), use_enum_labels).
+# The plan holds a reference to type_callable_map so the id stays unique for as long as the plan is cached.
+_CONVERSION_PLANS = {}
+
+
+class _ConversionPlan:
+    """
+    Per-descriptor conversion plan - resolves the converter of every field once and reuses it for all messages
+    of the same type instead of rebuilding the adaptor for every field of every message
+    """
+
+    __slots__ = ("type_callable_map", "use_enum_labels", "converters")
+
+    def __init__(self, type_callable_map, use_enum_labels):
+        self.type_callable_map = type_callable_map
+        self.use_enum_labels = use_enum_labels
+        self.converters = {}
+
+    def __call__(self, pb):
+        result_dict = {}
+        extensions = {}
+        converters = self.converters
+        for field, value in pb.ListFields():
+            converter = converters.get(field)
+            if converter is None:
+                converter = converters[field] = self._compile_field(pb, field)
+            name, type_callable, is_extension = converter
+
+            if is_extension:
+                extensions[name] = type_callable(value)
+                continue
+
+            result_dict[name] = type_callable(value)
+
+        if extensions:
+            result_dict[EXTENSION_CONTAINER] = extensions
+        return result_dict
+
+    def _compile_field(self, pb, field):
+        if field.type == FieldDescriptor.TYPE_MESSAGE:
+            type_callable = _get_conversion_plan(field.message_type, self.type_callable_map, self.use_enum_labels)
+        else:
+            type_callable = _get_field_value_adaptor(pb, field, self.type_callable_map, self.use_enum_labels)
         if field.label == FieldDescriptor.LABEL_REPEATED:
             type_callable = repeated(type_callable)
 
         if field.is_extension:
-            extensions[str(field.number)] = type_callable(value)
-            continue
+            return str(field.number), type_callable, True
+        return field.name, type_callable, False
 
-        result_dict[field.name] = type_callable(value)
 
-    if extensions:
-        result_dict[EXTENSION_CONTAINER] = extensions
-    return result_dict
+def _get_conversion_plan(descriptor, type_callable_map=TYPE_CALLABLE_MAP, use_enum_labels=False):
+    key = (descriptor.full_name, id(type_callable_map), use_enum_labels)
+    plan = _CONVERSION_PLANS.get(key)
+    if plan is None:
+        plan = _CONVERSION_PLANS[key] = _ConversionPlan(type_callable_map, use_enum_labels)
+    return plan
 
 
 def _get_field_value_adaptor(pb, field, type_callable_map=TYPE_CALLABLE_MAP, use_enum_labels=False):
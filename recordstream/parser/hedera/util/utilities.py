@@ -1,9 +1,15 @@
+import base64
 import datetime
+import functools
 import hashlib
 import os
+from typing import Callable, Iterator, Optional
 
 from hedera.errors import FileScanError
 
+# Encodings of the bytes fields in the parser output
+BYTES_ENCODINGS = ("hex", "base64", "raw")
+
 
 def scan_for_new_files(scan_path: str, type: str) -> list:
     """
@@ -51,6 +57,23 @@ def scan_for_new_files(scan_path: str, type: str) -> list:
     return files
 
 
+def is_record_file_name(name: str, type: str) -> bool:
+    """
+    Check a file name the way scan_for_new_files does - a file of the given type that isn't a marker file
+
+    :param name: File name
+    :param type: type of file, "rcd" matches both .rcd and .rcd.gz files
+    """
+    if name.split("_")[-1] in ("processed", "processing"):
+        return False
+    parts = name.split(".")
+    if type == "rcd":
+        return parts[-1] == "rcd" or (len(parts) > 1 and parts[-2] == "rcd")
+    if type == "pb":
+        return len(parts) > 1 and parts[-2] == "pb"
+    return parts[-1] == type
+
+
 def get_datetime_from_filename(filename: str, precision="seconds"):
     """
     Converts filename to datetime
@@ -126,29 +149,122 @@ def scan_for_new_files_backfill(scan_path, type, last_file_datetime_from, last_f
         raise FileScanError("Unexpected error in utilities.py scan_for_new_files_backfill method") from ex
 
 
-def dict_list_keys(d: dict):
+@functools.lru_cache(maxsize=4096)
+def format_epoch_seconds(seconds: int) -> str:
+    """
+    Format epoch seconds as an iso-8601 UTC date time (YYYY-MM-DDTHH:MM:SS) with integer math
+
+    Results are cached per second - consecutive transactions almost always share their timestamp seconds
+
+    :param seconds: epoch seconds
+
+    :returns: iso-8601 date time without fractional seconds or timezone
     """
-    Get keys of a dictionary or length of a list
+    days, seconds_of_day = divmod(seconds, 86400)
+
+    # Civil date from days since the epoch, using 400 year eras that start on March 1st
+    days += 719468
+    era = days // 146097
+    day_of_era = days - era * 146097
+    year_of_era = (day_of_era - day_of_era // 1460 + day_of_era // 36524 - day_of_era // 146096) // 365
+    day_of_year = day_of_era - (365 * year_of_era + year_of_era // 4 - year_of_era // 100)
+    month_index = (5 * day_of_year + 2) // 153
+    day = day_of_year - (153 * month_index + 2) // 5 + 1
+    month = month_index + 3 if month_index < 10 else month_index - 9
+    year = year_of_era + era * 400 + (1 if month <= 2 else 0)
+
+    hour, seconds_of_hour = divmod(seconds_of_day, 3600)
+    minute, second = divmod(seconds_of_hour, 60)
+
+    return f"{year:04d}-{month:02d}-{day:02d}T{hour:02d}:{minute:02d}:{second:02d}"
+
+
+def get_bytes_encoder(encoding: str) -> Optional[Callable]:
     """
-    if type(d) == dict:
-        return d.keys()
-    elif type(d) == list:
-        return range(len(d))
-    else:
-        return ()
+    Get the function used to encode bytes in the parser output
 
+    :param encoding: one of BYTES_ENCODINGS
 
-def dict_bytes_to_hex(d: dict) -> dict:
+    :returns: Function converting bytes to a string, None if bytes are kept raw
     """
-    Convert bytes in a dictionary to hex
+    if encoding == "hex":
+        return bytes.hex
+    if encoding == "base64":
+        return lambda v: base64.b64encode(v).decode("ascii")
+    if encoding == "raw":
+        return None
+    raise ValueError(f"Unknown bytes encoding {encoding}, expected one of {BYTES_ENCODINGS}")
+
+
+def encode_nested_bytes(v, encoder: Callable):
+    """
+    Encode the bytes in a value, recursing into dictionaries and lists (e.g., messages converted by protobuf_to_dict)
+
+    :param v: value to encode
+    :param encoder: function converting bytes to a string
+
+    :returns: Value with bytes encoded
+    """
+    if isinstance(v, (bytes, bytearray)):
+        return encoder(bytes(v))
+    if isinstance(v, dict):
+        return {k: encode_nested_bytes(i, encoder) for k, i in v.items()}
+    if isinstance(v, list):
+        return [encode_nested_bytes(i, encoder) for i in v]
+    return v
+
+
+def _read_varint(data: memoryview, pos: int) -> tuple:
+    """
+    Read a protobuf varint
+
+    :param data: serialized message
+    :param pos: position of the varint
+
+    :returns: (value, position after the varint)
+    """
+    value, shift = 0, 0
+    while True:
+        if pos >= len(data):
+            raise ValueError("Truncated protobuf varint")
+        b = data[pos]
+        pos += 1
+        value |= (b & 0x7F) << shift
+        if not b & 0x80:
+            return value, pos
+        shift += 7
+
+
+def iter_message_fields(data: bytes, field_number: int) -> Iterator[bytes]:
     """
-    for k in dict_list_keys(d):
-        v = d[k]
-        if type(v) in (bytes, bytearray):
-            d[k] = v.hex()
-        elif type(v) in (dict, list):
-            dict_bytes_to_hex(v)
-    return d
+    Raw bytes of the occurrences of a length-delimited field (e.g., a repeated message field) of a serialized
+    protobuf message, without decoding the message or the fields
+
+    :param data: serialized message
+    :param field_number: number of the field
+
+    :returns: Generator of the serialized fields, in order
+    """
+    data = memoryview(data)
+    pos = 0
+    while pos < len(data):
+        key, pos = _read_varint(data, pos)
+        number, wire_type = key >> 3, key & 0x7
+        if wire_type == 0:
+            _, pos = _read_varint(data, pos)
+        elif wire_type == 1:
+            pos += 8
+        elif wire_type == 5:
+            pos += 4
+        elif wire_type == 2:
+            length, pos = _read_varint(data, pos)
+            if pos + length > len(data):
+                raise ValueError("Truncated protobuf field")
+            if number == field_number:
+                yield bytes(data[pos : pos + length])
+            pos += length
+        else:
+            raise ValueError(f"Unsupported protobuf wire type {wire_type}")
 
 
 def parse_flat_fields(response: dict, flat_fields: list, header_name: str) -> dict:
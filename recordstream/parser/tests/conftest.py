@@ -1,5 +1,65 @@
+import shutil
+
 import pytest
 
+from hedera.util.progress_index import MarkerProgress
+
+RCD_GZ_FILE = "tests/test_records/data/rcd_gz/2022-10-14T00_00_00.626345694Z.rcd.gz"
+
+
+class RecordedProgress(MarkerProgress):
+    """
+    Marker file progress recording the finished files instead of touching their markers
+    """
+
+    def __init__(self):
+        self.finished = []
+        self.output_offsets = []
+
+    def finish(self, path, txn_count, output_offset=None):
+        self.finished.append((path, txn_count))
+        self.output_offsets.append(output_offset)
+
+
+@pytest.fixture
+def progress():
+    return RecordedProgress()
+
+
+@pytest.fixture
+def make_txns():
+    """
+    Factory of minimal parsed transactions, the i-th one step seconds after 2022-10-14T00:00:00.000000005Z
+    """
+
+    def make_txns(n, start=0, step=1):
+        return [
+            {
+                "record.transactionHash": f"{i:04x}",
+                "record.consensusTimestamp.seconds": 1665705600 + i * step,
+                "record.consensusTimestamp.nanos": 5,
+                "txn_type": "CRYPTOTRANSFER",
+            }
+            for i in range(start, start + n)
+        ]
+
+    return make_txns
+
+
+@pytest.fixture
+def rcd_files(tmp_path):
+    """
+    Three copies of the same v6 record file, one second apart
+    """
+    rcd_dir = tmp_path / "rcd"
+    rcd_dir.mkdir()
+    files = []
+    for second in range(3):
+        rcd_file = str(rcd_dir / f"2022-10-14T00_00_0{second}.626345694Z.rcd.gz")
+        shutil.copyfile(RCD_GZ_FILE, rcd_file)
+        files.append(rcd_file)
+    return files
+
 
 @pytest.fixture
 def tx_item_common_in():
@@ -1453,6 +1513,8 @@ def parser_v6_transaction_out():
             "record.@timestamp": "2022-10-13T23:59:49.242Z",
             "consensusTimestamp": "2022-10-14T00:00:00.626Z",
             "txn_sign_keys": ["ed25519", "ed25519"],
+            "txn_sign_count": 2,
+            "txn_sign_key_counts": {"ed25519": 2},
         }
     ]
 
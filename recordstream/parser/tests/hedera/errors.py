@@ -178,6 +178,42 @@ class ParseSignKeysError(Exception):
     pass
 
 
+class ProjectionProfileError(Exception):
+    """Base class for exceptions when loading a projection profile"""
+
+    pass
+
+
+class FileWatchError(Exception):
+    """Base class for exceptions when watching directories for new record files"""
+
+    pass
+
+
+class BackfillError(Exception):
+    """Base class for exceptions when backfilling a range of record files"""
+
+    pass
+
+
+class ElasticsearchSinkError(Exception):
+    """Base class for exceptions when sending the parsed transactions to Elasticsearch"""
+
+    pass
+
+
+class ParquetOutputError(Exception):
+    """Base class for exceptions when writing the parsed transactions to Parquet files"""
+
+    pass
+
+
+class SegmentOutputError(Exception):
+    """Base class for exceptions when writing the parsed transactions to compressed segments"""
+
+    pass
+
+
 class ApiTokenError(Exception):
     pass
 
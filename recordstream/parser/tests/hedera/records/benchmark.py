@@ -0,0 +1,401 @@
+"""
+Parser throughput benchmark - `hedera-app bench parse`
+
+Times the parser stages on record files:
+
+    load    RcdParser.load_txns (decompression and protobuf/v5 object decoding)
+    item    RcdParser.parse_transaction_item on the loaded transactions
+    record  RcdParser.parse_transaction_record on the loaded transactions
+    ts      RcdParser.create_ts on the 3 timestamps add_txn_metadata formats per transaction (its per-second cache
+            is cleared first, as for a fresh record file)
+    file    Full per-file path - load_txns followed by parse_txn_chunk_v5/v6 (what a worker does with a file)
+    encode  JSON lines encoding of the parsed transactions, as the orchestrator output writes them
+
+and reports transactions/s, bytes/s (decompressed record file bytes) and the memory allocated by each stage. The
+record files are copied to a scratch directory first (v6 .rcd files are gzipped like the downloaded files), so the
+_processed markers and decompressed copies load_txns writes never end up next to the inputs. v6 files can also be
+scaled up into synthetic files that repeat their record stream items.
+
+Results can be written as JSON and compared against the JSON of a previous run.
+"""
+
+import datetime as dt
+import glob
+import gzip
+import json
+import logging
+import os
+import pathlib
+import platform
+import shutil
+import tempfile
+import time
+import tracemalloc
+from typing import Iterable, List, Optional
+
+from hedera.records.record_file_parser import RcdParser, parse_txn_chunk_v5, parse_txn_chunk_v6
+from hedera.util.json_lines import encode_lines
+from hedera.util.proto_pb import record_stream_file_pb2
+from hedera.util.utilities import format_epoch_seconds
+
+DEFAULT_BENCH_FILES = [
+    "tests/test_records/data/rcd_gz/*.rcd.gz",
+    "tests/test_records/data/rcd_v6/*.rcd",
+    "tests/test_records/data/scan_path/*.rcd",
+]
+BENCH_STAGES = ("load", "item", "record", "ts", "file", "encode")
+BENCH_TIMESTAMP_FIELDS = ("body.transactionValidStart", "record.transactionValidStart", "record.consensusTimestamp")
+BENCH_TIMESTAMP = "2022-10-14T00:00:00.000000Z"
+
+
+def resolve_bench_files(patterns: Iterable[str]) -> List[str]:
+    """
+    Expand glob patterns into a sorted list of record files
+
+    :param patterns: Record files or glob patterns
+
+    :returns: List of record files
+    """
+    files = []
+    for pattern in patterns:
+        files.extend(sorted(glob.glob(pattern)) or ([pattern] if os.path.exists(pattern) else []))
+    return files
+
+
+def read_record_file(filename: str) -> bytes:
+    """
+    Decompressed contents of a record file
+
+    :param filename: .rcd or .rcd.gz record file
+    """
+    if filename.endswith(".gz"):
+        with gzip.open(filename, "rb") as f:
+            return f.read()
+    with open(filename, "rb") as f:
+        return f.read()
+
+
+def is_v6_record_file(data: bytes) -> bool:
+    """
+    :param data: Decompressed contents of a record file
+
+    :returns: True if the record file is protobuf formatted (version 6 and up)
+    """
+    return int.from_bytes(data[:4], "big") >= 6
+
+
+def scale_v6_record_file(data: bytes, scale: int) -> bytes:
+    """
+    Synthetic v6 record file repeating the record stream items of a record file
+
+    :param data: Decompressed contents of a v6 record file
+    :param scale: Number of times the record stream items are repeated
+
+    :returns: Contents of the scaled record file
+    """
+    record_stream_file = record_stream_file_pb2.RecordStreamFile()
+    record_stream_file.ParseFromString(data[4:])
+    items = list(record_stream_file.record_stream_items)
+    for _ in range(scale - 1):
+        record_stream_file.record_stream_items.extend(items)
+    return data[:4] + record_stream_file.SerializeToString()
+
+
+def prepare_bench_files(files: Iterable[str], workdir: str, scales: Iterable[int] = ()) -> List[dict]:
+    """
+    Copy record files to the scratch directory in the format load_txns expects
+
+    :param files: Record files (.rcd.gz, v6 .rcd or v5 .rcd)
+    :param workdir: Scratch directory
+    :param scales: Scale factors of the synthetic files generated from each v6 record file
+
+    :returns: List of datasets - name, file to load, size of the decompressed record file
+    """
+    datasets = []
+    for filename in files:
+        data = read_record_file(filename)
+        basename = os.path.basename(filename)
+        name = os.path.join(os.path.basename(os.path.dirname(filename)), basename)
+        if not is_v6_record_file(data):
+            bench_file = os.path.join(workdir, basename)
+            shutil.copyfile(filename, bench_file)
+            datasets.append({"name": name, "file": bench_file, "bytes": len(data)})
+            continue
+
+        rcd_name = basename[: -len(".gz")] if basename.endswith(".gz") else basename
+        for scale in (1, *scales):
+            prefix = "" if scale == 1 else f"synthetic-x{scale}-"
+            bench_file = os.path.join(workdir, f"{prefix}{rcd_name}.gz")
+            scaled = data if scale == 1 else scale_v6_record_file(data, scale)
+            with gzip.open(bench_file, "wb") as f:
+                f.write(scaled)
+            dataset_name = name if scale == 1 else f"{name} x{scale}"
+            datasets.append({"name": dataset_name, "file": bench_file, "bytes": len(scaled)})
+    return datasets
+
+
+class ParseBenchmark:
+    """
+    Stage by stage benchmark of an RcdParser on a set of record files
+    """
+
+    def __init__(self, engine: str = None, repeat: int = 3, logger: logging.Logger = None):
+        """
+        :param engine: Parsing engine (defaults to settings.PARSER_ENGINE)
+        :param repeat: Number of timed runs per stage, the fastest one is reported
+        :param logger: Logger passed to the chunk parsers
+        """
+        self.parser = RcdParser(engine=engine)
+        self.repeat = repeat
+        self.logger = logger or logging.getLogger(__name__)
+
+    def load(self, bench_file: str):
+        """
+        :returns: Loaded transactions and version of the record file
+        """
+        workdir = os.path.dirname(bench_file) + "/"
+        loaded = self.parser.load_txns(bench_file, workdir)
+        if loaded is None:
+            raise ValueError(f"Unable to load {bench_file}")
+        return loaded
+
+    def item_inputs(self, txns: list, version: str) -> list:
+        """
+        :returns: (transaction body, data type) tuples of the loaded transactions
+        """
+        if version == "v5":
+            return [(self.parser.create_v5_transaction_body(txn["txn_object"]), None) for txn in txns]
+        return [(txn["transaction_body"], txn["transaction_data_type"]) for txn in txns]
+
+    def record_inputs(self, txns: list, version: str, items: list) -> list:
+        """
+        :returns: (transaction record, txn_type) tuples of the loaded transactions
+        """
+        if version == "v5":
+            records = [self.parser.create_v5_transaction_record(txn["txn_object"]) for txn in txns]
+        else:
+            records = [txn["transaction_record"] for txn in txns]
+        return [(record, item["txn_type"]) for record, item in zip(records, items)]
+
+    @staticmethod
+    def timestamp_inputs(txns: list) -> list:
+        """
+        :param txns: Transactions parsed by parse_txn_chunk_v5/v6
+
+        :returns: (seconds, nanos) tuples of the timestamps add_txn_metadata formats, 3 per transaction
+        """
+        return [(txn[f"{field}.seconds"], txn[f"{field}.nanos"]) for txn in txns for field in BENCH_TIMESTAMP_FIELDS]
+
+    def parse_items(self, inputs: list) -> list:
+        return [self.parser.parse_transaction_item(body, data_type) for body, data_type in inputs]
+
+    def parse_records(self, inputs: list) -> list:
+        return [self.parser.parse_transaction_record(record, txn_type) for record, txn_type in inputs]
+
+    def format_timestamps(self, inputs: list) -> list:
+        format_epoch_seconds.cache_clear()
+        return [self.parser.create_ts(seconds, nanos) for seconds, nanos in inputs]
+
+    def parse_file(self, bench_file: str) -> list:
+        txns, version = self.load(bench_file)
+        parse_chunk = parse_txn_chunk_v5 if version == "v5" else parse_txn_chunk_v6
+        return parse_chunk(txns, BENCH_TIMESTAMP, self.logger)
+
+    def measure(self, func, *args) -> dict:
+        """
+        Time a stage and measure its allocations
+
+        :param func: Stage function
+        :param args: Arguments of the stage function
+
+        :returns: Fastest run time and, from an extra run under tracemalloc, the peak memory allocated while the
+            stage runs and the number of memory blocks it allocated that are still held once it returns
+        """
+        func(*args)  # warm up caches (lru_caches, imports, ...)
+        seconds = []
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            func(*args)
+            seconds.append(time.perf_counter() - start)
+
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        try:
+            before = tracemalloc.take_snapshot()
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            result = func(*args)
+            _, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot()
+            retained_blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+            del result
+        finally:
+            if not tracing:
+                tracemalloc.stop()
+
+        return {"seconds": min(seconds), "alloc_peak_bytes": peak - current, "alloc_blocks": retained_blocks}
+
+    def run_dataset(self, dataset: dict, stages: Iterable[str] = BENCH_STAGES) -> dict:
+        """
+        Benchmark the stages on a dataset
+
+        :param dataset: Dataset returned by prepare_bench_files
+        :param stages: Stages to run, subset of BENCH_STAGES
+
+        :returns: Dictionary with the number of transactions, version and metrics per stage
+        """
+        stages = list(stages)
+        txns, version = self.load(dataset["file"])
+        items = self.parse_items(self.item_inputs(txns, version))
+        n_txns = len(txns)
+
+        stage_args = {
+            "load": (self.load, dataset["file"]),
+            "item": (self.parse_items, self.item_inputs(txns, version)),
+            "record": (self.parse_records, self.record_inputs(txns, version, items)),
+            "file": (self.parse_file, dataset["file"]),
+        }
+        if "ts" in stages:
+            stage_args["ts"] = (self.format_timestamps, self.timestamp_inputs(self.parse_file(dataset["file"])))
+        if "encode" in stages:
+            stage_args["encode"] = (encode_lines, self.parse_file(dataset["file"]))
+        results = {}
+        for stage in stages:
+            func, *args = stage_args[stage]
+            metrics = self.measure(func, *args)
+            seconds = metrics["seconds"]
+            results[stage] = {
+                **metrics,
+                "txns_per_sec": n_txns / seconds if seconds else None,
+                "bytes_per_sec": dataset["bytes"] / seconds if seconds else None,
+                "alloc_blocks_per_txn": metrics["alloc_blocks"] / n_txns if n_txns else None,
+            }
+        return {"version": version, "txns": n_txns, "bytes": dataset["bytes"], "stages": results}
+
+
+def run_parse_benchmark(
+    files: Iterable[str],
+    engine: str = None,
+    scales: Iterable[int] = (),
+    repeat: int = 3,
+    stages: Iterable[str] = BENCH_STAGES,
+) -> dict:
+    """
+    Run the parser benchmark
+
+    :param files: Record files or glob patterns
+    :param engine: Parsing engine (defaults to settings.PARSER_ENGINE)
+    :param scales: Scale factors of synthetic files generated from the v6 record files
+    :param repeat: Number of timed runs per stage
+    :param stages: Stages to run, subset of BENCH_STAGES
+
+    :returns: JSON serializable results
+    """
+    unknown = set(stages) - set(BENCH_STAGES)
+    if unknown:
+        raise ValueError(f"Unknown benchmark stages {sorted(unknown)}, expected some of {BENCH_STAGES}")
+    files = resolve_bench_files(files)
+    if not files:
+        raise ValueError("No record files to benchmark")
+
+    benchmark = ParseBenchmark(engine=engine, repeat=repeat)
+    with tempfile.TemporaryDirectory(prefix="hedera-bench-") as workdir:
+        datasets = {
+            dataset["name"]: benchmark.run_dataset(dataset, stages)
+            for dataset in prepare_bench_files(files, workdir, scales)
+        }
+    return {
+        "created": dt.datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "engine": benchmark.parser.engine,
+        "python": platform.python_version(),
+        "repeat": repeat,
+        "datasets": datasets,
+    }
+
+
+def write_results(results: dict, filename: str) -> None:
+    """
+    :param results: Results returned by run_parse_benchmark
+    :param filename: JSON file to write
+    """
+    pathlib.Path(filename).parent.mkdir(parents=True, exist_ok=True)
+    with open(filename, "w") as f:
+        json.dump(results, f, indent=2)
+
+
+def load_results(filename: str) -> dict:
+    """
+    :param filename: JSON file written by write_results
+    """
+    with open(filename) as f:
+        return json.load(f)
+
+
+def compare_results(results: dict, baseline: dict) -> List[dict]:
+    """
+    Compare throughput against a baseline run, for the datasets and stages found in both
+
+    :param results: Results returned by run_parse_benchmark
+    :param baseline: Results of the baseline run
+
+    :returns: List of comparisons - dataset, stage, txns/s of both runs and the relative change
+    """
+    comparisons = []
+    for name, dataset in results["datasets"].items():
+        baseline_dataset = baseline.get("datasets", {}).get(name)
+        if baseline_dataset is None:
+            continue
+        for stage, metrics in dataset["stages"].items():
+            baseline_metrics = baseline_dataset["stages"].get(stage)
+            if not baseline_metrics or not baseline_metrics.get("txns_per_sec") or metrics["txns_per_sec"] is None:
+                continue
+            comparisons.append(
+                {
+                    "dataset": name,
+                    "stage": stage,
+                    "txns_per_sec": metrics["txns_per_sec"],
+                    "baseline_txns_per_sec": baseline_metrics["txns_per_sec"],
+                    "change": metrics["txns_per_sec"] / baseline_metrics["txns_per_sec"] - 1,
+                }
+            )
+    return comparisons
+
+
+def find_regressions(comparisons: List[dict], max_regression: Optional[float]) -> List[dict]:
+    """
+    :param comparisons: Comparisons returned by compare_results
+    :param max_regression: Largest accepted throughput drop (e.g., 0.1 for 10%), no regressions if None
+
+    :returns: Comparisons whose throughput dropped by more than max_regression
+    """
+    if max_regression is None:
+        return []
+    return [c for c in comparisons if c["change"] < -max_regression]
+
+
+def format_results(results: dict, comparisons: List[dict] = None) -> str:
+    """
+    Human readable table of the results
+
+    :param results: Results returned by run_parse_benchmark
+    :param comparisons: Comparisons returned by compare_results
+    """
+    changes = {(c["dataset"], c["stage"]): c["change"] for c in comparisons or []}
+    lines = [
+        f"engine={results['engine']} python={results['python']} repeat={results['repeat']}",
+        f"{'dataset':<58} {'stage':<7} {'txns':>7} {'txns/s':>11} {'MB/s':>8} {'peak KB':>9} {'blocks/txn':>10}"
+        + (f" {'vs base':>8}" if comparisons is not None else ""),
+    ]
+    for name, dataset in results["datasets"].items():
+        for stage, metrics in dataset["stages"].items():
+            line = (
+                f"{name:<58} {stage:<7} {dataset['txns']:>7} {metrics['txns_per_sec'] or 0:>11.0f} "
+                f"{(metrics['bytes_per_sec'] or 0) / 10**6:>8.2f} {metrics['alloc_peak_bytes'] / 1024:>9.1f} "
+                f"{metrics['alloc_blocks_per_txn'] or 0:>10.1f}"
+            )
+            if comparisons is not None:
+                change = changes.get((name, stage))
+                line += f" {change:>+8.1%}" if change is not None else f" {'-':>8}"
+            lines.append(line)
+    return "\n".join(lines)
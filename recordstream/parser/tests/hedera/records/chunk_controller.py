@@ -0,0 +1,192 @@
+"""
+Chunk controllers - decide how many transactions a chunk holds and how many chunks are in flight in a
+RecordFilePipeline
+
+    FixedChunkController     constant chunk size and number of chunks in flight
+    AdaptiveChunkController  tunes both from the measured chunk latencies (submit -> parsed), the number of workers
+                             and the depth of the queues
+"""
+
+import collections
+import logging
+import time
+
+from hedera.config import settings
+
+CHUNK_GOALS = ("fixed", "latency", "throughput")
+
+
+class FixedChunkController:
+    """
+    Constant chunk size and number of chunks in flight
+    """
+
+    def __init__(self, chunk_size: int = 500, max_in_flight: int = 2):
+        self.chunk_size = chunk_size
+        self.max_in_flight = max_in_flight
+
+    def record(self, n_txns: int, latency: float, ready: int, writer_waited: bool) -> None:
+        """
+        Record the latency of a parsed chunk
+
+        :param n_txns: Number of transactions of the chunk
+        :param latency: Seconds between the chunk's submission and its result being available
+        :param ready: Number of parsed chunks waiting to be written, including this one
+        :param writer_waited: True if the writer had to wait for the chunk to be parsed
+        """
+        pass
+
+    def metrics(self) -> dict:
+        """
+        :returns: Current chunk size and number of chunks in flight
+        """
+        return {"chunk_size": self.chunk_size, "max_in_flight": self.max_in_flight}
+
+
+class AdaptiveChunkController(FixedChunkController):
+    """
+    Tunes the chunk size and the number of chunks in flight every `window` parsed chunks
+
+    Chunk size:
+        "latency"       scaled so that the chunk latency stays close to target_latency - small chunks when the
+                        network is quiet (fresh output), large chunks when it's busy (less per-chunk overhead)
+        "throughput"    hill climbing on the measured throughput - keeps moving in the same direction while the
+                        throughput improves, turns around when it drops
+
+    Chunks in flight (between the number of workers and 4 times the number of workers):
+        increased when the writer had to wait for chunks to be parsed (workers starved of chunks)
+        decreased when more parsed chunks than workers are waiting to be written (writer bound)
+
+    The values chosen over time are kept in `history`.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        goal: str = "latency",
+        target_latency: float = 1.0,
+        chunk_size: int = 500,
+        min_chunk_size: int = 10,
+        max_chunk_size: int = 10000,
+        window: int = None,
+        history_size: int = 1000,
+        logger: logging.Logger = None,
+    ):
+        """
+        :param workers: Number of executor workers
+        :param goal: "latency" or "throughput"
+        :param target_latency: Target chunk latency in seconds for the "latency" goal
+        :param chunk_size: Initial chunk size
+        :param min_chunk_size: Smallest chunk size
+        :param max_chunk_size: Largest chunk size
+        :param window: Number of parsed chunks between adjustments (defaults to the number of workers, at least 4)
+        :param history_size: Number of adjustments kept in history
+        :param logger: logger
+        """
+        if goal not in ("latency", "throughput"):
+            raise ValueError(f"Unknown adaptive chunk goal {goal}, expected latency or throughput")
+        self.workers = max(1, workers)
+        super().__init__(chunk_size, 2 * self.workers)
+        self.goal = goal
+        self.target_latency = target_latency
+        self.min_chunk_size = min_chunk_size
+        self.max_chunk_size = max_chunk_size
+        self.min_in_flight = self.workers
+        self.max_in_flight_limit = 4 * self.workers
+        self.window = window or max(4, self.workers)
+        self.logger = logger or logging.getLogger(__name__)
+        self.history = collections.deque(maxlen=history_size)
+
+        self._reset_window()
+        self.last_throughput = None
+        self.direction = 1
+
+    def _reset_window(self) -> None:
+        self.window_start = time.monotonic()
+        self.window_chunks = 0
+        self.window_txns = 0
+        self.window_latency = 0.0
+        self.window_waits = 0
+        self.window_max_ready = 0
+
+    def record(self, n_txns: int, latency: float, ready: int, writer_waited: bool) -> None:
+        """
+        Record the latency of a parsed chunk, adjusting the chunk size and chunks in flight once per window
+
+        :param n_txns: Number of transactions of the chunk
+        :param latency: Seconds between the chunk's submission and its result being available
+        :param ready: Number of parsed chunks waiting to be written, including this one
+        :param writer_waited: True if the writer had to wait for the chunk to be parsed
+        """
+        self.window_chunks += 1
+        self.window_txns += n_txns
+        self.window_latency += latency
+        self.window_waits += writer_waited
+        self.window_max_ready = max(self.window_max_ready, ready)
+        if self.window_chunks >= self.window:
+            self._adjust()
+            self._reset_window()
+
+    def _clamp_chunk_size(self, chunk_size: float) -> int:
+        return int(min(self.max_chunk_size, max(self.min_chunk_size, chunk_size)))
+
+    def _adjust(self) -> None:
+        elapsed = time.monotonic() - self.window_start
+        mean_latency = self.window_latency / self.window_chunks
+        mean_chunk = self.window_txns / self.window_chunks
+        throughput = self.window_txns / elapsed if elapsed > 0 else None
+
+        if self.goal == "latency":
+            if mean_latency > 0:
+                # Latency grows roughly linearly with the chunk size, damped to at most halve/double per window
+                ratio = min(2.0, max(0.5, self.target_latency / mean_latency))
+                self.chunk_size = self._clamp_chunk_size(mean_chunk * ratio)
+        elif throughput is not None:
+            if self.last_throughput is not None and throughput < self.last_throughput:
+                self.direction = -self.direction
+            self.last_throughput = throughput
+            step = 1.25 if self.direction > 0 else 0.8
+            self.chunk_size = self._clamp_chunk_size(self.chunk_size * step)
+
+        if self.window_max_ready > self.workers:
+            self.max_in_flight = max(self.min_in_flight, self.max_in_flight - 1)
+        elif self.window_waits > self.window_chunks / 2:
+            self.max_in_flight = min(self.max_in_flight_limit, self.max_in_flight + 1)
+
+        metrics = {
+            "time": time.time(),
+            **self.metrics(),
+            "mean_latency": mean_latency,
+            "mean_chunk_txns": mean_chunk,
+            "throughput": throughput,
+            "writer_waits": self.window_waits,
+            "max_ready": self.window_max_ready,
+        }
+        self.history.append(metrics)
+        self.logger.debug(f"Chunk controller: {metrics}")
+
+
+def create_chunk_controller(workers: int, goal: str = None, chunk_size: int = None, logger: logging.Logger = None):
+    """
+    Create the chunk controller of the orchestrator's pipeline
+
+    :param workers: Number of executor workers
+    :param goal: One of CHUNK_GOALS (defaults to settings.CHUNK_GOAL)
+    :param chunk_size: (Initial) chunk size (defaults to settings.CHUNK_SIZE)
+    :param logger: logger
+
+    :returns: FixedChunkController or AdaptiveChunkController
+    """
+    goal = goal or settings.CHUNK_GOAL
+    chunk_size = int(chunk_size or settings.CHUNK_SIZE)
+    if goal == "fixed":
+        return FixedChunkController(chunk_size, 2 * max(1, workers))
+    if goal in CHUNK_GOALS:
+        return AdaptiveChunkController(
+            workers,
+            goal=goal,
+            target_latency=float(settings.CHUNK_TARGET_LATENCY),
+            chunk_size=chunk_size,
+            logger=logger,
+        )
+    raise ValueError(f"Unknown chunk goal {goal}, expected one of {CHUNK_GOALS}")
@@ -0,0 +1,101 @@
+"""
+Compact output schema - the lists the parser flattens into numbered keys are output as arrays of objects
+
+    flat (default)                              compact
+    record.accountNum.1, record.amount.1, ...   record.transfers: [{"accountNum": 9, "amount": 6267}, ...]
+    body.accountNum.1, body.amount.1, ...       body.transfers: [{"accountNum": 9, "amount": 6267}, ...]
+    token_transfer_account_1,                   token_transfers: [{"account": 98, "amount": -10}, ...]
+    token_transfer_amount_1, ...
+    nft_sender_1, nft_receiver_1,               nft_transfers: [{"sender": 98, "receiver": 1001, "serial_number": 1}]
+    nft_serial_number_1, ...
+    record.logInfo.bloom,                       record.logInfo: [{"bloom": ..., "topic": [...], ...}, ...]
+    record.logInfo.0.topic.1, ...
+    record.createdContractIDs.contractNum.1     record.createdContractIDs: [{"contractNum": 1001, ...}, ...]
+
+so the set of keys of the output stays fixed, however many transfers or logs a transaction has. Selected with
+OUTPUT_SCHEMA=compact, the compaction runs after the projection profile (which uses the flat field names).
+"""
+
+from typing import Dict, Tuple
+
+OUTPUT_SCHEMAS = ("flat", "compact")
+
+# Array -> (numbered key prefix, field of the array objects) of the parallel numbered keys it replaces
+COMPACT_ARRAYS: Dict[str, Tuple[Tuple[str, str], ...]] = {
+    "record.transfers": (("record.accountNum.", "accountNum"), ("record.amount.", "amount")),
+    "body.transfers": (("body.accountNum.", "accountNum"), ("body.amount.", "amount")),
+    "token_transfers": (("token_transfer_account_", "account"), ("token_transfer_amount_", "amount")),
+    "nft_transfers": (
+        ("nft_sender_", "sender"),
+        ("nft_receiver_", "receiver"),
+        ("nft_serial_number_", "serial_number"),
+    ),
+}
+
+# Flattened lists of objects, record.logInfo.<i>.<field> (record.logInfo.<field> for a single log) and
+# record.createdContractIDs.<field>.<n>
+LOG_INFO = "record.logInfo"
+CREATED_CONTRACT_IDS = "record.createdContractIDs"
+
+_ARRAY_PREFIXES = {prefix: (array, field) for array, fields in COMPACT_ARRAYS.items() for prefix, field in fields}
+_PREFIXES = tuple(_ARRAY_PREFIXES) + (f"{LOG_INFO}.", f"{CREATED_CONTRACT_IDS}.")
+
+
+def _log_info_entry(logs: dict, key: str, value) -> None:
+    parts = key[len(LOG_INFO) + 1 :].split(".")
+    index = 0
+    if parts[0].isdigit():
+        index = int(parts[0])
+        parts = parts[1:]
+    log = logs.setdefault(index, {})
+    if len(parts) == 2 and parts[0] == "topic" and parts[1].isdigit():
+        log.setdefault("topic", {})[int(parts[1])] = value
+    else:
+        log[".".join(parts)] = value
+
+
+def compact_txn(d: dict) -> dict:
+    """
+    Replace the numbered keys of a parsed transaction with arrays
+
+    :param d: Flattened dictionary of the parsed transaction
+
+    :returns: Dictionary with the arrays of the compact schema in place of the numbered keys
+    """
+    if not any(key.startswith(_PREFIXES) for key in d):
+        return d
+    output = {}
+    # array -> index -> object
+    arrays = {}
+    logs = {}
+    created_contracts = {}
+    for key, value in d.items():
+        if key.startswith(_PREFIXES):
+            if key.startswith(f"{LOG_INFO}."):
+                _log_info_entry(logs, key, value)
+                continue
+            if key.startswith(f"{CREATED_CONTRACT_IDS}."):
+                field, _, index = key[len(CREATED_CONTRACT_IDS) + 1 :].rpartition(".")
+                if field and index.isdigit():
+                    created_contracts.setdefault(int(index), {})[field] = value
+                    continue
+            for prefix, (array, field) in _ARRAY_PREFIXES.items():
+                if key.startswith(prefix) and key[len(prefix) :].isdigit():
+                    arrays.setdefault(array, {}).setdefault(int(key[len(prefix) :]), {})[field] = value
+                    break
+            else:
+                output[key] = value
+            continue
+        output[key] = value
+
+    for array, items in arrays.items():
+        fields = [field for _, field in COMPACT_ARRAYS[array]]
+        output[array] = [{field: items[index].get(field) for field in fields} for index in sorted(items)]
+    if logs:
+        output[LOG_INFO] = [
+            {**log, "topic": [topic for _, topic in sorted(log["topic"].items())]} if "topic" in log else log
+            for _, log in sorted(logs.items())
+        ]
+    if created_contracts:
+        output[CREATED_CONTRACT_IDS] = [contract for _, contract in sorted(created_contracts.items())]
+    return output
@@ -0,0 +1,598 @@
+"""
+Fast parsing engine - reads the fields straight off the protobuf messages into the same flat output as the pydantic
+engine (protobuf_to_dict -> TransactionItem/TransactionRecord -> parse* -> *Parsed.dict()), without building any of
+the intermediate object graphs.
+
+The output has to stay identical to the pydantic engine, including its quirks (e.g., ids coerced to strings, bytes
+fields rendered with str(), transactions the pydantic models reject). Messages the pydantic engine rejects raise
+ParseTxnItemError/ParseTxnRecordError in both engines.
+"""
+
+from typing import Callable, Optional
+
+from hedera.errors import ParseTxnItemError, ParseTxnRecordError
+from hedera.records.parse_tx_record import parseSmartContractInfo
+from hedera.util.protobuf_to_dict import protobuf_to_dict
+
+HBAR_TINYBARS = 100000000
+
+
+def _require(condition: bool, error: type, field: str) -> None:
+    """
+    Raise the same way the pydantic models do when a required field is missing
+
+    :param condition: True if the field is present
+    :param error: exception type to raise
+    :param field: name of the field to report
+    """
+    if not condition:
+        raise error(f"Missing required field {field}")
+
+
+def _timestamp_seconds(message, field: str, error: type) -> int:
+    """
+    Seconds of an optional Timestamp/Duration field - the pydantic Timestamp model requires seconds once the field
+    is set
+
+    :param message: protobuf message holding the field
+    :param field: name of the Timestamp/Duration field
+    :param error: exception type to raise
+
+    :returns: seconds of the field, 0 if the field isn't set
+    """
+    if message.HasField(field):
+        seconds = getattr(message, field).seconds
+        _require(seconds != 0, error, f"{field}.seconds")
+        return seconds
+    return 0
+
+
+def _key(key) -> str:
+    return str(key.ed25519)
+
+
+def _has_account_num(account_id) -> bool:
+    # accountNum is part of the AccountID "account" oneof, so it can be set to 0
+    return account_id.WhichOneof("account") == "accountNum"
+
+
+def _contract_num(contract_id) -> str:
+    # contractNum is part of the ContractID "contract" oneof, so it can be set to 0
+    return str(contract_id.contractNum) if contract_id.WhichOneof("contract") == "contractNum" else ""
+
+
+def _required_id(message, field: str, num_field: str) -> str:
+    """
+    Entity number of an id field the pydantic models require to be set with a non-zero number (TopicID, TokenID, ...)
+    """
+    _require(message.HasField(field), ParseTxnItemError, field)
+    num = getattr(getattr(message, field), num_field)
+    _require(num != 0, ParseTxnItemError, f"{field}.{num_field}")
+    return str(num)
+
+
+def parseCommonFast(transaction_body) -> dict:
+    """
+    Parses common fields from the transaction body
+
+    :param transaction_body: TransactionBody protobuf message
+
+    :returns: Dictionary of common fields in the transaction body
+    """
+    _require(transaction_body.HasField("transactionID"), ParseTxnItemError, "transactionID")
+    transaction_id = transaction_body.transactionID
+    seconds = _timestamp_seconds(transaction_id, "transactionValidStart", ParseTxnItemError)
+
+    return {
+        "body.transactionValidStart.seconds": seconds,
+        "body.transactionValidStart.nanos": transaction_id.transactionValidStart.nanos,
+        "body.accountID.accountNum": str(transaction_id.accountID.accountNum),
+        "body.nodeAccountID.accountNum": str(transaction_body.nodeAccountID.accountNum),
+        "scheduled": transaction_id.scheduled,
+        "body.transactionFee": transaction_body.transactionFee,
+        "body.transactionValidDuration.seconds": _timestamp_seconds(
+            transaction_body, "transactionValidDuration", ParseTxnItemError
+        ),
+        "nonce": transaction_id.nonce,
+    }
+
+
+def parseConsensusSubmitMessageFast(consensus_submit_message) -> dict:
+    return {
+        "consensus_submit_topicID": int(_required_id(consensus_submit_message, "topicID", "topicNum")),
+        "consensus_submit_message": str(consensus_submit_message.message),
+        "consensus_submit_message_bytes": len(consensus_submit_message.message),
+        "txn_type": "CONSENSUSSUBMITMESSAGE",
+    }
+
+
+def parseConsensusCreateTopicFast(consensus_create_topic) -> dict:
+    output = {}
+    if consensus_create_topic.memo:
+        output["consensus_create_memo"] = consensus_create_topic.memo
+    output["txn_type"] = "CONSENSUSCREATETOPIC"
+    return output
+
+
+def parseConsensusUpdateTopicFast(consensus_update_topic) -> dict:
+    return {
+        "consensus_update_topicID": int(_required_id(consensus_update_topic, "topicID", "topicNum")),
+        "txn_type": "CONSENSUSUPDATETOPIC",
+    }
+
+
+def parseConsensusDeleteTopicFast(consensus_delete_topic) -> dict:
+    return {
+        "consensus_delete_topicID": int(_required_id(consensus_delete_topic, "topicID", "topicNum")),
+        "txn_type": "CONSENSUSDELETETOPIC",
+    }
+
+
+def parseCryptoTransferFast(crypto_transfer) -> dict:
+    if not crypto_transfer.HasField("transfers"):
+        return {"txn_type": "CRYPTOTRANSFER"}
+
+    account_amounts = crypto_transfer.transfers.accountAmounts
+    if len(account_amounts) == 0:
+        return {"transferList": {"accountAmounts": None}, "txn_type": "CRYPTOTRANSFER"}
+
+    output = {"txn_type": "CRYPTOTRANSFER"}
+
+    ct = 1
+    for item in account_amounts:
+        _require(item.HasField("accountID"), ParseTxnItemError, "accountAmounts.accountID")
+        if _has_account_num(item.accountID):
+            output[f"body.accountNum.{ct}"] = item.accountID.accountNum
+            ct += 1
+    ct = 1
+    for item in account_amounts:
+        if item.amount:
+            output[f"body.amount.{ct}"] = item.amount
+            ct += 1
+
+    return output
+
+
+def parseCryptoCreateAccountFast(crypto_create_account) -> dict:
+    return {
+        "body.key": _key(crypto_create_account.key),
+        "body.sendRecordThreshold": str(crypto_create_account.sendRecordThreshold),
+        "body.receiveRecordThreshold": str(crypto_create_account.receiveRecordThreshold),
+        "body.autoRenewPeriod": str(_timestamp_seconds(crypto_create_account, "autoRenewPeriod", ParseTxnItemError)),
+        "txn_type": "CRYPTOCREATEACCOUNT",
+    }
+
+
+def parseCryptoUpdateAccountFast(crypto_update_account) -> dict:
+    return {
+        "updated_account": str(crypto_update_account.accountIDToUpdate.accountNum),
+        "body.key": _key(crypto_update_account.key),
+        "txn_type": "CRYPTOUPDATEACCOUNT",
+    }
+
+
+def parseCryptoDeleteFast(crypto_delete) -> dict:
+    return {
+        "deleted_account": str(crypto_delete.deleteAccountID.accountNum),
+        "txn_type": "CRYPTODELETE",
+    }
+
+
+def parse_file_fast(txn_type: str) -> Callable:
+    def parse(file_txn) -> dict:
+        _require(file_txn.HasField("fileID"), ParseTxnItemError, "fileID")
+        return {
+            "file_id": str(file_txn.fileID.fileNum),
+            "txn_type": txn_type,
+        }
+
+    return parse
+
+
+def parseFileCreateFast(file_create) -> dict:
+    return {"txn_type": "FILECREATE"}
+
+
+def parseScheduleCreateFast(schedule_create) -> dict:
+    _require(schedule_create.HasField("scheduledTransactionBody"), ParseTxnItemError, "scheduledTransactionBody")
+    return {
+        "schedule_txn_body": protobuf_to_dict(schedule_create.scheduledTransactionBody),
+        "txn_type": "SCHEDULECREATE",
+    }
+
+
+def parse_schedule_fast(txn_type: str) -> Callable:
+    def parse(schedule_txn) -> dict:
+        return {
+            "schedule_id": _required_id(schedule_txn, "scheduleID", "scheduleNum"),
+            "txn_type": txn_type,
+        }
+
+    return parse
+
+
+def parse_token_list_fast(txn_type: str) -> Callable:
+    def parse(token_txn) -> dict:
+        _require(len(token_txn.tokens) > 0, ParseTxnItemError, "tokens")
+        output = {
+            "token_account_number": str(token_txn.account.accountNum),
+            "txn_type": txn_type,
+        }
+        ct = 1
+        for token in token_txn.tokens:
+            _require(token.tokenNum != 0, ParseTxnItemError, "tokens.tokenNum")
+            output["token_number" if ct == 1 else f"token_number{ct}"] = str(token.tokenNum)
+            ct += 1
+        return output
+
+    return parse
+
+
+def parse_token_account_fast(txn_type: str) -> Callable:
+    def parse(token_txn) -> dict:
+        token_number = _required_id(token_txn, "token", "tokenNum")
+        _require(token_txn.HasField("account"), ParseTxnItemError, "account")
+        return {
+            "token_number": token_number,
+            "token_account_number": str(token_txn.account.accountNum),
+            "txn_type": txn_type,
+        }
+
+    return parse
+
+
+def parseTokenDeletionFast(token_deletion) -> dict:
+    return {
+        "token_number": _required_id(token_deletion, "token", "tokenNum"),
+        "txn_type": "TOKENDELETION",
+    }
+
+
+def parseTokenMintFast(token_mint) -> dict:
+    return {
+        "token_number": _required_id(token_mint, "token", "tokenNum"),
+        "token_mint_amount": token_mint.amount,
+        "token_mint_metadata": list(token_mint.metadata),
+        "txn_type": "TOKENMINT",
+    }
+
+
+def parseTokenWipeFast(token_wipe) -> dict:
+    output = {
+        "token_number": _required_id(token_wipe, "token", "tokenNum"),
+        "token_account_number": str(token_wipe.account.accountNum),
+        "token_wipe_amount": token_wipe.amount,
+    }
+    if len(token_wipe.serialNumbers) > 0:
+        output["nft_serial_numbers"] = list(token_wipe.serialNumbers)
+    output["txn_type"] = "TOKENWIPE"
+    return output
+
+
+def parseTokenBurnFast(token_burn) -> dict:
+    output = {
+        "token_account_number": "0",
+        "token_number": _required_id(token_burn, "token", "tokenNum"),
+        "token_burn_amount": token_burn.amount,
+    }
+    if len(token_burn.serialNumbers) > 0:
+        output["nft_serial_numbers"] = list(token_burn.serialNumbers)
+    output["txn_type"] = "TOKENBURN"
+    return output
+
+
+def parseTokenCreationFast(token_creation) -> dict:
+    _require(token_creation.name != "", ParseTxnItemError, "name")
+    _require(token_creation.symbol != "", ParseTxnItemError, "symbol")
+    return {
+        "token_name": token_creation.name,
+        "token_symbol": token_creation.symbol,
+        "token_type": token_creation.tokenType,
+        "token_decimals": token_creation.decimals,
+        "token_account_number": str(token_creation.treasury.accountNum),
+        "token_admin_key": _key(token_creation.adminKey),
+        "token_wipe_key": _key(token_creation.wipeKey),
+        "token_kyc_key": _key(token_creation.kycKey),
+        "token_supply_key": _key(token_creation.supplyKey),
+        "token_freeze_key": _key(token_creation.freezeKey),
+        "freeze_default": False,
+        "auto_renew_account": str(token_creation.autoRenewAccount.accountNum),
+        "auto_renew_period_seconds": _timestamp_seconds(token_creation, "autoRenewPeriod", ParseTxnItemError),
+        "auto_renew_period_nanos": 0,
+        "memo": token_creation.memo,
+        "supply_type": token_creation.supplyType,
+        "max_supply": token_creation.maxSupply,
+        "token_initial_supply": token_creation.initialSupply,
+        "txn_type": "TOKENCREATION",
+    }
+
+
+def parseTokenUpdateFast(token_update) -> dict:
+    # memo is a StringValue wrapper, which the pydantic TokenUpdate model rejects
+    _require(not token_update.HasField("memo"), ParseTxnItemError, "memo as a string")
+    return {
+        "token_name": token_update.name,
+        "token_symbol": token_update.symbol,
+        "token_type": 0,
+        "token_account_number": str(token_update.treasury.accountNum),
+        "token_admin_key": _key(token_update.adminKey),
+        "token_wipe_key": _key(token_update.wipeKey),
+        "token_kyc_key": _key(token_update.kycKey),
+        "token_supply_key": _key(token_update.supplyKey),
+        "token_freeze_key": _key(token_update.freezeKey),
+        "auto_renew_account": str(token_update.autoRenewAccount.accountNum),
+        "memo": "",
+        "txn_type": "TOKENUPDATE",
+    }
+
+
+def parseContractCreateInstanceFast(contract_create_instance) -> dict:
+    _require(contract_create_instance.HasField("autoRenewPeriod"), ParseTxnItemError, "autoRenewPeriod")
+    return {
+        "file_id": str(contract_create_instance.fileID.fileNum),
+        "body.gasUsed": contract_create_instance.gas,
+        "auto_renew_period_seconds": _timestamp_seconds(contract_create_instance, "autoRenewPeriod", ParseTxnItemError),
+        "auto_renew_period_nanos": 0,
+        "admin_key": (
+            protobuf_to_dict(contract_create_instance.adminKey) if contract_create_instance.HasField("adminKey") else {}
+        ),
+        "initial_balance": contract_create_instance.initialBalance,
+        "proxy_account_id": (
+            protobuf_to_dict(contract_create_instance.proxyAccountID)
+            if contract_create_instance.HasField("proxyAccountID")
+            else {}
+        ),
+        "memo": contract_create_instance.memo,
+        "txn_type": "CONTRACTCREATEINSTANCE",
+    }
+
+
+def parse_contract_fast(txn_type: str) -> Callable:
+    def parse(contract_txn) -> dict:
+        _require(contract_txn.HasField("contractID"), ParseTxnItemError, "contractID")
+        return {
+            "body.contractID": _contract_num(contract_txn.contractID),
+            "txn_type": txn_type,
+        }
+
+    return parse
+
+
+def parseContractCallFast(contract_call) -> dict:
+    _require(contract_call.HasField("contractID"), ParseTxnItemError, "contractID")
+    _require(contract_call.gas != 0, ParseTxnItemError, "gas")
+    return {
+        "body.contractID": _contract_num(contract_call.contractID),
+        "body.gasUsed": contract_call.gas,
+        "amount": contract_call.amount,
+        "txn_type": "CONTRACTCALL",
+    }
+
+
+def parseEthereumTransactionFast(ethereum_transaction) -> dict:
+    # call_data is a FileID, which the pydantic EthereumTransaction model rejects
+    _require(not ethereum_transaction.HasField("call_data"), ParseTxnItemError, "call_data as a string")
+    return {
+        "ethereum_data": str(ethereum_transaction.ethereum_data),
+        "call_data": "",
+        "max_gas_allowance": ethereum_transaction.max_gas_allowance,
+        "txn_type": "ETHEREUMTRANSACTION",
+    }
+
+
+def parse_txn_type_fast(txn_type: str) -> Callable:
+    def parse(txn) -> dict:
+        return {"txn_type": txn_type}
+
+    return parse
+
+
+def parseNodeStakeUpdateFast(node_stake_update) -> dict:
+    _timestamp_seconds(node_stake_update, "end_of_staking_period", ParseTxnItemError)
+    node_stake = node_stake_update.node_stake
+    _require(len(node_stake) > 0, ParseTxnItemError, "node_stake")
+    return {
+        "node_stake_max_stake": [int(i.max_stake / HBAR_TINYBARS) for i in node_stake],
+        "node_stake_min_stake": [int(i.min_stake / HBAR_TINYBARS) for i in node_stake],
+        "node_stake_id": [i.node_id for i in node_stake],
+        "node_stake_account": [f"0.0.{i.node_id+3}" for i in node_stake],
+        "node_stake_reward_rate": [i.reward_rate for i in node_stake],
+        "node_stake_not_rewarded": [int(i.stake_not_rewarded / HBAR_TINYBARS) for i in node_stake],
+        "node_stake_rewarded": [int(i.stake_rewarded / HBAR_TINYBARS) for i in node_stake],
+        "txn_type": "NODESTAKEUPDATE",
+    }
+
+
+def parse_transaction_item_fast(transaction_body, data_type: Optional[str], parser: Optional[Callable]) -> dict:
+    """
+    Parses info out of the hedera transaction body
+
+    :param transaction_body: TransactionBody protobuf message
+    :param data_type: Transaction body type (TransactionBody.WhichOneof("data"))
+    :param parser: Fast parser of the transaction body type (see TRANSACTION_TYPE_PARSERS), the transaction is parsed
+        as OTHER if None
+
+    :returns: Flattened dictionary of relevant info from the transaction item
+    """
+    output = parseCommonFast(transaction_body)
+    if parser is None:
+        output["txn_type"] = "OTHER"
+    else:
+        output.update(parser(getattr(transaction_body, data_type)))
+
+    return output
+
+
+def parseTxRecordFast(transaction_record, skip_fields: frozenset = frozenset()) -> dict:
+    """
+    Parses the common fields of the transaction record
+
+    :param transaction_record: TransactionRecord protobuf message
+    :param skip_fields: Nested fields (transfer_list, token_transfer_list, ...) not to convert
+
+    :returns: Dictionary key fields in the transaction record
+    """
+    _require(transaction_record.HasField("receipt"), ParseTxnRecordError, "receipt")
+    _require(transaction_record.HasField("transactionID"), ParseTxnRecordError, "transactionID")
+    transaction_id = transaction_record.transactionID
+    _require(
+        transaction_id.HasField("transactionValidStart"), ParseTxnRecordError, "transactionID.transactionValidStart"
+    )
+    _require(transaction_id.HasField("accountID"), ParseTxnRecordError, "transactionID.accountID")
+
+    receipt = transaction_record.receipt
+    _require(receipt.status != 0, ParseTxnRecordError, "receipt.status")
+    current_rate = receipt.exchangeRate.currentRate
+    next_rate = receipt.exchangeRate.nextRate
+
+    output = {
+        "status": str(receipt.status),
+        "currentRate.hbarEquiv": current_rate.hbarEquiv,
+        "currentRate.centEquiv": current_rate.centEquiv,
+        "currentRate.expirationTime.seconds": current_rate.expirationTime.seconds,
+        "nextRate.hbarEquiv": next_rate.hbarEquiv,
+        "nextRate.centEquiv": next_rate.centEquiv,
+        "nextRate.expirationTime.seconds": next_rate.expirationTime.seconds,
+        "record.transactionHash": transaction_record.transactionHash.hex(),
+        "record.consensusTimestamp.seconds": _timestamp_seconds(
+            transaction_record, "consensusTimestamp", ParseTxnRecordError
+        ),
+        "record.consensusTimestamp.nanos": transaction_record.consensusTimestamp.nanos,
+        "record.transactionValidStart.seconds": _timestamp_seconds(
+            transaction_id, "transactionValidStart", ParseTxnRecordError
+        ),
+        "record.transactionValidStart.nanos": transaction_id.transactionValidStart.nanos,
+        "record.accountID.accountNum": str(transaction_id.accountID.accountNum),
+        "record.transactionFee": transaction_record.transactionFee,
+        "record.memo": transaction_record.memo,
+        "topic_sequence_number": receipt.topicSequenceNumber,
+        "topic_running_hash": receipt.topicRunningHash,
+        "topic_running_hash_version": receipt.topicRunningHashVersion,
+        "created_account": str(receipt.accountID.accountNum),
+        "schedule_id": str(receipt.scheduleID.scheduleNum),
+        "token_number": str(receipt.tokenID.tokenNum),
+        "file_id": str(receipt.fileID.fileNum),
+        "consensus_create_topicID": str(receipt.topicID.topicNum),
+    }
+
+    if "transfer_list" in skip_fields:
+        pass
+    elif not transaction_record.HasField("transferList"):
+        output["transfer_list"] = []
+    elif len(transaction_record.transferList.accountAmounts) > 0:
+        output["transfer_list"] = [protobuf_to_dict(item) for item in transaction_record.transferList.accountAmounts]
+
+    if len(transaction_record.tokenTransferLists) > 0 and "token_transfer_list" not in skip_fields:
+        output["token_transfer_list"] = [
+            _token_transfer_list_dict(token_transfer_list)
+            for token_transfer_list in transaction_record.tokenTransferLists
+        ]
+
+    return output
+
+
+def _token_transfer_list_dict(token_transfer_list) -> dict:
+    output = {"token": {"tokenNum": str(token_transfer_list.token.tokenNum)}}
+    if len(token_transfer_list.transfers) > 0:
+        output["transfers"] = [protobuf_to_dict(item) for item in token_transfer_list.transfers]
+    if len(token_transfer_list.nftTransfers) > 0:
+        output["nftTransfers"] = [protobuf_to_dict(item) for item in token_transfer_list.nftTransfers]
+    return output
+
+
+def parseSmartContractInfoFast(transaction_record) -> dict:
+    """
+    Parses smart contract specific info of the contract create/call results
+
+    :param transaction_record: TransactionRecord protobuf message
+
+    :returns: Dictionary of smart contract specific fields
+    """
+    output = {}
+    if transaction_record.HasField("contractCreateResult"):
+        output.update(parseSmartContractInfo(protobuf_to_dict(transaction_record.contractCreateResult)))
+    if transaction_record.HasField("contractCallResult"):
+        output.update(parseSmartContractInfo(protobuf_to_dict(transaction_record.contractCallResult)))
+    return output
+
+
+def parseTransferListRecordFast(transfer_list) -> dict:
+    """
+    Parses the transfer list of the transaction record
+
+    :param transfer_list: TransferList protobuf message
+
+    :returns: Dictionary of senders, receivers, and amounts for transfers and txn fees
+    """
+    output = {}
+    ct = 1
+    for item in transfer_list.accountAmounts:
+        _require(_has_account_num(item.accountID), ParseTxnRecordError, "accountAmounts.accountID.accountNum")
+        output[f"record.accountNum.{ct}"] = item.accountID.accountNum
+        ct += 1
+    ct = 1
+    for item in transfer_list.accountAmounts:
+        _require(item.amount != 0, ParseTxnRecordError, "accountAmounts.amount")
+        output[f"record.amount.{ct}"] = item.amount
+        ct += 1
+    return output
+
+
+def parseTokenTransferListFast(token_transfer_list, receipt) -> dict:
+    """
+    Parses the first token transfer list of the transaction record
+
+    :param token_transfer_list: TokenTransferList protobuf message
+    :param receipt: TransactionReceipt protobuf message, for the serial numbers of minted nfts
+
+    :returns: Dictionary of senders, receivers, and amounts for token transfers
+    """
+    output = {"token_number": str(token_transfer_list.token.tokenNum)}
+
+    ct = 1
+    for item in token_transfer_list.transfers:
+        _require(_has_account_num(item.accountID), ParseTxnRecordError, "transfers.accountID.accountNum")
+        _require(item.amount != 0, ParseTxnRecordError, "transfers.amount")
+        output[f"token_transfer_account_{ct}"] = item.accountID.accountNum
+        output[f"token_transfer_amount_{ct}"] = item.amount
+        ct += 1
+
+    if len(token_transfer_list.nftTransfers) > 0:
+        ct = 1
+        for item in token_transfer_list.nftTransfers:
+            _require(item.HasField("senderAccountID"), ParseTxnRecordError, "nftTransfers.senderAccountID")
+            _require(item.HasField("receiverAccountID"), ParseTxnRecordError, "nftTransfers.receiverAccountID")
+            if _has_account_num(item.senderAccountID):
+                output[f"nft_sender_{ct}"] = item.senderAccountID.accountNum
+            if _has_account_num(item.receiverAccountID):
+                output[f"nft_receiver_{ct}"] = item.receiverAccountID.accountNum
+            _require(item.serialNumber != 0, ParseTxnRecordError, "nftTransfers.serialNumber")
+            output[f"nft_serial_number_{ct}"] = item.serialNumber
+            ct += 1
+
+        if len(receipt.serialNumbers) > 0:
+            output["nft_serial_numbers"] = list(receipt.serialNumbers)
+
+    return output
+
+
+def parse_transaction_record_fast(transaction_record, skip_fields: frozenset = frozenset()) -> dict:
+    """
+    Parses info out of the hedera transaction record
+
+    :param transaction_record: TransactionRecord protobuf message
+    :param skip_fields: Nested fields (transfer_list, token_transfer_list, ...) not to convert, e.g., because the
+        projection profile drops them
+
+    :returns: Flattened dictionary of relevant info from the transaction record
+    """
+    output = parseTxRecordFast(transaction_record, skip_fields)
+    if not transaction_record.HasField("transferList") or len(transaction_record.transferList.accountAmounts) > 0:
+        output.update(parseTransferListRecordFast(transaction_record.transferList))
+
+    if len(transaction_record.tokenTransferLists) > 0:
+        output.update(parseTokenTransferListFast(transaction_record.tokenTransferLists[0], transaction_record.receipt))
+
+    output.update(parseSmartContractInfoFast(transaction_record))
+
+    return output
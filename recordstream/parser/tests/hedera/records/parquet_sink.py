@@ -0,0 +1,506 @@
+"""
+Parquet output - the parsed transactions are buffered in columns and written as Parquet row groups instead of being
+appended to recordstreams.json
+
+    recordstreams.parquet/
+        _schemas/<family>.json                                          columns of each txn_type family
+        family=<family>/date=<YYYY-MM-DD>/hour=<HH>/part-<run>-<n>.parquet
+
+The transactions are partitioned by txn_type family (crypto, token, consensus, ...) and consensus date and hour. The
+numbered keys of the jsonlines output (record.accountNum.1, record.accountNum.2, ...) are folded into list columns and
+nested values are stored as JSON strings, so each family has a stable schema - inferred from its first transactions
+and saved in _schemas, fields that aren't in it (or don't have its type) are kept in the JSON "extra" column.
+
+A partition's buffer is written as a row group once it holds PARQUET_ROW_GROUP_SIZE transactions. Parquet files can
+only be read once closed, so they are written as .tmp files and renamed once closed. A partition's file stays open
+across commits and is closed on a commit once it holds PARQUET_FILE_MAX_BYTES or is PARQUET_FILE_MAX_SECONDS old, so
+each hour gets a few large files rather than one per commit.
+
+Record files are written again from their first transaction after a crash, so a file is only renamed together with
+every other file holding transactions of the same record files, once those record files are finished, and the record
+files are marked as processed in the same step. The renames and the record files of the step are written to
+_commit.json first, a run that stopped in the middle of a step completes it on the next start - the other .tmp files
+are dropped and their record files parsed again.
+
+Read back with pandas.read_parquet("recordstreams.parquet/family=crypto"), date and hour are read as columns.
+Needs pyarrow.
+"""
+
+import datetime
+import json
+import logging
+import os
+import re
+import time
+import uuid
+from typing import List, Tuple
+
+from hedera.config import settings
+from hedera.errors import ParquetOutputError
+
+# txn_type prefix -> family, the transactions of a family share a schema
+TXN_FAMILIES = (
+    ("CRYPTO", "crypto"),
+    ("TOKEN", "token"),
+    ("NFT", "token"),
+    ("CONSENSUS", "consensus"),
+    ("CONTRACT", "contract"),
+    ("ETHEREUM", "contract"),
+    ("FILE", "file"),
+    ("SCHEDULE", "schedule"),
+)
+
+COLUMN_TYPES = ("bool", "int64", "float64", "string", "list<int64>", "list<string>", "json")
+
+EXTRA_COLUMN = "extra"
+
+# Journal of the renames and processed record files of a commit step, completed by recover() if the step was cut short
+COMMIT_JOURNAL = "_commit.json"
+
+_NUMBERED_KEY = re.compile(r"^(.+)\.(\d+)$")
+_INT64_MIN, _INT64_MAX = -(2**63), 2**63 - 1
+
+
+def _json(value) -> str:
+    return json.dumps(value, separators=(",", ":"), default=str)
+
+
+def txn_family(txn_type: str) -> str:
+    """
+    :param txn_type: txn_type of a parsed transaction, e.g. CRYPTOTRANSFER
+
+    :returns: Family of the txn_type, e.g. crypto ("other" if it isn't in TXN_FAMILIES)
+    """
+    for prefix, family in TXN_FAMILIES:
+        if (txn_type or "").startswith(prefix):
+            return family
+    return "other"
+
+
+def txn_partition(txn: dict) -> Tuple[str, str, str]:
+    """
+    :param txn: Parsed transaction
+
+    :returns: (family, consensus date, consensus hour) of the transaction, e.g. ("crypto", "2022-10-14", "00")
+    """
+    seconds = txn.get("record.consensusTimestamp.seconds")
+    if seconds is not None:
+        consensus_time = datetime.datetime.fromtimestamp(int(seconds), datetime.timezone.utc)
+    elif txn.get("consensusTimestamp"):
+        consensus_time = datetime.datetime.strptime(txn["consensusTimestamp"][:19], "%Y-%m-%dT%H:%M:%S")
+    else:
+        return txn_family(txn.get("txn_type")), "unknown", "unknown"
+    return txn_family(txn.get("txn_type")), consensus_time.strftime("%Y-%m-%d"), consensus_time.strftime("%H")
+
+
+def flatten_txn(txn: dict) -> dict:
+    """
+    Fold the numbered keys of a parsed transaction into lists, e.g. record.accountNum.1 and record.accountNum.2 into
+    record.accountNum
+
+    :param txn: Parsed transaction
+
+    :returns: Transaction with one key per column
+    """
+    row = {}
+    numbered = {}
+    for key, value in txn.items():
+        match = _NUMBERED_KEY.match(key)
+        if match and match.group(1) not in txn:
+            numbered.setdefault(match.group(1), []).append((int(match.group(2)), value))
+        else:
+            row[key] = value
+    for key, values in numbered.items():
+        row[key] = [value for _, value in sorted(values)]
+    return row
+
+
+def _value_type(value) -> str:
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int64" if _INT64_MIN <= value <= _INT64_MAX else "string"
+    if isinstance(value, float):
+        return "float64"
+    if isinstance(value, str):
+        return "string"
+    if isinstance(value, list) and value:
+        item_types = {_value_type(item) for item in value}
+        if item_types == {"int64"}:
+            return "list<int64>"
+        if item_types == {"string"} and all(isinstance(item, str) for item in value):
+            return "list<string>"
+    return "json"
+
+
+def infer_schema(rows: List[dict]) -> List[Tuple[str, str]]:
+    """
+    Infer the columns of a family from its first transactions
+
+    :param rows: Flattened transactions
+    :returns: List of (column, type), type in COLUMN_TYPES, the "extra" column last
+    """
+    types = {}
+    for row in rows:
+        for key, value in row.items():
+            # Empty lists don't tell the type of their items
+            value_type = None if value == [] else _value_type(value)
+            if key == EXTRA_COLUMN or value_type is None:
+                types.setdefault(key, None)
+            elif types.get(key) in (None, value_type):
+                types[key] = value_type
+            elif {types[key], value_type} == {"int64", "float64"}:
+                types[key] = "float64"
+            else:
+                types[key] = "json"
+    schema = [(key, value_type or "json") for key, value_type in types.items() if key != EXTRA_COLUMN]
+    return schema + [(EXTRA_COLUMN, "json")]
+
+
+def _conform(value, column_type: str):
+    """
+    :returns: (True, value converted to the column type) or (False, None) if the value doesn't have the column type
+    """
+    if value is None:
+        return True, None
+    if column_type == "json":
+        return True, _json(value)
+    value_type = _value_type(value)
+    if value_type == column_type:
+        return True, value
+    if column_type == "float64" and value_type == "int64":
+        return True, float(value)
+    if column_type.startswith("list<") and value == []:
+        return True, []
+    return False, None
+
+
+class ColumnBuffer:
+    """
+    Transactions of a partition buffered in columns of the family's schema
+    """
+
+    def __init__(self, schema: List[Tuple[str, str]]):
+        """
+        :param schema: Columns of the family, see infer_schema
+        """
+        self.schema = schema
+        self.types = dict(schema)
+        self.columns = {column: [] for column, _ in schema}
+
+    def __len__(self) -> int:
+        return len(self.columns[EXTRA_COLUMN])
+
+    def append(self, row: dict) -> None:
+        """
+        :param row: Flattened transaction
+        """
+        extra = {}
+        for key, value in row.items():
+            column_type = self.types.get(key)
+            if key == EXTRA_COLUMN or column_type is None:
+                extra[key] = value
+                continue
+            conforms, value = _conform(value, column_type)
+            if conforms:
+                self.columns[key].append(value)
+            else:
+                extra[key] = row[key]
+                self.columns[key].append(None)
+        for column, values in self.columns.items():
+            if column != EXTRA_COLUMN and len(values) == len(self):
+                values.append(None)
+        self.columns[EXTRA_COLUMN].append(_json(extra) if extra else None)
+
+    def clear(self) -> None:
+        for values in self.columns.values():
+            values.clear()
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as ex:
+        raise ParquetOutputError("OUTPUT_SINK=parquet needs pyarrow (poetry install -E parquet)") from ex
+    return pyarrow, pyarrow.parquet
+
+
+class ParquetOutput:
+    """
+    Output writing the transactions to Parquet files partitioned by family, date and hour. Used as the pipeline's
+    progress tracking, so that files are only finished once their transactions are in closed Parquet files
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        progress,
+        row_group_size: int = None,
+        compression: str = None,
+        max_bytes: int = None,
+        max_seconds: float = None,
+        logger: logging.Logger = None,
+    ):
+        """
+        :param directory: Output directory, created if needed
+        :param progress: Progress tracking of the files, MarkerProgress or ProgressIndex
+        :param row_group_size: Transactions per row group (defaults to settings.PARQUET_ROW_GROUP_SIZE)
+        :param compression: Parquet compression codec (defaults to settings.PARQUET_COMPRESSION)
+        :param max_bytes: A partition's file is closed once it holds this many bytes (defaults to
+            settings.PARQUET_FILE_MAX_BYTES)
+        :param max_seconds: A partition's file is closed once it is this many seconds old (defaults to
+            settings.PARQUET_FILE_MAX_SECONDS)
+        :param logger: logger
+        """
+        self.pa, self.pq = _import_pyarrow()
+        self.directory = directory
+        self.progress = progress
+        self.row_group_size = int(row_group_size or settings.PARQUET_ROW_GROUP_SIZE)
+        self.compression = compression or settings.PARQUET_COMPRESSION
+        self.max_bytes = int(max_bytes or settings.PARQUET_FILE_MAX_BYTES)
+        self.max_seconds = float(settings.PARQUET_FILE_MAX_SECONDS if max_seconds is None else max_seconds)
+        self.logger = logger or logging.getLogger(__name__)
+        os.makedirs(os.path.join(directory, "_schemas"), exist_ok=True)
+        self.recover()
+
+        self.run = f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}-{uuid.uuid4().hex[:8]}"
+        self.files_written = 0
+        self.schemas = {}
+        self.buffers = {}
+        # partition -> (ParquetWriter, .tmp path), closed and renamed once due
+        self.writers = {}
+        # When the current file of each partition got its first transaction
+        self.opened = {}
+        # Record files with transactions in the current file of each partition, and the partitions written since the
+        # last written() call, whose record files it tells
+        self.sources = {}
+        self.touched = set()
+        # Files started and not yet finished
+        self.in_progress = set()
+        # Finished files, marked as processed once their transactions are in renamed Parquet files - path -> txn_count
+        self.finishing = {}
+        self.rows = 0
+
+    def recover(self) -> None:
+        """
+        Complete the commit step a run stopped in, and remove the .tmp files it never committed - their record files
+        are parsed again
+        """
+        journal = os.path.join(self.directory, COMMIT_JOURNAL)
+        if os.path.exists(journal):
+            with open(journal) as f:
+                step = json.load(f)
+            self.logger.warning(f"Completing the commit of {len(step['files'])} Parquet files")
+            self._apply_step(step)
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".parquet.tmp"):
+                    self.logger.warning(f"Removing uncommitted {os.path.join(root, name)}")
+                    os.remove(os.path.join(root, name))
+
+    def _schema(self, family: str, rows: List[dict]) -> List[Tuple[str, str]]:
+        """
+        Schema of a family, saved in _schemas the first time the family is written
+        """
+        if family not in self.schemas:
+            path = os.path.join(self.directory, "_schemas", f"{family}.json")
+            if os.path.exists(path):
+                with open(path) as f:
+                    schema = [tuple(column) for column in json.load(f)]
+            else:
+                schema = infer_schema(rows)
+                with open(path + ".tmp", "w") as f:
+                    json.dump(schema, f, indent=1)
+                os.replace(path + ".tmp", path)
+            self.schemas[family] = schema
+        return self.schemas[family]
+
+    def _arrow_schema(self, schema: List[Tuple[str, str]]):
+        types = {
+            "bool": self.pa.bool_(),
+            "int64": self.pa.int64(),
+            "float64": self.pa.float64(),
+            "string": self.pa.string(),
+            "list<int64>": self.pa.list_(self.pa.int64()),
+            "list<string>": self.pa.list_(self.pa.string()),
+            "json": self.pa.string(),
+        }
+        return self.pa.schema([(column, types[column_type]) for column, column_type in schema])
+
+    def start(self, path: str) -> int:
+        """
+        Mark a file as being processed
+
+        :returns: 0, a file is written again from its first transaction
+        """
+        self.in_progress.add(path)
+        self.progress.start(path)
+        return 0
+
+    def write(self, txns: list) -> None:
+        """
+        Add parsed transactions to the buffers of their partitions, writing the full buffers as row groups
+        """
+        rows = {}
+        for txn in txns:
+            rows.setdefault(txn_partition(txn), []).append(flatten_txn(txn))
+        for partition, partition_rows in rows.items():
+            buffer = self.buffers.get(partition)
+            if buffer is None:
+                buffer = self.buffers[partition] = ColumnBuffer(self._schema(partition[0], partition_rows))
+            if not self._pending(partition):
+                self.opened[partition] = time.monotonic()
+                self.sources[partition] = set()
+            self.touched.add(partition)
+            for row in partition_rows:
+                buffer.append(row)
+                if len(buffer) >= self.row_group_size:
+                    self._write_row_group(partition)
+
+    def _pending(self, partition: Tuple[str, str, str]) -> bool:
+        """
+        :returns: Whether the partition has transactions that aren't in a closed file yet
+        """
+        return partition in self.writers or len(self.buffers.get(partition, ())) > 0
+
+    def _due(self, partition: Tuple[str, str, str]) -> bool:
+        if not self._pending(partition):
+            return False
+        if partition in self.writers and os.path.getsize(self.writers[partition][1]) >= self.max_bytes:
+            return True
+        return time.monotonic() - self.opened[partition] >= self.max_seconds
+
+    def _close_file(self, partition: Tuple[str, str, str]) -> str:
+        """
+        Write the partition's buffer and close its file
+
+        :returns: .tmp path of the file, renamed by the commit step
+        """
+        self._write_row_group(partition)
+        writer, path = self.writers.pop(partition)
+        writer.close()
+        del self.sources[partition]
+        return path
+
+    def _groups(self) -> List[Tuple[List[Tuple[str, str, str]], set]]:
+        """
+        Group the partitions with pending transactions by record file - partitions sharing a record file are renamed
+        in the same commit step
+
+        :returns: List of (partitions, record files of their transactions)
+        """
+        groups = []
+        for partition in [partition for partition in self.buffers if self._pending(partition)]:
+            partitions, sources = [partition], set(self.sources.get(partition, ()))
+            for group in [group for group in groups if group[1] & sources]:
+                groups.remove(group)
+                partitions += group[0]
+                sources |= group[1]
+            groups.append((partitions, sources))
+        return groups
+
+    def _commit_step(self, partitions: List[Tuple[str, str, str]]) -> None:
+        """
+        Close the files of the partitions, rename them and mark the finished record files that no longer have
+        transactions in open files as processed
+        """
+        files = [self._close_file(partition) for partition in partitions]
+        pending = set().union(*self.sources.values())
+        processed = [(path, txn_count) for path, txn_count in self.finishing.items() if path not in pending]
+        if not files and not processed:
+            return
+        step = {"files": [os.path.relpath(path, self.directory) for path in files], "processed": processed}
+        journal = os.path.join(self.directory, COMMIT_JOURNAL)
+        with open(journal + ".tmp", "w") as f:
+            json.dump(step, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(journal + ".tmp", journal)
+        self._apply_step(step)
+        for path, _ in processed:
+            del self.finishing[path]
+
+    def _apply_step(self, step: dict) -> None:
+        """
+        Rename the files of a commit step and mark its record files as processed, the step can be applied again
+        """
+        for name in step["files"]:
+            path = os.path.join(self.directory, name)
+            if os.path.exists(path):
+                os.replace(path, path[: -len(".tmp")])
+        for path, txn_count in step["processed"]:
+            self.progress.finish(path, txn_count)
+        os.remove(os.path.join(self.directory, COMMIT_JOURNAL))
+
+    def _write_row_group(self, partition: Tuple[str, str, str]) -> None:
+        buffer = self.buffers[partition]
+        if not len(buffer):
+            return
+        arrow_schema = self._arrow_schema(buffer.schema)
+        if partition not in self.writers:
+            family, date, hour = partition
+            directory = os.path.join(self.directory, f"family={family}", f"date={date}", f"hour={hour}")
+            os.makedirs(directory, exist_ok=True)
+            self.files_written += 1
+            path = os.path.join(directory, f"part-{self.run}-{self.files_written:05d}.parquet.tmp")
+            self.writers[partition] = (self.pq.ParquetWriter(path, arrow_schema, compression=self.compression), path)
+        table = self.pa.Table.from_pydict(buffer.columns, schema=arrow_schema)
+        self.writers[partition][0].write_table(table, row_group_size=len(buffer))
+        self.rows += len(buffer)
+        buffer.clear()
+
+    def written(self, segments: list) -> None:
+        """
+        Record the files of the transactions written since the last call
+
+        :param segments: [file, number of transactions] of each file of the transactions
+        """
+        for partition in self.touched:
+            self.sources[partition].update(path for path, _ in segments)
+        self.touched.clear()
+
+    def finish(self, path: str, txn_count: int, output_offset: int = None) -> None:
+        """
+        Mark a file as processed once the Parquet files holding its transactions are renamed
+        """
+        self.in_progress.discard(path)
+        self.finishing[path] = txn_count
+
+    def commit(self) -> None:
+        """
+        Close and rename the Parquet files that are due, with the other files holding transactions of their record
+        files, and mark those record files as processed. Files holding transactions of a record file that isn't
+        finished stay open
+        """
+        closed = 0
+        for partitions, sources in self._groups():
+            if any(self._due(partition) for partition in partitions) and not sources & self.in_progress:
+                self._commit_step(partitions)
+                closed += len(partitions)
+        if closed:
+            self.logger.info(f"Committed {closed} Parquet files, {self.rows} transactions written")
+        self._commit_step([])
+
+    def tell(self) -> int:
+        """
+        :returns: Number of transactions written
+        """
+        return self.rows
+
+    def close(self) -> None:
+        """
+        Close the open Parquet files and mark their record files as processed. The files holding transactions of a
+        record file that was only partly written are dropped instead and their record files are parsed again
+        """
+        for partitions, sources in self._groups():
+            if not sources & self.in_progress:
+                self._commit_step(partitions)
+        self._commit_step([])
+        for writer, path in self.writers.values():
+            writer.close()
+            os.remove(path)
+        self.writers.clear()
+        self.buffers.clear()
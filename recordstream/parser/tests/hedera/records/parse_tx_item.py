@@ -1,7 +1,8 @@
-from typing import List, Union
+from typing import Callable, Iterable, List, Optional, Union
 
 from pydantic import validate_arguments
 
+from hedera.errors import ParseTxnItemError
 from hedera.models.tx_item import (
     CommonParsed,
     ConsensusCreateTopic,
@@ -84,6 +85,7 @@ from hedera.models.tx_item import (
     UnknownType,
     UnknownTypeParsed,
 )
+from hedera.records import fast_parser as fast
 
 
 @validate_arguments()
@@ -757,6 +759,8 @@ def parseContractCreateInstance(
 
     :returns: Dictionary of token creation info in the transaction item object
     """
+    if contract_create_instance.autoRenewPeriod is None:
+        raise ParseTxnItemError("Missing required field autoRenewPeriod")
     output = {
         "file_id": contract_create_instance.fileID.fileNum,
         "body.gasUsed": contract_create_instance.gas,
@@ -939,3 +943,128 @@ def parseUnknownType(
     output = {"txn_type": unknown_type.txn_type}
 
     return UnknownTypeParsed(**output)
+
+
+def flattenTransferList(crypto_transfer: CryptoTransferParsed) -> Union[CryptoTransferParsed, dict]:
+    """
+    Flattens the transfer list of a parsed crypto transfer
+
+    :param crypto_transfer: The parsed crypto transfer
+
+    :returns: Dictionary of crypto transfer fields with the transfer list flattened
+    """
+    if crypto_transfer.transferList is not None and crypto_transfer.transferList["accountAmounts"] is not None:
+        transfer_list = parseTransferListItem(crypto_transfer.transferList)
+        crypto_transfer = {
+            **crypto_transfer.dict(exclude_none=True),
+            **transfer_list,
+        }
+        del crypto_transfer["transferList"]
+
+    return crypto_transfer
+
+
+def flattenTokenList(token_txn: Union[TokenAssociateParsed, TokenDissociateParsed]) -> dict:
+    """
+    Flattens the token list of a parsed token associate/dissociate
+
+    :param token_txn: The parsed token associate/dissociate
+
+    :returns: Dictionary of token associate/dissociate fields with the token list flattened
+    """
+    token_list = parseTokenList(token_txn.tokenList)
+    token_txn = {
+        **token_txn.dict(exclude_none=True),
+        **token_list,
+    }
+    del token_txn["tokenList"]
+
+    return token_txn
+
+
+# Transaction body type (name of the field set in the TransactionBody "data" oneof) -> (parser, post-processing
+# hook, fast engine parser). The fast engine converts the types without a fast engine parser to a dict and parses
+# them with the pydantic parser
+TRANSACTION_TYPE_PARSERS = {
+    "consensusSubmitMessage": (parseConsensusSubmitMessage, None, fast.parseConsensusSubmitMessageFast),
+    "consensusCreateTopic": (parseConsensusCreateTopic, None, fast.parseConsensusCreateTopicFast),
+    "consensusUpdateTopic": (parseConsensusUpdateTopic, None, fast.parseConsensusUpdateTopicFast),
+    "consensusDeleteTopic": (parseConsensusDeleteTopic, None, fast.parseConsensusDeleteTopicFast),
+    "cryptoTransfer": (parseCryptoTransfer, flattenTransferList, fast.parseCryptoTransferFast),
+    "cryptoCreateAccount": (parseCryptoCreateAccount, None, fast.parseCryptoCreateAccountFast),
+    "cryptoUpdateAccount": (parseCryptoUpdateAccount, None, fast.parseCryptoUpdateAccountFast),
+    "cryptoDelete": (parseCryptoDelete, None, fast.parseCryptoDeleteFast),
+    "fileUpdate": (parseFileUpdate, None, fast.parse_file_fast("FILEUPDATE")),
+    "fileAppend": (parseFileAppend, None, fast.parse_file_fast("FILEAPPEND")),
+    "fileDelete": (parseFileDelete, None, fast.parse_file_fast("FILEDELETE")),
+    "fileCreate": (parseFileCreate, None, fast.parseFileCreateFast),
+    "scheduleSign": (parseScheduleSign, None, fast.parse_schedule_fast("SCHEDULESIGN")),
+    "scheduleCreate": (parseScheduleCreate, None, fast.parseScheduleCreateFast),
+    "scheduleDelete": (parseScheduleDelete, None, fast.parse_schedule_fast("SCHEDULEDELETE")),
+    "tokenCreation": (parseTokenCreation, None, fast.parseTokenCreationFast),
+    "tokenAssociate": (parseTokenAssociate, flattenTokenList, fast.parse_token_list_fast("TOKENASSOCIATE")),
+    "tokenDissociate": (parseTokenDissociate, flattenTokenList, fast.parse_token_list_fast("TOKENDISSOCIATE")),
+    "tokenGrantKyc": (parseTokenGrantKyc, None, fast.parse_token_account_fast("TOKENGRANTKYC")),
+    "tokenRevokeKyc": (parseTokenRevokeKyc, None, fast.parse_token_account_fast("TOKENREVOKEKYC")),
+    "tokenMint": (parseTokenMint, None, fast.parseTokenMintFast),
+    "tokenFreeze": (parseTokenFreeze, None, fast.parse_token_account_fast("TOKENFREEZE")),
+    "tokenUnfreeze": (parseTokenUnfreeze, None, fast.parse_token_account_fast("TOKENUNFREEZE")),
+    "tokenPause": (parseTokenPause, None, None),
+    "tokenUnpause": (parseTokenUnpause, None, None),
+    "tokenDeletion": (parseTokenDeletion, None, fast.parseTokenDeletionFast),
+    "tokenUpdate": (parseTokenUpdate, None, fast.parseTokenUpdateFast),
+    "tokenBurn": (parseTokenBurn, None, fast.parseTokenBurnFast),
+    "tokenWipe": (parseTokenWipe, None, fast.parseTokenWipeFast),
+    "contractCreateInstance": (parseContractCreateInstance, None, fast.parseContractCreateInstanceFast),
+    "contractUpdateInstance": (parseContractUpdateInstance, None, fast.parse_contract_fast("CONTRACTUPDATEINSTANCE")),
+    "contractCall": (parseContractCall, None, fast.parseContractCallFast),
+    "contractDeleteInstance": (parseContractDelete, None, fast.parse_contract_fast("CONTRACTDELETE")),
+    "ethereumTransaction": (parseEthereumTransaction, None, fast.parseEthereumTransactionFast),
+    "cryptoApproveAllowance": (parseCryptoApproveAllowance, None, fast.parse_txn_type_fast("CRYPTOAPPROVEALLOWANCE")),
+    "cryptoDeleteAllowance": (parseCryptoDeleteAllowance, None, fast.parse_txn_type_fast("CRYPTODELETEALLOWANCE")),
+    "token_fee_schedule_update": (
+        parseTokenFeeScheduleUpdate,
+        None,
+        fast.parse_txn_type_fast("TOKENFEESCHEDULEUPDATE"),
+    ),
+    "node_stake_update": (parseNodeStakeUpdate, None, fast.parseNodeStakeUpdateFast),
+}
+
+
+# Transaction item output fields that hold bytes, encoded with the configured bytes encoding
+ITEM_BYTES_FIELDS = {"token_mint_metadata", "schedule_txn_body", "admin_key", "proxy_account_id"}
+
+
+def register_transaction_type(
+    data_type: str,
+    parser: Callable,
+    post_process: Optional[Callable] = None,
+    bytes_fields: Iterable[str] = (),
+    fast_parser: Optional[Callable] = None,
+) -> None:
+    """
+    Registers the parser for a transaction body type
+
+    :param data_type: Name of the field set in the TransactionBody "data" oneof (e.g., cryptoTransfer)
+    :param parser: Parser called with the transaction body type, returns a pydantic model or a flat dictionary
+    :param post_process: Optional hook called with the parser output, returns a pydantic model or a flat dictionary
+    :param bytes_fields: Output fields of the parser that hold bytes
+    :param fast_parser: Optional parser of the fast engine, called with the protobuf message of the transaction body
+        type, returns the same flat dictionary as parser and post_process
+    """
+    TRANSACTION_TYPE_PARSERS[data_type] = (parser, post_process, fast_parser)
+    ITEM_BYTES_FIELDS.update(bytes_fields)
+
+
+def get_transaction_data_type(transaction_item_dict: dict) -> Optional[str]:
+    """
+    Finds the transaction body type of a transaction item dictionary
+
+    :param transaction_item_dict: dict data collected when a transaction is submitted to the hedera network
+
+    :returns: Name of the registered transaction body type set in the transaction item, None if there isn't one
+    """
+    for key in transaction_item_dict:
+        if key in TRANSACTION_TYPE_PARSERS:
+            return key
+    return None
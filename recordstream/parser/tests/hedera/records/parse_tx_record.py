@@ -2,9 +2,21 @@ from typing import List, Union
 
 from pydantic import validate_arguments
 
+from hedera.errors import ParseTxnRecordError
 from hedera.models.tx_record import TransactionRecord, TxRecordParsed
 from hedera.util.utilities import parse_flat_fields
 
+# Transaction record output fields that hold bytes, encoded with the configured bytes encoding
+RECORD_BYTES_FIELDS = {"topic_running_hash", "transfer_list", "token_transfer_list"}
+# Prefixes of the flattened smart contract info fields that can hold bytes
+SMART_CONTRACT_BYTES_PREFIXES = (
+    "record.contractID",
+    "record.contractCallResult",
+    "record.bloom",
+    "record.logInfo",
+    "record.createdContractIDs",
+)
+
 
 @validate_arguments()
 def parseTxRecord(transaction_record: TransactionRecord) -> TxRecordParsed:
@@ -15,6 +27,16 @@ def parseTxRecord(transaction_record: TransactionRecord) -> TxRecordParsed:
 
     :returns TxRecordParsed(**output): Dictionary key fields in the transaction record object
     """
+    # Optional in the model, but every record has them
+    if transaction_record.receipt is None:
+        raise ParseTxnRecordError("Missing required field receipt")
+    if transaction_record.transactionID is None:
+        raise ParseTxnRecordError("Missing required field transactionID")
+    if transaction_record.transactionID.transactionValidStart is None:
+        raise ParseTxnRecordError("Missing required field transactionID.transactionValidStart")
+    if transaction_record.transactionID.accountID is None:
+        raise ParseTxnRecordError("Missing required field transactionID.accountID")
+
     output = {
         "status": transaction_record.receipt.status,
         "currentRate.hbarEquiv": transaction_record.receipt.exchangeRate.currentRate.hbarEquiv,
@@ -0,0 +1,257 @@
+"""
+Parser executors - run the chunk parsers on long-lived workers
+
+All executors share the same interface - submit(version, chunk, timestamp) starts parsing a chunk and returns a
+concurrent.futures.Future of the parsed chunk, map(version, chunks, timestamp) returns the parsed chunks in
+order and shutdown() stops the workers:
+
+    inline      ParserWorker in the calling process (no parallelism, no startup cost)
+    processes   ParserWorker per process of a concurrent.futures.ProcessPoolExecutor
+    ray         ParserWorker ray actors (ray is only imported and started by this executor)
+"""
+
+import concurrent.futures
+import logging
+import os
+import threading
+from collections import Counter
+
+from hedera.config import settings
+from hedera.records.record_file_parser import RcdParser, parse_txn_chunk_v5, parse_txn_chunk_v6
+
+CHUNK_PARSERS = {"v5": parse_txn_chunk_v5, "v6": parse_txn_chunk_v6}
+PARSER_EXECUTORS = ("ray", "processes", "inline")
+
+
+def get_pool_size(size: int = None) -> int:
+    """
+    Number of parser workers to run
+
+    :param size: Requested number of workers, 0/None for one per CPU core (defaults to settings.PARSER_POOL_SIZE)
+    """
+    size = int(size or settings.PARSER_POOL_SIZE or 0)
+    return size if size > 0 else os.cpu_count() or 1
+
+
+class ParsedChunk(list):
+    """
+    Parsed transactions of a chunk, with the number of transactions skipped per exception class (errors) and the
+    SignatureStats of the transactions per record file (signature_stats)
+    """
+
+    def __init__(self, txns: list = (), errors: dict = None, signature_stats: dict = None):
+        super().__init__(txns)
+        self.errors = dict(errors or {})
+        self.signature_stats = dict(signature_stats or {})
+
+
+class ParserWorker:
+    """
+    Long-lived transaction parser - keeps its RcdParser (projection plan, caches, ...) between chunks
+    """
+
+    def __init__(self):
+        self.parser = RcdParser()
+        self.logger = logging.getLogger(__name__)
+
+    def parse_chunk(self, version: str, chunk: list, timestamp: str) -> list:
+        """
+        Parse a chunk of transactions
+
+        :param version: Version of file format the transactions were loaded from
+        :param chunk: List of transactions loaded from record files
+        :param timestamp: timestamp the transactions are processed by metrika
+
+        :returns: ParsedChunk of the parsed transactions
+        """
+        errors, signature_stats = Counter(), {}
+        txns = CHUNK_PARSERS[version](
+            chunk, timestamp, self.logger, parser=self.parser, errors=errors, signature_stats=signature_stats
+        )
+        return ParsedChunk(txns, errors, signature_stats)
+
+
+class InlineParserExecutor:
+    """
+    Parses the chunks in the calling process
+    """
+
+    def __init__(self, size: int = None):
+        """
+        :param size: Unused, chunks are parsed one at a time
+        """
+        self.size = 1
+        self.worker = ParserWorker()
+
+    def submit(self, version: str, chunk: list, timestamp: str) -> concurrent.futures.Future:
+        """
+        Parse a chunk of transactions straight away
+
+        :param version: Version of file format the transactions were loaded from
+        :param chunk: List of transactions
+        :param timestamp: timestamp the transactions are processed by metrika
+
+        :returns: Completed future of the list of parsed transactions
+        """
+        future = concurrent.futures.Future()
+        try:
+            future.set_result(self.worker.parse_chunk(version, chunk, timestamp))
+        except Exception as ex:
+            future.set_exception(ex)
+        return future
+
+    def map(self, version: str, chunks: list, timestamp: str) -> list:
+        """
+        Parse chunks of transactions
+
+        :param version: Version of file format the transactions were loaded from
+        :param chunks: List of lists of transactions
+        :param timestamp: timestamp the transactions are processed by metrika
+
+        :returns: List of lists of parsed transactions, in the order of the chunks
+        """
+        return [self.submit(version, chunk, timestamp).result() for chunk in chunks]
+
+    def shutdown(self) -> None:
+        pass
+
+
+# ParserWorker of the current process of a ProcessParserExecutor
+_process_worker = None
+
+
+def _init_process_worker() -> None:
+    global _process_worker
+    _process_worker = ParserWorker()
+
+
+def _parse_chunk_in_process(version: str, chunk: list, timestamp: str) -> list:
+    return _process_worker.parse_chunk(version, chunk, timestamp)
+
+
+class ProcessParserExecutor:
+    """
+    Parses the chunks on a pool of processes, each process keeping its own ParserWorker
+    """
+
+    def __init__(self, size: int = None):
+        """
+        :param size: Number of processes, 0/None for one per CPU core (defaults to settings.PARSER_POOL_SIZE)
+        """
+        self.size = get_pool_size(size)
+        self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.size, initializer=_init_process_worker)
+
+    def submit(self, version: str, chunk: list, timestamp: str) -> concurrent.futures.Future:
+        """
+        Parse a chunk of transactions on the next free process
+
+        :param version: Version of file format the transactions were loaded from
+        :param chunk: List of transactions
+        :param timestamp: timestamp the transactions are processed by metrika
+
+        :returns: Future of the list of parsed transactions
+        """
+        return self.executor.submit(_parse_chunk_in_process, version, chunk, timestamp)
+
+    def map(self, version: str, chunks: list, timestamp: str) -> list:
+        """
+        Parse chunks of transactions on the processes
+
+        :param version: Version of file format the transactions were loaded from
+        :param chunks: List of lists of transactions
+        :param timestamp: timestamp the transactions are processed by metrika
+
+        :returns: List of lists of parsed transactions, in the order of the chunks
+        """
+        futures = [self.submit(version, chunk, timestamp) for chunk in chunks]
+        return [future.result() for future in futures]
+
+    def shutdown(self) -> None:
+        """
+        Stop the processes
+        """
+        self.executor.shutdown()
+
+
+class ParserActorPool:
+    """
+    Pool of ParserWorker ray actors, one CPU each. Chunks are submitted to the actor with the fewest chunks in flight,
+    so the load is balanced across actors
+    """
+
+    def __init__(self, size: int = None):
+        """
+        :param size: Number of actors, 0/None for one per CPU core (defaults to settings.PARSER_POOL_SIZE)
+        """
+        import ray
+
+        if not ray.is_initialized():
+            ray.init(_temp_dir=settings.RAY_TMP_DIR)
+        self.ray = ray
+        # Each actor reserves a CPU, actors beyond the cluster's CPUs would never be scheduled
+        self.size = max(1, min(get_pool_size(size), int(ray.cluster_resources().get("CPU", 1))))
+        actor_class = ray.remote(num_cpus=1)(ParserWorker)
+        self.actors = [actor_class.remote() for _ in range(self.size)]
+        self.in_flight = [[] for _ in self.actors]
+        # Chunks are submitted by the pipelines of concurrent backfill partitions
+        self.lock = threading.Lock()
+
+    def submit(self, version: str, chunk: list, timestamp: str) -> concurrent.futures.Future:
+        """
+        Parse a chunk of transactions on the least loaded actor
+
+        :param version: Version of file format the transactions were loaded from
+        :param chunk: List of transactions
+        :param timestamp: timestamp the transactions are processed by metrika
+
+        :returns: Future of the list of parsed transactions
+        """
+        with self.lock:
+            for refs in self.in_flight:
+                if refs:
+                    _, refs[:] = self.ray.wait(refs, num_returns=len(refs), timeout=0)
+            i = min(range(len(self.actors)), key=lambda i: len(self.in_flight[i]))
+            ref = self.actors[i].parse_chunk.remote(version, chunk, timestamp)
+            self.in_flight[i].append(ref)
+        return ref.future()
+
+    def map(self, version: str, chunks: list, timestamp: str) -> list:
+        """
+        Parse chunks of transactions on the actors
+
+        :param version: Version of file format the transactions were loaded from
+        :param chunks: List of lists of transactions
+        :param timestamp: timestamp the transactions are processed by metrika
+
+        :returns: List of lists of parsed transactions, in the order of the chunks
+        """
+        futures = [self.submit(version, chunk, timestamp) for chunk in chunks]
+        return [future.result() for future in futures]
+
+    def shutdown(self) -> None:
+        """
+        Stop the actors
+        """
+        for actor in self.actors:
+            self.ray.kill(actor)
+        self.actors = []
+        self.in_flight = []
+
+
+def create_parser_executor(executor: str = None, size: int = None):
+    """
+    Create the executor parsing the chunks of transactions
+
+    :param executor: One of PARSER_EXECUTORS (defaults to settings.PARSER_EXECUTOR)
+    :param size: Number of workers, 0/None for one per CPU core (defaults to settings.PARSER_POOL_SIZE)
+
+    :returns: InlineParserExecutor, ProcessParserExecutor or ParserActorPool
+    """
+    executor = executor or settings.PARSER_EXECUTOR
+    if executor == "inline":
+        return InlineParserExecutor(size)
+    if executor == "processes":
+        return ProcessParserExecutor(size)
+    if executor == "ray":
+        return ParserActorPool(size)
+    raise ValueError(f"Unknown parser executor {executor}, expected one of {PARSER_EXECUTORS}")
@@ -0,0 +1,149 @@
+"""
+Field projection profiles - restrict the parser output to the fields each txn_type needs
+
+A profile maps txn_types to the output fields to keep. Fields ending with "*" keep every field starting with the
+prefix (e.g., body.accountNum.*). "common" fields are kept for every txn_type and "default" applies to txn_types
+without their own list - txn_types that are neither listed nor covered by a default keep all of their fields.
+
+Example (YAML, JSON profiles use the same structure):
+
+    common:
+      - txn_type
+      - consensusTimestamp
+      - record.transactionHash
+    CRYPTOTRANSFER:
+      - body.accountNum.*
+      - body.amount.*
+    CONSENSUSSUBMITMESSAGE:
+      - consensus_submit_topicID
+      - consensus_submit_message_bytes
+
+The nested field groups of the record (transfer lists, token transfer lists, contract results) a profile drops are
+skipped before they are converted. The flat fields of the item and the record are still parsed and only removed by
+ProjectionPlan.project once the metadata is added, so the profile saves their serialization, not their parsing.
+"""
+
+import json
+import pathlib
+from typing import Dict, Iterable, Optional, Union
+
+from hedera.errors import ProjectionProfileError
+
+COMMON_FIELDS = "common"
+DEFAULT_FIELDS = "default"
+
+
+def load_projection_profile(filename: Union[str, pathlib.Path]) -> dict:
+    """
+    Load a projection profile from a YAML or JSON file
+
+    :param filename: .yaml/.yml or .json profile
+
+    :returns: Dictionary of txn_type -> list of output fields
+    """
+    try:
+        with open(filename) as f:
+            if str(filename).endswith((".yaml", ".yml")):
+                import yaml
+
+                profile = yaml.safe_load(f)
+            else:
+                profile = json.load(f)
+    except ImportError as ex:
+        raise ProjectionProfileError("YAML projection profiles need PyYAML (poetry install -E yaml)") from ex
+    except Exception as ex:
+        raise ProjectionProfileError(f"Unable to load projection profile {filename}") from ex
+
+    if not isinstance(profile, dict) or not all(isinstance(v, list) for v in profile.values()):
+        raise ProjectionProfileError(f"Projection profile {filename} must map txn types to lists of fields")
+    return profile
+
+
+class FieldSelector:
+    """
+    Compiled list of output fields - exact field names and prefixes, with the decision cached per field name
+    """
+
+    __slots__ = ("fields", "prefixes", "decisions")
+
+    def __init__(self, fields: Iterable[str]):
+        fields = list(fields)
+        self.fields = frozenset(f for f in fields if not f.endswith("*"))
+        self.prefixes = tuple(f[:-1] for f in fields if f.endswith("*"))
+        self.decisions = {}
+
+    def __contains__(self, field: str) -> bool:
+        try:
+            return self.decisions[field]
+        except KeyError:
+            keep = field in self.fields or field.startswith(self.prefixes)
+            self.decisions[field] = keep
+            return keep
+
+
+class ProjectionPlan:
+    """
+    Projection profile compiled into a field selector per txn_type
+    """
+
+    def __init__(self, profile: dict, reclassified_txn_types: Optional[Dict[str, Iterable[str]]] = None):
+        """
+        :param profile: Dictionary of txn_type -> list of output fields (see load_projection_profile)
+        :param reclassified_txn_types: txn_type -> txn_types it can be reclassified to once the item and record are
+            merged, used to decide which fields to convert before the final txn_type is known
+        """
+        common = profile.get(COMMON_FIELDS, [])
+        self.selectors = {
+            txn_type: FieldSelector([*common, *fields])
+            for txn_type, fields in profile.items()
+            if txn_type not in (COMMON_FIELDS, DEFAULT_FIELDS)
+        }
+        self.default_selector = (
+            FieldSelector([*common, *profile[DEFAULT_FIELDS]]) if DEFAULT_FIELDS in profile else None
+        )
+        self.reclassified_txn_types = reclassified_txn_types or {}
+        self.needed_fields = {}
+
+    def selector(self, txn_type: str) -> Optional[FieldSelector]:
+        """
+        Field selector of a txn_type
+
+        :param txn_type: txn_type of the transaction
+
+        :returns: FieldSelector, None if all the fields of the txn_type are kept
+        """
+        return self.selectors.get(txn_type, self.default_selector)
+
+    def needs(self, txn_type: str, field: str) -> bool:
+        """
+        Check if a field has to be converted for a transaction that hasn't been reclassified yet
+
+        :param txn_type: txn_type of the transaction item
+        :param field: output field
+
+        :returns: True if the field is kept for the txn_type or any txn_type it can be reclassified to
+        """
+        try:
+            return self.needed_fields[(txn_type, field)]
+        except KeyError:
+            needed = False
+            for t in (txn_type, *self.reclassified_txn_types.get(txn_type, ())):
+                selector = self.selector(t)
+                if selector is None or field in selector:
+                    needed = True
+                    break
+            self.needed_fields[(txn_type, field)] = needed
+            return needed
+
+    def project(self, output: dict) -> dict:
+        """
+        Restrict a parsed transaction to the fields of its txn_type
+
+        :param output: Flattened dictionary of the parsed transaction
+
+        :returns: Flattened dictionary with the fields of the txn_type only
+        """
+        selector = self.selector(output.get("txn_type"))
+        if selector is None:
+            return output
+        return {k: v for k, v in output.items() if k in selector}
@@ -0,0 +1,361 @@
+"""
+Progress tracking of the parsed record files
+
+    MarkerProgress  <file>_processed marker files next to the record files (legacy)
+    ProgressIndex   SQLite (WAL) index of the record files - status, transaction count, timings and output offset per
+                    file. Scanning a directory is a listing plus one indexed query instead of marker file probes per
+                    record file, and the files of a time range can be listed or reset to be parsed again
+
+Both share the same interface - scan(scan_path, type) lists the files to be parsed, is_done(path) checks a file,
+start(path) returns the transactions of a file already written, written(segments) records the transactions written
+for each file and finish(path, txn_count, output_offset) marks a file as parsed. The output itself can be committed in
+batches together with the progress records (see hedera.records.output.CommittedOutput).
+"""
+
+import logging
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+from typing import List
+
+from hedera.config import settings
+from hedera.errors import FileScanError
+from hedera.util.utilities import is_record_file_name, scan_for_new_files
+
+PROGRESS_INDEXES = ("sqlite", "markers")
+# Suffixes of the marker files, both meant the file wasn't to be parsed again
+MARKER_SUFFIXES = ("processed", "processing")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    dir TEXT NOT NULL,
+    name TEXT NOT NULL,
+    file_time TEXT NOT NULL,
+    status TEXT NOT NULL,
+    txn_count INTEGER,
+    started_at REAL,
+    finished_at REAL,
+    output_offset INTEGER,
+    committed_txns INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (dir, name)
+);
+CREATE INDEX IF NOT EXISTS files_file_time ON files (file_time);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+def get_file_time(name: str) -> str:
+    """
+    Sortable time of a record file name - 2022-10-14T00:00:00.626345694Z.rcd and 2022-10-14T00_00_00.626345694Z.rcd
+    both give 2022-10-14T00_00_00.626345694Z.rcd
+    """
+    return os.path.basename(name).replace(":", "_")
+
+
+class MarkerProgress:
+    """
+    Progress tracked with <file>_processed marker files next to the record files - the marker is only touched once the
+    file is finished, so a file whose transactions never made it to the output is parsed again
+    """
+
+    def scan(self, scan_path: str, type: str) -> List[str]:
+        """
+        Scan directory for new files to parse
+
+        :param scan_path: Path to scan for new files
+        :param type: type of file to scan for
+
+        :returns: Sorted list of files to be parsed
+        """
+        return sorted(scan_for_new_files(scan_path, type))
+
+    def is_done(self, path: str) -> bool:
+        return os.path.exists(f"{path}_processed") or os.path.exists(f"{path}_processing")
+
+    def start(self, path: str) -> int:
+        return 0
+
+    def written(self, segments: list) -> None:
+        pass
+
+    def finish(self, path: str, txn_count: int, output_offset: int = None) -> None:
+        pathlib.Path(f"{path}_processed").touch()
+
+    def close(self) -> None:
+        pass
+
+
+class ProgressIndex:
+    """
+    SQLite progress index of the record files, safe to share between the pipeline threads
+    """
+
+    def __init__(self, path: str):
+        """
+        :param path: SQLite database file, created if missing
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.row_factory = sqlite3.Row
+        with self.lock:
+            self.db.execute("PRAGMA journal_mode=WAL")
+            # Commits of the output batches must survive a power loss
+            self.db.execute("PRAGMA synchronous=FULL")
+            self.db.executescript(_SCHEMA)
+            columns = {row["name"] for row in self.db.execute("PRAGMA table_info(files)")}
+            if "committed_txns" not in columns:
+                self.db.execute("ALTER TABLE files ADD COLUMN committed_txns INTEGER NOT NULL DEFAULT 0")
+
+    @staticmethod
+    def _key(path: str) -> tuple:
+        return os.path.normpath(os.path.dirname(path)), os.path.basename(path)
+
+    def scan(self, scan_path: str, type: str) -> List[str]:
+        """
+        Scan directory for new files to parse - files not processed yet, including the files a previous run stopped
+        in the middle of. A decompressed .rcd copy of a .rcd.gz file isn't a new file
+
+        :param scan_path: Path to scan for new files
+        :param type: type of file to scan for
+
+        :returns: Sorted list of files to be parsed
+        """
+        files = []
+        try:
+            for r, _d, names in os.walk(scan_path):
+                names = set(names)
+                with self.lock:
+                    rows = self.db.execute(
+                        "SELECT name FROM files WHERE dir = ? AND status = 'processed'", (os.path.normpath(r),)
+                    ).fetchall()
+                done = {row[0] for row in rows}
+                files.extend(
+                    os.path.join(r, name)
+                    for name in names
+                    if is_record_file_name(name, type) and name not in done and f"{name}.gz" not in names
+                )
+        except Exception as ex:
+            raise FileScanError("Unexpected error in progress_index.py scan method") from ex
+        return sorted(files)
+
+    def is_done(self, path: str) -> bool:
+        with self.lock:
+            row = self.db.execute(
+                "SELECT 1 FROM files WHERE dir = ? AND name = ? AND status = 'processed'", self._key(path)
+            ).fetchone()
+        return row is not None
+
+    def start(self, path: str) -> int:
+        """
+        Mark a file as being processed
+
+        :returns: Number of transactions of the file already committed by a previous run, to be skipped
+        """
+        with self.lock:
+            self.db.execute(
+                "INSERT INTO files (dir, name, file_time, status, started_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (dir, name) DO UPDATE SET status = excluded.status, started_at = excluded.started_at",
+                (*self._key(path), get_file_time(path), "processing", time.time()),
+            )
+            row = self.db.execute("SELECT committed_txns FROM files WHERE dir = ? AND name = ?", self._key(path))
+            return row.fetchone()[0]
+
+    def written(self, segments: list) -> None:
+        pass
+
+    def finish(self, path: str, txn_count: int, output_offset: int = None) -> None:
+        """
+        Mark a file as processed
+
+        :param path: Record file
+        :param txn_count: Number of transactions parsed from the file
+        :param output_offset: Offset of the output once the file's transactions were written
+        """
+        with self.lock:
+            self.db.execute(
+                "UPDATE files SET status = ?, txn_count = ?, finished_at = ?, output_offset = ? "
+                "WHERE dir = ? AND name = ?",
+                ("processed", txn_count, time.time(), output_offset, *self._key(path)),
+            )
+
+    def commit_batch(self, files: dict, output: str, batch_start: int, committed_offset: int) -> None:
+        """
+        Record a batch of output in one transaction - the transactions of each file it holds and the output offsets
+
+        :param files: {path: (committed transactions, finished)} of the files with transactions in the batch, finished
+            files are marked as processed
+        :param output: Output file the batch is appended to
+        :param batch_start: Offset of the output the batch starts at
+        :param committed_offset: Offset of the output the batch ends at
+        """
+        now = time.time()
+        with self.lock:
+            self.db.execute("BEGIN")
+            try:
+                for path, (committed_txns, finished) in files.items():
+                    if finished:
+                        self.db.execute(
+                            "UPDATE files SET status = 'processed', committed_txns = ?, txn_count = ?, "
+                            "finished_at = ?, output_offset = ? WHERE dir = ? AND name = ?",
+                            (committed_txns, committed_txns, now, committed_offset, *self._key(path)),
+                        )
+                    else:
+                        self.db.execute(
+                            "UPDATE files SET committed_txns = ? WHERE dir = ? AND name = ?",
+                            (committed_txns, *self._key(path)),
+                        )
+                self._set_output_offsets(output, batch_start, committed_offset)
+                self.db.execute("COMMIT")
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+
+    def _set_output_offsets(self, output: str, batch_start: int, committed_offset: int) -> None:
+        self.db.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            [(f"batch_start:{output}", str(batch_start)), (f"committed_offset:{output}", str(committed_offset))],
+        )
+
+    def set_output_offsets(self, output: str, batch_start: int, committed_offset: int) -> None:
+        """
+        Record the offsets of an output file outside of a batch (adopting an existing file)
+        """
+        with self.lock:
+            self._set_output_offsets(output, batch_start, committed_offset)
+
+    def output_offsets(self, output: str) -> tuple:
+        """
+        :returns: Offsets of the output file the last committed batch starts and ends at, (None, None) if unknown
+        """
+        with self.lock:
+            rows = dict(
+                self.db.execute(
+                    "SELECT key, value FROM meta WHERE key IN (?, ?)",
+                    (f"batch_start:{output}", f"committed_offset:{output}"),
+                ).fetchall()
+            )
+        if len(rows) < 2:
+            return None, None
+        return int(rows[f"batch_start:{output}"]), int(rows[f"committed_offset:{output}"])
+
+    def _where(self, start: str = None, end: str = None, status: str = None) -> tuple:
+        clauses, params = [], []
+        if start:
+            clauses.append("file_time >= ?")
+            params.append(get_file_time(start))
+        if end:
+            clauses.append("file_time < ?")
+            params.append(get_file_time(end))
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def files(self, start: str = None, end: str = None, status: str = None) -> List[dict]:
+        """
+        List the indexed files of a time range
+
+        :param start: First file time, e.g. 2022-10-14 or 2022-10-14T01_00_00
+        :param end: File time the range ends before
+        :param status: Only list files of this status, "processing" or "processed"
+
+        :returns: List of file rows (path, status, txn_count, committed_txns, started_at, finished_at,
+            output_offset), in file order
+        """
+        where, params = self._where(start, end, status)
+        with self.lock:
+            rows = self.db.execute(f"SELECT * FROM files{where} ORDER BY file_time, dir", params).fetchall()
+        return [
+            {
+                "path": os.path.join(row["dir"], row["name"]),
+                **{key: row[key] for key in ("status", "txn_count", "committed_txns", "started_at", "finished_at")},
+                "output_offset": row["output_offset"],
+            }
+            for row in rows
+        ]
+
+    def reset(self, start: str = None, end: str = None, status: str = None) -> int:
+        """
+        Forget the files of a time range, so that they are parsed again by the next scan
+
+        :param start: First file time
+        :param end: File time the range ends before
+        :param status: Only reset files of this status
+
+        :returns: Number of files reset
+        """
+        where, params = self._where(start, end, status)
+        with self.lock:
+            return self.db.execute(f"DELETE FROM files{where}", params).rowcount
+
+    def migrate_markers(self, root: str, remove: bool = False) -> int:
+        """
+        Import the _processed/_processing marker files of a directory tree. Files already indexed are left as is
+
+        :param root: Directory holding the record files
+        :param remove: Delete the marker files once imported
+
+        :returns: Number of marker files imported
+        """
+        imported = 0
+        rows = []
+        for r, _d, names in os.walk(root):
+            for name in names:
+                suffix = name.rsplit("_", 1)[-1]
+                if suffix not in MARKER_SUFFIXES:
+                    continue
+                marker = os.path.join(r, name)
+                path = marker[: -len(suffix) - 1]
+                mtime = os.path.getmtime(marker)
+                rows.append((*self._key(path), get_file_time(path), "processed", mtime, mtime, marker))
+        with self.lock:
+            self.db.execute("BEGIN")
+            for row in rows:
+                imported += self.db.execute(
+                    "INSERT OR IGNORE INTO files (dir, name, file_time, status, started_at, finished_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    row[:-1],
+                ).rowcount
+            self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('markers_migrated', ?)", (root,))
+            self.db.execute("COMMIT")
+        if remove:
+            for row in rows:
+                os.remove(row[-1])
+        return imported
+
+    @property
+    def markers_migrated(self) -> bool:
+        with self.lock:
+            return self.db.execute("SELECT 1 FROM meta WHERE key = 'markers_migrated'").fetchone() is not None
+
+    def close(self) -> None:
+        with self.lock:
+            self.db.close()
+
+
+def create_progress(kind: str = None, path: str = None, root: str = None, logger: logging.Logger = None):
+    """
+    Create the progress tracking of the orchestrator. The first time a ProgressIndex is opened, the marker files
+    under root are imported into it
+
+    :param kind: One of PROGRESS_INDEXES (defaults to settings.PROGRESS_INDEX)
+    :param path: SQLite database file (defaults to settings.PROGRESS_INDEX_PATH, progress.sqlite3 in root otherwise)
+    :param root: Directory holding the record files (defaults to settings.PARSED_RECORD_STREAM_FILES_PATH)
+    :param logger: logger
+
+    :returns: ProgressIndex or MarkerProgress
+    """
+    kind = kind or settings.PROGRESS_INDEX
+    root = root or settings.PARSED_RECORD_STREAM_FILES_PATH or "."
+    if kind == "markers":
+        return MarkerProgress()
+    if kind != "sqlite":
+        raise ValueError(f"Unknown progress index {kind}, expected one of {PROGRESS_INDEXES}")
+    index = ProgressIndex(path or settings.PROGRESS_INDEX_PATH or os.path.join(root, "progress.sqlite3"))
+    if not index.markers_migrated:
+        imported = index.migrate_markers(root)
+        (logger or logging.getLogger(__name__)).info(f"Imported {imported} marker files of {root} into {index.path}")
+    return index
@@ -0,0 +1,94 @@
+import glob
+import os
+
+import pytest
+
+from hedera.records.benchmark import (
+    BENCH_STAGES,
+    ParseBenchmark,
+    compare_results,
+    find_regressions,
+    format_results,
+    load_results,
+    prepare_bench_files,
+    read_record_file,
+    run_parse_benchmark,
+    scale_v6_record_file,
+    write_results,
+)
+from hedera.util.proto_pb import record_stream_file_pb2
+
+RCD_GZ_FILE = "tests/test_records/data/rcd_gz/2022-10-14T00_00_00.626345694Z.rcd.gz"
+V5_FILE = "tests/test_records/data/scan_path/2022-03-02T00_00_00.063618034Z.rcd"
+
+
+def test_scale_v6_record_file():
+    data = read_record_file(RCD_GZ_FILE)
+    scaled = scale_v6_record_file(data, 3)
+
+    record_stream_file = record_stream_file_pb2.RecordStreamFile()
+    record_stream_file.ParseFromString(scaled[4:])
+    assert scaled[:4] == data[:4]
+    assert len(record_stream_file.record_stream_items) == 36
+
+
+def test_timestamp_inputs(tmp_path):
+    benchmark = ParseBenchmark(engine="fast", repeat=1)
+    [dataset] = prepare_bench_files([RCD_GZ_FILE], str(tmp_path))
+    txns = benchmark.parse_file(dataset["file"])
+
+    inputs = benchmark.timestamp_inputs(txns)
+    assert len(inputs) == 3 * len(txns)
+    assert benchmark.format_timestamps(inputs[2::3]) == [txn["consensusTimestamp"] for txn in txns]
+
+
+def test_run_parse_benchmark(tmp_path):
+    results = run_parse_benchmark([RCD_GZ_FILE, V5_FILE], engine="fast", scales=[2], repeat=1)
+
+    assert results["engine"] == "fast"
+    assert {name: dataset["txns"] for name, dataset in results["datasets"].items()} == {
+        "rcd_gz/2022-10-14T00_00_00.626345694Z.rcd.gz": 12,
+        "rcd_gz/2022-10-14T00_00_00.626345694Z.rcd.gz x2": 24,
+        "scan_path/2022-03-02T00_00_00.063618034Z.rcd": 48,
+    }
+    for dataset in results["datasets"].values():
+        assert list(dataset["stages"]) == list(BENCH_STAGES)
+        for metrics in dataset["stages"].values():
+            assert metrics["txns_per_sec"] > 0
+            assert metrics["bytes_per_sec"] > 0
+            assert metrics["alloc_peak_bytes"] > 0
+    # The inputs are copied to a scratch directory, nothing is written next to them
+    assert not glob.glob("tests/test_records/data/rcd_gz/*_processed")
+    assert not os.path.exists(RCD_GZ_FILE[: -len(".gz")])
+
+    write_results(results, tmp_path / "results" / "bench.json")
+    assert load_results(tmp_path / "results" / "bench.json") == results
+    assert "scan_path/2022-03-02T00_00_00.063618034Z.rcd" in format_results(results)
+
+
+def test_run_parse_benchmark_errors():
+    with pytest.raises(ValueError):
+        run_parse_benchmark([RCD_GZ_FILE], stages=["unknown"])
+    with pytest.raises(ValueError):
+        run_parse_benchmark(["tests/test_records/data/missing/*.rcd"])
+
+
+def test_compare_results():
+    def results(txns_per_sec):
+        return {"datasets": {"a.rcd": {"stages": {"item": {"txns_per_sec": txns_per_sec}}}}}
+
+    comparisons = compare_results(results(80), results(100))
+    assert comparisons == [
+        {
+            "dataset": "a.rcd",
+            "stage": "item",
+            "txns_per_sec": 80,
+            "baseline_txns_per_sec": 100,
+            "change": pytest.approx(-0.2),
+        }
+    ]
+    assert find_regressions(comparisons, 0.1) == comparisons
+    assert find_regressions(comparisons, 0.25) == []
+    assert find_regressions(comparisons, None) == []
+    # Datasets missing from the baseline are skipped
+    assert compare_results(results(80), {"datasets": {}}) == []
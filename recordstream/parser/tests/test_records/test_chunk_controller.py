@@ -0,0 +1,82 @@
+import pytest
+
+from hedera.records.chunk_controller import (
+    AdaptiveChunkController,
+    FixedChunkController,
+    create_chunk_controller,
+)
+
+
+def test_fixed_chunk_controller():
+    controller = FixedChunkController(100, 4)
+    for _ in range(10):
+        controller.record(100, 5.0, 8, True)
+    assert controller.metrics() == {"chunk_size": 100, "max_in_flight": 4}
+
+
+def test_latency_goal():
+    controller = AdaptiveChunkController(2, goal="latency", target_latency=1.0, chunk_size=500, window=4)
+    # 4 times slower than the target - at most halved per window
+    for _ in range(4):
+        controller.record(500, 4.0, 1, False)
+    assert controller.chunk_size == 250
+    # Slightly faster than the target
+    for _ in range(4):
+        controller.record(250, 0.8, 1, False)
+    assert controller.chunk_size == 312
+    assert [metrics["chunk_size"] for metrics in controller.history] == [250, 312]
+    assert controller.history[0]["mean_latency"] == 4.0
+
+
+def test_latency_goal_bounds():
+    controller = AdaptiveChunkController(1, chunk_size=500, min_chunk_size=100, max_chunk_size=800, window=4)
+    for _ in range(4):
+        controller.record(500, 0.01, 1, False)
+    assert controller.chunk_size == 800
+    for _ in range(3):
+        for _ in range(4):
+            controller.record(controller.chunk_size, 100.0, 1, False)
+    assert controller.chunk_size == 100
+
+
+def test_throughput_goal():
+    controller = AdaptiveChunkController(1, goal="throughput", chunk_size=100, window=4)
+    controller._adjust = lambda: None
+    for _ in range(4):
+        controller.record(100, 0.1, 1, False)
+    assert controller.window_chunks == 0
+    del controller._adjust
+
+    controller.window_start -= 1
+    controller.window_chunks, controller.window_txns = 1, 100
+    controller._adjust()
+    assert controller.chunk_size == 125
+    # Throughput dropped - turn around
+    controller.window_start -= 10
+    controller.window_chunks, controller.window_txns = 1, 100
+    controller._adjust()
+    assert controller.chunk_size == 100
+    assert controller.direction == -1
+
+
+def test_max_in_flight():
+    controller = AdaptiveChunkController(2, window=4)
+    assert controller.max_in_flight == 4
+    # Writer waiting for the workers - more chunks in flight, up to 4 per worker
+    for _ in range(20):
+        controller.record(500, 1.0, 1, True)
+    assert controller.max_in_flight == 8
+    # Parsed chunks piling up for the writer - fewer chunks in flight, down to 1 per worker
+    for _ in range(40):
+        controller.record(500, 1.0, 3, False)
+    assert controller.max_in_flight == 2
+
+
+def test_create_chunk_controller():
+    assert isinstance(create_chunk_controller(2, "fixed", 100), FixedChunkController)
+    controller = create_chunk_controller(2, "throughput", 100)
+    assert isinstance(controller, AdaptiveChunkController)
+    assert controller.goal == "throughput"
+    assert controller.chunk_size == 100
+    with pytest.raises(ValueError):
+        create_chunk_controller(2, "fastest")
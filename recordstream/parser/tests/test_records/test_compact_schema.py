@@ -0,0 +1,125 @@
+import glob
+import logging
+import re
+import shutil
+
+import pytest
+
+from hedera.config import settings
+from hedera.records.compact_schema import compact_txn
+from hedera.records.parse_tx_record import parseSmartContractInfo
+from hedera.records.parser_pool import InlineParserExecutor
+from hedera.records.pipeline import RecordFilePipeline
+from hedera.records.record_file_parser import RcdParser
+
+RCD_FILES = "tests/test_records/data/scan_path/*.rcd"
+logger = logging.getLogger(__name__)
+
+NUMBERED_KEY = re.compile(r"(\.|_)\d+(\.|$)")
+
+
+def test_compact_transfers():
+    flat = {
+        "txn_type": "NFTTRANSFER",
+        "record.accountNum.1": 9,
+        "record.accountNum.2": 98,
+        "record.amount.1": 6267,
+        "record.amount.2": -6267,
+        "body.accountNum.1": 98,
+        "body.amount.1": 15,
+        "token_transfer_account_1": 1001,
+        "token_transfer_amount_1": -10,
+        "token_transfer_account_2": 1002,
+        "token_transfer_amount_2": 10,
+        "nft_receiver_1": 1002,
+        "nft_serial_number_1": 7,
+        "nft_serial_numbers": [7],
+        "token_number": "1234",
+    }
+    compact = compact_txn(flat)
+
+    assert compact == {
+        "txn_type": "NFTTRANSFER",
+        "nft_serial_numbers": [7],
+        "token_number": "1234",
+        "record.transfers": [{"accountNum": 9, "amount": 6267}, {"accountNum": 98, "amount": -6267}],
+        "body.transfers": [{"accountNum": 98, "amount": 15}],
+        "token_transfers": [{"account": 1001, "amount": -10}, {"account": 1002, "amount": 10}],
+        # The sender is minted, the objects have every field
+        "nft_transfers": [{"sender": None, "receiver": 1002, "serial_number": 7}],
+    }
+    # Nothing to compact
+    txn = {"txn_type": "CONSENSUSSUBMITMESSAGE", "record.accountID.accountNum": "98"}
+    assert compact_txn(txn) is txn
+
+
+def test_compact_contract_logs():
+    log = {"contractID": {"contractNum": 1001}, "bloom": "00ff", "topic": ["aa", "bb"], "data": "cc"}
+    contract_result = {
+        "contractID": {"contractNum": 1001},
+        "gasUsed": 21000,
+        "createdContractIDs": [{"contractNum": 1002}, {"contractNum": 1003}],
+        "logInfo": [log, {**log, "topic": ["dd"]}, {**log, "topic": []}],
+    }
+    compact = compact_txn(parseSmartContractInfo(contract_result))
+
+    assert compact["record.contractID.contractNum"] == 1001
+    assert compact["record.gasUsed"] == 21000
+    assert compact["record.createdContractIDs"] == [{"contractNum": 1002}, {"contractNum": 1003}]
+    assert compact["record.logInfo"] == [
+        {"contractID.contractNum": 1001, "bloom": "00ff", "topic": ["aa", "bb"], "data": "cc"},
+        {"contractID.contractNum": 1001, "bloom": "00ff", "topic": ["dd"], "data": "cc"},
+        {"contractID.contractNum": 1001, "bloom": "00ff", "data": "cc"},
+    ]
+    assert not [key for key in compact if NUMBERED_KEY.search(key)]
+
+    # A single log isn't numbered in the flat schema
+    compact = compact_txn(parseSmartContractInfo({"logInfo": [log]}))
+    assert compact == {
+        "record.logInfo": [{"contractID.contractNum": 1001, "bloom": "00ff", "topic": ["aa", "bb"], "data": "cc"}]
+    }
+
+
+def parse_files(tmp_path, parser):
+    files = []
+    for rcd_file in sorted(glob.glob(RCD_FILES)):
+        files.append(str(tmp_path / rcd_file.split("/")[-1]))
+        shutil.copyfile(rcd_file, files[-1])
+    txns = []
+    RecordFilePipeline(parser, InlineParserExecutor(), txns.extend, logger).run(files, f"{tmp_path}/")
+    return txns
+
+
+@pytest.mark.parametrize("engine", ["pydantic", "fast"])
+def test_compact_output_schema(tmp_path, mocker, engine):
+    # The parser workers create their RcdParser from the settings
+    mocker.patch.object(settings, "PARSER_ENGINE", engine)
+    (tmp_path / "flat").mkdir()
+    (tmp_path / "compact").mkdir()
+    flat = parse_files(tmp_path / "flat", RcdParser())
+    mocker.patch.object(settings, "OUTPUT_SCHEMA", "compact")
+    compact = parse_files(tmp_path / "compact", RcdParser())
+
+    assert len(flat) == len(compact)
+    flat_keys = {key for txn in flat for key in txn}
+    compact_keys = {key for txn in compact for key in txn}
+    assert [key for key in flat_keys if NUMBERED_KEY.search(key)]
+    assert not [key for key in compact_keys if NUMBERED_KEY.search(key)]
+    assert len(compact_keys) < len(flat_keys)
+    assert {"record.transfers", "body.transfers", "token_transfers", "nft_transfers"} <= compact_keys
+
+    for flat_txn, compact_txn_ in zip(flat, compact):
+        assert flat_txn["record.transactionHash"] == compact_txn_["record.transactionHash"]
+        transfers = compact_txn_.get("record.transfers", [])
+        assert [transfer["accountNum"] for transfer in transfers] == [
+            flat_txn[f"record.accountNum.{i}"] for i in range(1, len(transfers) + 1)
+        ]
+        assert [transfer["amount"] for transfer in transfers] == [
+            flat_txn[f"record.amount.{i}"] for i in range(1, len(transfers) + 1)
+        ]
+        assert f"record.accountNum.{len(transfers) + 1}" not in flat_txn
+
+
+def test_unknown_output_schema():
+    with pytest.raises(ValueError):
+        RcdParser(output_schema="nested")
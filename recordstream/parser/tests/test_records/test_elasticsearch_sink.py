@@ -0,0 +1,262 @@
+import http.server
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+
+import pytest
+
+from hedera.config import settings
+from hedera.errors import ElasticsearchSinkError
+from hedera.records.elasticsearch_sink import ElasticsearchOutput, get_document_id
+from hedera.records.output import create_output
+from hedera.records.parser_pool import InlineParserExecutor
+from hedera.records.pipeline import RecordFilePipeline
+from hedera.records.record_file_parser import RcdParser
+from hedera.util import metrics
+from hedera.util.progress_index import MarkerProgress, ProgressIndex
+
+RCD_GZ_FILE = "tests/test_records/data/rcd_gz/2022-10-14T00_00_00.626345694Z.rcd.gz"
+logger = logging.getLogger(__name__)
+
+
+class BulkHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Stub of the Elasticsearch _bulk API
+    """
+
+    def do_POST(self):
+        stub = self.server
+        with stub.lock:
+            stub.active += 1
+            stub.max_active = max(stub.max_active, stub.active)
+        try:
+            body = self.rfile.read(int(self.headers["Content-Length"])).decode()
+            time.sleep(stub.delay)
+            stub.release.wait(timeout=5)
+            lines = body.splitlines()
+            actions = [json.loads(line)["index"] for line in lines[::2]]
+            documents = [json.loads(line) for line in lines[1::2]]
+            with stub.lock:
+                stub.requests.append(actions)
+                status = stub.statuses.pop(0) if stub.statuses else 200
+                if status != 200:
+                    self._respond(status, {"error": "unavailable"})
+                    return
+                items = []
+                for action, document in zip(actions, documents):
+                    _id = action["_id"]
+                    if stub.rejections.get(_id, 0) > 0:
+                        stub.rejections[_id] -= 1
+                        items.append({"index": {"_id": _id, "status": 429, "error": {"type": "es_rejected"}}})
+                    elif _id in stub.invalid:
+                        items.append({"index": {"_id": _id, "status": 400, "error": {"type": "mapper_parsing"}}})
+                    else:
+                        stub.indexed.setdefault(action["_index"], {})[_id] = document
+                        stub.writes += 1
+                        items.append({"index": {"_id": _id, "status": 201}})
+            self._respond(200, {"errors": any(item["index"]["status"] > 299 for item in items), "items": items})
+        finally:
+            with stub.lock:
+                stub.active -= 1
+
+    def _respond(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), BulkHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.delay = 0
+    server.release = threading.Event()
+    server.release.set()
+    server.active = server.max_active = server.writes = 0
+    server.requests, server.statuses, server.rejections, server.invalid, server.indexed = [], [], {}, set(), {}
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+    yield server
+    server.release.set()
+    server.shutdown()
+    server.server_close()
+
+
+def output(stub, progress, **kwargs):
+    return ElasticsearchOutput(stub.url, "recordstreams", progress, retry_backoff=0, logger=logger, **kwargs)
+
+
+def test_get_document_id(make_txns):
+    txn = make_txns(1)[0]
+    assert get_document_id(txn) == "1665705600.000000005-0000"
+    assert get_document_id({"consensusTimestamp": "2022-10-14T00:00:00.626Z", "record.transactionHash": "ab"}) == (
+        "2022-10-14T00:00:00.626Z-ab"
+    )
+    # Without a hash, the same transaction gets the same id
+    projected = {"consensusTimestamp": "2022-10-14T00:00:00.626Z", "txn_type": "CRYPTOTRANSFER"}
+    assert get_document_id(projected) == get_document_id({**projected, "@processed": "other run"})
+    assert get_document_id(projected) != get_document_id({**projected, "txn_type": "TOKENMINT"})
+
+
+def test_bulk_output(stub, progress, make_txns):
+    sink = output(stub, progress, bulk_docs=4)
+    sink.start("a.rcd")
+    sink.write(make_txns(6))
+    sink.finish("a.rcd", 6)
+    sink.start("b.rcd")
+    sink.write(make_txns(3, start=6))
+    sink.finish("b.rcd", 3)
+    sink.commit()
+    sink.close()
+
+    assert sorted(len(request) for request in stub.requests) == [1, 4, 4]
+    assert sorted(stub.indexed["recordstreams"]) == sorted(get_document_id(txn) for txn in make_txns(9))
+    assert progress.finished == [("a.rcd", 6), ("b.rcd", 3)]
+    assert sink.tell() == 9
+
+
+def test_bulk_bytes_limit(stub, progress, make_txns):
+    sink = output(stub, progress, bulk_docs=100, bulk_bytes=400)
+    sink.write(make_txns(10))
+    sink.commit()
+    sink.close()
+
+    assert len(stub.requests) > 1
+    assert sum(len(request) for request in stub.requests) == 10
+    assert len(stub.indexed["recordstreams"]) == 10
+
+
+def test_retry_rejected_items(stub, progress, make_txns):
+    metrics.REGISTRY.reset()
+    txns = make_txns(5)
+    # Rejected twice and once
+    stub.rejections = {get_document_id(txns[1]): 2, get_document_id(txns[3]): 1}
+    stub.statuses = [503]
+    sink = output(stub, progress, bulk_docs=5)
+    sink.write(txns)
+    sink.commit()
+    sink.close()
+
+    # The whole request again after the 503, then only the rejected items
+    assert [len(request) for request in stub.requests] == [5, 5, 2, 1]
+    assert stub.writes == 5
+    assert len(stub.indexed["recordstreams"]) == 5
+    assert metrics.DOCUMENTS_INDEXED.get() == 5
+    assert metrics.ERRORS.get(stage="index", exception="http_503") == 1
+
+
+def test_invalid_document_dead_letter(stub, progress, make_txns, tmp_path):
+    metrics.REGISTRY.reset()
+    txns = make_txns(3)
+    stub.invalid = {get_document_id(txns[0])}
+    dead_letter_path = str(tmp_path / "recordstreams.rejected.ndjson")
+    sink = output(stub, progress, dead_letter_path=dead_letter_path)
+    sink.write(txns)
+    sink.finish("a.rcd", 3)
+    sink.commit()
+    sink.close()
+
+    assert len(stub.indexed["recordstreams"]) == 2
+    assert metrics.ERRORS.get(stage="index", exception="mapper_parsing") == 1
+    assert progress.finished == [("a.rcd", 3)]
+    # The rejected document can be sent again as is
+    with open(dead_letter_path) as f:
+        lines = f.read().splitlines()
+    assert [json.loads(line) for line in lines] == [
+        {"index": {"_index": "recordstreams", "_id": get_document_id(txns[0])}},
+        json.loads(json.dumps(txns[0])),
+    ]
+
+
+def test_invalid_document_without_dead_letter(stub, progress, make_txns):
+    txns = make_txns(3)
+    stub.invalid = {get_document_id(txns[0])}
+    sink = output(stub, progress)
+    sink.write(txns)
+    sink.finish("a.rcd", 3)
+
+    with pytest.raises(ElasticsearchSinkError):
+        sink.commit()
+    sink.close()
+    # The file is parsed again by the next run
+    assert progress.finished == []
+
+
+def test_retries_exhausted(stub, progress, make_txns):
+    stub.statuses = [429] * 3
+    sink = output(stub, progress, max_retries=2)
+    sink.write(make_txns(2))
+    sink.finish("a.rcd", 2)
+
+    with pytest.raises(ElasticsearchSinkError):
+        sink.commit()
+    sink.close()
+    # The file is parsed again by the next run
+    assert progress.finished == []
+    assert len(stub.requests) == 3
+
+
+def test_requests_in_flight(stub, progress, make_txns):
+    stub.delay = 0.05
+    sink = output(stub, progress, bulk_docs=1, max_in_flight=3)
+    sink.write(make_txns(12))
+    sink.commit()
+    sink.close()
+
+    assert stub.max_active == 3
+    assert len(stub.indexed["recordstreams"]) == 12
+
+
+def test_finish_after_acknowledged(stub, progress, make_txns):
+    stub.release.clear()
+    sink = output(stub, progress, bulk_docs=2)
+    sink.write(make_txns(2))
+    sink.finish("a.rcd", 2)
+    sink.write(make_txns(1, start=2))
+    sink.finish("b.rcd", 1)
+    # Nothing acknowledged yet
+    assert progress.finished == []
+
+    stub.release.set()
+    sink.commit()
+    sink.close()
+    assert progress.finished == [("a.rcd", 2), ("b.rcd", 1)]
+
+
+def test_pipeline_to_elasticsearch(stub, tmp_path, mocker):
+    rcd_file = str(tmp_path / "2022-10-14T00_00_00.626345694Z.rcd.gz")
+    shutil.copyfile(RCD_GZ_FILE, rcd_file)
+    mocker.patch.object(settings, "ELASTICSEARCH_URL", stub.url)
+    mocker.patch.object(settings, "ELASTICSEARCH_BULK_DOCS", 5)
+    index = ProgressIndex(str(tmp_path / "progress.sqlite3"))
+    sink = create_output(str(tmp_path / "recordstreams.json"), index, logger, sink="elasticsearch")
+    assert isinstance(sink, ElasticsearchOutput)
+
+    for _ in range(2):
+        pipeline = RecordFilePipeline(RcdParser(), InlineParserExecutor(), sink.write, logger, progress=sink)
+        pipeline.run([rcd_file], f"{tmp_path}/")
+        sink.commit()
+        index.reset()
+    sink.close()
+
+    # Parsing the file again overwrites its documents
+    assert stub.writes == 24
+    documents = stub.indexed["recordstreams"]
+    assert len(documents) == 12
+    assert {document["rcd_filename"] for document in documents.values()} == {os.path.basename(rcd_file)}
+    assert not os.path.exists(tmp_path / "recordstreams.json")
+    index.close()
+
+    with pytest.raises(ValueError):
+        create_output(str(tmp_path / "recordstreams.json"), MarkerProgress(), sink="kafka")
@@ -0,0 +1,166 @@
+import glob
+import os
+import subprocess
+import sys
+
+import pytest
+from google.protobuf.message import Message
+
+from hedera.errors import ParseTxnItemError, ParseTxnRecordError
+from hedera.records.parse_tx_item import TRANSACTION_TYPE_PARSERS, register_transaction_type
+from hedera.records.record_file_parser import RcdParser
+from hedera.util.proto_pb import transaction_body_pb2, transaction_record_pb2
+from hedera.util.protobuf_to_dict import protobuf_to_dict
+
+pydantic_parser = RcdParser(engine="pydantic")
+fast_parser = RcdParser(engine="fast")
+
+# recordstream/parser, where the shipped hedera package is (the tests import tests/hedera)
+PARSER_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def parse_txn(parser, transaction_body, transaction_record, data_type=None):
+    tx_item = parser.parse_transaction_item(transaction_body, data_type)
+    tx_record = parser.parse_transaction_record(transaction_record)
+    return parser.reclassify_token_txns({**tx_record, **tx_item})
+
+
+def test_unknown_engine():
+    with pytest.raises(ValueError):
+        RcdParser(engine="unknown")
+
+
+def test_fast_engine_v6_file():
+    rcd_file = "tests/test_records/data/rcd_v6/2022-10-14T00_00_00.626345694Z.rcd"
+    pydantic_txns, _ = pydantic_parser.iter_v6_file(rcd_file, "2022-10-14T00_00_00.626345694Z.rcd")
+    fast_txns, _ = fast_parser.iter_v6_file(rcd_file, "2022-10-14T00_00_00.626345694Z.rcd")
+    pydantic_txns, fast_txns = list(pydantic_txns), list(fast_txns)
+    os.remove(f"{rcd_file}_processed")
+
+    assert len(pydantic_txns) == len(fast_txns) == 12
+    for pydantic_txn, fast_txn in zip(pydantic_txns, fast_txns):
+        assert isinstance(fast_txn["transaction_body"], Message)
+        assert fast_txn["txn_sign_keys"] == pydantic_txn["txn_sign_keys"]
+
+        expected = parse_txn(
+            pydantic_parser,
+            pydantic_txn["transaction_body"],
+            pydantic_txn["transaction_record"],
+            pydantic_txn["transaction_data_type"],
+        )
+        output = parse_txn(
+            fast_parser,
+            fast_txn["transaction_body"],
+            fast_txn["transaction_record"],
+            fast_txn["transaction_data_type"],
+        )
+        assert output == expected
+        assert list(output) == list(expected)
+
+
+@pytest.mark.parametrize("rcd_file", sorted(glob.glob("tests/test_records/data/scan_path/*.rcd")))
+def test_fast_engine_v5_file(rcd_file):
+    txns, version = pydantic_parser.iter_txns(rcd_file, "")
+    assert version == "v5"
+
+    for txn in txns:
+        expected = parse_txn(
+            pydantic_parser,
+            pydantic_parser.create_v5_transaction_body(txn["txn_object"]),
+            pydantic_parser.create_v5_transaction_record(txn["txn_object"]),
+        )
+        output = parse_txn(
+            fast_parser,
+            fast_parser.create_v5_transaction_body(txn["txn_object"]),
+            fast_parser.create_v5_transaction_record(txn["txn_object"]),
+        )
+        assert output == expected
+        assert list(output) == list(expected)
+
+
+def make_contract_record(result_field):
+    transaction_record = transaction_record_pb2.TransactionRecord()
+    transaction_record.receipt.status = 22
+    transaction_record.transactionHash = b"\x01\x02"
+    transaction_record.consensusTimestamp.seconds = 1665705600
+    transaction_record.transactionID.transactionValidStart.seconds = 1665705590
+    transaction_record.transactionID.accountID.accountNum = 1001
+    contract_result = getattr(transaction_record, result_field)
+    contract_result.contractID.contractNum = 5005
+    contract_result.contractCallResult = b"\xab\xcd"
+    contract_result.bloom = b"\x00\x11"
+    contract_result.gasUsed = 21000
+    log = contract_result.logInfo.add()
+    log.contractID.contractNum = 5005
+    log.bloom = b"\x22"
+    log.topic.append(b"\x33")
+    log.data = b"\x44"
+    contract_result.logInfo.add().topic.append(b"\x55")
+    contract_result.createdContractIDs.add().contractNum = 5007
+    return transaction_record
+
+
+def check_contract_results():
+    for result_field, txn_type in (("contractCallResult", "CONTRACTCALL"), ("contractCreateResult", "CONTRACTCREATE")):
+        transaction_record = make_contract_record(result_field)
+        expected = pydantic_parser.parse_transaction_record(protobuf_to_dict(transaction_record), txn_type)
+        output = fast_parser.parse_transaction_record(transaction_record, txn_type)
+        assert output == expected
+        assert list(output) == list(expected)
+
+
+def test_fast_engine_contract_results():
+    check_contract_results()
+
+
+def test_shipped_fast_engine_contract_results():
+    # Same comparison, with the hedera package that ships rather than the tests' copy
+    script = (
+        "import runpy, hedera; "
+        f"assert hedera.__file__.startswith({os.path.join(PARSER_DIR, 'hedera')!r}), hedera.__file__; "
+        f"runpy.run_path({os.path.abspath(__file__)!r})['check_contract_results']()"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=PARSER_DIR,
+        env={**os.environ, "PYTHONPATH": PARSER_DIR},
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr
+
+
+def test_fast_engine_missing_field():
+    transaction_body = transaction_body_pb2.TransactionBody()
+    transaction_body.transactionID.accountID.accountNum = 2
+    transaction_body.consensusSubmitMessage.message = b"message"
+
+    with pytest.raises(ParseTxnItemError):
+        fast_parser.parse_transaction_item(transaction_body)
+
+
+@pytest.mark.parametrize("parser", [pydantic_parser, fast_parser])
+def test_missing_record_field(parser):
+    transaction_record = transaction_record_pb2.TransactionRecord()
+    transaction_record.transactionID.accountID.accountNum = 2
+
+    if parser is pydantic_parser:
+        transaction_record = protobuf_to_dict(transaction_record)
+    with pytest.raises(ParseTxnRecordError):
+        parser.parse_transaction_record(transaction_record)
+
+
+def test_fast_engine_registered_type(mocker):
+    mocker.patch.dict(TRANSACTION_TYPE_PARSERS)
+    register_transaction_type(
+        "consensusSubmitMessage",
+        lambda submit_message: {"txn_type": "SUBMITMESSAGE"},
+        fast_parser=lambda submit_message: {"txn_type": "SUBMITMESSAGE", "message_size": len(submit_message.message)},
+    )
+    transaction_body = transaction_body_pb2.TransactionBody()
+    transaction_body.transactionID.accountID.accountNum = 2
+    transaction_body.consensusSubmitMessage.message = b"message"
+
+    out = fast_parser.parse_transaction_item(transaction_body)
+    assert out["txn_type"] == "SUBMITMESSAGE"
+    assert out["message_size"] == 7
@@ -0,0 +1,136 @@
+import json
+import shutil
+
+import pytest
+
+from hedera.config import settings
+from hedera.records.orchestrator import RecordFileOrchestrator
+
+RCD_GZ_FILE = "tests/test_records/data/rcd_gz/2022-10-14T00_00_00.626345694Z.rcd.gz"
+
+
+@pytest.fixture
+def orchestrator(mocker, tmp_path):
+    mocker.patch.object(settings, "LOG_DIR", str(tmp_path))
+    mocker.patch.object(settings, "PARSED_RECORD_STREAM_FILES_PATH", f"{tmp_path}/")
+    mocker.patch.object(settings, "PROGRESS_INDEX_PATH", str(tmp_path / "progress.sqlite3"))
+    orchestrator = RecordFileOrchestrator({"log_level": "INFO", "backfill_marker": None, "executor": "inline"})
+    yield orchestrator
+    orchestrator.executor.shutdown()
+
+
+def test_parse_txns(orchestrator, tmp_path):
+    rcd_dir = tmp_path / "rcd"
+    rcd_dir.mkdir()
+    rcd_file = str(rcd_dir / "2022-10-14T00_00_00.626345694Z.rcd.gz")
+    shutil.copyfile(RCD_GZ_FILE, rcd_file)
+
+    files_to_parse = [rcd_file]
+    orchestrator.parse_txns(files_to_parse, f"{rcd_dir}/")
+    orchestrator.output.close()
+
+    assert files_to_parse == []
+    with open(tmp_path / "recordstreams.json") as f:
+        txns = [json.loads(line) for line in f]
+    assert len(txns) == 12
+    assert [txn["consensusTimestamp"] for txn in txns] == sorted(txn["consensusTimestamp"] for txn in txns)
+    assert {txn["rcd_filename"] for txn in txns} == {"2022-10-14T00_00_00.626345694Z.rcd.gz"}
+
+
+class StopOrchestrator(Exception):
+    pass
+
+
+def test_run_watch(orchestrator, mocker, tmp_path):
+    rcd_path = tmp_path / "rcd"
+    day_dir = rcd_path / "2022" / "10" / "14"
+    day_dir.mkdir(parents=True)
+    shutil.copyfile(RCD_GZ_FILE, day_dir / "2022-10-14T00_00_00.626345694Z.rcd.gz")
+    mocker.patch.object(settings, "PARSED_RECORD_STREAM_FILES_PATH", f"{rcd_path}/")
+    mocker.patch.object(settings, "ORCHESTRATOR_LOOP_SLEEP", 0.01)
+    orchestrator.options.update({"backfill_marker": "2022-10-14", "watch": True})
+
+    parsed = []
+    parse_txns = orchestrator.parse_txns
+
+    def parse_and_download(files_to_parse, rcd_dir):
+        parsed.append([f.split("/")[-1] for f in files_to_parse])
+        parse_txns(files_to_parse, rcd_dir)
+        if len(parsed) == 1:
+            # Downloaded once the reconciliation scan's files are parsed
+            shutil.copyfile(RCD_GZ_FILE, tmp_path / "tmpdld")
+            (tmp_path / "tmpdld").rename(day_dir / "2022-10-14T00_00_02.626345694Z.rcd.gz")
+        else:
+            raise StopOrchestrator()
+
+    orchestrator.parse_txns = parse_and_download
+    orchestrator.run()
+
+    assert parsed == [["2022-10-14T00_00_00.626345694Z.rcd.gz"], ["2022-10-14T00_00_02.626345694Z.rcd.gz"]]
+
+
+def test_run_backfill(orchestrator, mocker, tmp_path):
+    rcd_path = tmp_path / "rcd"
+    names = [
+        "2022/10/14/2022-10-14T00_00_00.626345694Z.rcd.gz",
+        "2022/10/14/2022-10-14T00_00_02.626345694Z.rcd.gz",
+        "2022/10/14/2022-10-14T01_00_00.626345694Z.rcd.gz",
+        "2022/10/15/2022-10-15T00_00_00.626345694Z.rcd.gz",
+        # Outside of the range
+        "2022/10/15/2022-10-15T01_00_00.626345694Z.rcd.gz",
+    ]
+    for name in names:
+        (rcd_path / name).parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(RCD_GZ_FILE, rcd_path / name)
+    mocker.patch.object(settings, "PARSED_RECORD_STREAM_FILES_PATH", f"{rcd_path}/")
+    orchestrator.options.update(
+        {
+            "backfill_from": "2022-10-14T00",
+            "backfill_to": "2022-10-15T00",
+            "backfill_partition": "hour",
+            "backfill_parallelism": 4,
+        }
+    )
+
+    results = orchestrator.run_backfill()
+
+    assert len(results) == 25
+    assert [(result["partition"], result["files"], result["txns"]) for result in results if result["files"]] == [
+        ("2022-10-14T00", 2, 24),
+        ("2022-10-14T01", 1, 12),
+        ("2022-10-15T00", 1, 12),
+    ]
+    assert all(result["error"] is None for result in results)
+    with open(tmp_path / "recordstreams.json") as f:
+        txns = [(txn["rcd_filename"], txn["consensusTimestamp"]) for txn in map(json.loads, f)]
+    # The files are copies of the same file, each is written once, in order
+    timestamps = [[ts for txn_name, ts in txns if txn_name == name.split("/")[-1]] for name in names]
+    assert len(txns) == 48
+    assert timestamps[:4] == [sorted(timestamps[0])] * 4
+    assert len(timestamps[0]) == 12
+    assert timestamps[4] == []
+
+
+def test_run_backfill_segments(orchestrator, mocker, tmp_path):
+    orchestrator.output.close()
+    orchestrator = RecordFileOrchestrator(
+        {"log_level": "INFO", "backfill_marker": None, "executor": "inline", "output_sink": "segments"}
+    )
+    orchestrator.options.update({"backfill_from": "2022-10-14", "backfill_to": "2022-10-15", "backfill_parallelism": 4})
+    run_partitions = mocker.patch("hedera.records.orchestrator.run_partitions", return_value=[])
+
+    orchestrator.run_backfill()
+
+    # The segments are committed by one partition at a time
+    assert run_partitions.call_args[0][2] == 1
+
+
+def test_logs_json_lines_encoder(mocker, tmp_path, caplog):
+    mocker.patch.object(settings, "LOG_DIR", str(tmp_path))
+    mocker.patch.object(settings, "PROGRESS_INDEX_PATH", str(tmp_path / "progress.sqlite3"))
+    mocker.patch("hedera.util.json_lines.ENCODER", "orjson")
+    with caplog.at_level("INFO"):
+        orchestrator = RecordFileOrchestrator({"log_level": "INFO", "backfill_marker": None, "executor": "inline"})
+    orchestrator.close()
+
+    assert "JSON lines encoder: orjson" in caplog.text
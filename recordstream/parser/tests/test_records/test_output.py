@@ -0,0 +1,237 @@
+import json
+import logging
+import os
+import threading
+
+import pytest
+
+from hedera.records.output import CommittedOutput, LineOutput, SharedOutput, create_output
+from hedera.records.parser_pool import InlineParserExecutor
+from hedera.records.pipeline import RecordFilePipeline
+from hedera.records.record_file_parser import RcdParser
+from hedera.util.progress_index import MarkerProgress, ProgressIndex
+
+logger = logging.getLogger(__name__)
+
+
+class FailingExecutor(InlineParserExecutor):
+    """
+    Inline executor failing on the fail_on-th chunk
+    """
+
+    def __init__(self, fail_on: int = None):
+        super().__init__()
+        self.fail_on = fail_on
+        self.submitted = 0
+
+    def submit(self, version, chunk, timestamp):
+        self.submitted += 1
+        if self.submitted == self.fail_on:
+            raise RuntimeError("worker died")
+        return super().submit(version, chunk, timestamp)
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = ProgressIndex(str(tmp_path / "progress.sqlite3"))
+    yield index
+    index.close()
+
+
+def parse(files_to_parse, output, executor=None):
+    pipeline = RecordFilePipeline(
+        RcdParser(), executor or InlineParserExecutor(), output.write, logger, chunk_size=5, progress=output
+    )
+    pipeline.run(list(files_to_parse), f"{os.path.dirname(files_to_parse[0])}/")
+    output.commit()
+
+
+def output_txns(path):
+    with open(path) as f:
+        return [(txn["rcd_filename"], txn["consensusTimestamp"]) for txn in map(json.loads, f)]
+
+
+def expected_txns(rcd_files, tmp_path, index):
+    path = str(tmp_path / "expected.json")
+    output = LineOutput(path, index)
+    parse(rcd_files, output)
+    output.close()
+    index.reset()
+    return output_txns(path)
+
+
+def test_committed_output(rcd_files, index, tmp_path):
+    expected = expected_txns(rcd_files, tmp_path, index)
+    path = str(tmp_path / "recordstreams.json")
+    # Commit after every chunk
+    output = CommittedOutput(path, index, commit_bytes=1)
+    parse(rcd_files, output)
+    output.close()
+
+    assert output_txns(path) == expected
+    assert index.output_offsets(os.path.abspath(path))[1] == os.path.getsize(path)
+    rows = index.files()
+    assert [(row["status"], row["txn_count"]) for row in rows] == [("processed", 12)] * 3
+    assert rows[-1]["output_offset"] == os.path.getsize(path)
+    assert os.path.getsize(f"{path}.staging") == 0
+
+
+def test_committed_output_batches(rcd_files, index, tmp_path, mocker):
+    path = str(tmp_path / "recordstreams.json")
+    output = CommittedOutput(path, index)
+    commit_batch = mocker.spy(index, "commit_batch")
+    parse(rcd_files, output)
+    output.close()
+
+    # One commit (and fsync) for the whole batch instead of a flush per transaction
+    assert commit_batch.call_count == 1
+    assert len(output_txns(path)) == 36
+
+
+@pytest.mark.parametrize("fail_on", [2, 4, 6])
+def test_resume_after_crash(rcd_files, index, tmp_path, fail_on):
+    expected = expected_txns(rcd_files, tmp_path, index)
+    path = str(tmp_path / "recordstreams.json")
+    output = CommittedOutput(path, index, commit_bytes=1)
+    with pytest.raises(RuntimeError):
+        parse(rcd_files, output, FailingExecutor(fail_on))
+    output.close()
+    committed = output_txns(path)
+    # Only complete chunks are committed, a file can be committed in part
+    assert 0 < len(committed) == (fail_on - 1) * 5 < len(expected)
+
+    output = CommittedOutput(path, index, commit_bytes=1)
+    files_to_parse = index.scan(os.path.dirname(rcd_files[0]), "rcd")
+    # Files whose transactions were all committed are skipped, or resumed after their last transaction
+    assert files_to_parse == rcd_files[len(rcd_files) - len(files_to_parse) :]
+    parse(files_to_parse, output)
+    output.close()
+
+    # Each transaction written exactly once
+    assert output_txns(path) == expected
+
+
+def test_uncommitted_batch_dropped(rcd_files, index, tmp_path):
+    path = str(tmp_path / "recordstreams.json")
+    output = CommittedOutput(path, index)
+    pipeline = RecordFilePipeline(RcdParser(), InlineParserExecutor(), output.write, logger, progress=output)
+    pipeline.run(list(rcd_files), f"{os.path.dirname(rcd_files[0])}/")
+    # Stopped before the batch was committed
+    output.close()
+    assert os.path.getsize(path) == 0
+
+    output = CommittedOutput(path, index)
+    assert os.path.getsize(f"{path}.staging") == 0
+    assert index.scan(os.path.dirname(rcd_files[0]), "rcd") == rcd_files
+    output.close()
+
+
+def test_recover_committed_batch(rcd_files, index, tmp_path, mocker):
+    path = str(tmp_path / "recordstreams.json")
+    output = CommittedOutput(path, index)
+    parse(rcd_files[:1], output)
+    size = os.path.getsize(path)
+
+    # Stopped while appending the committed batch to the output
+    mocker.patch.object(CommittedOutput, "_copy", side_effect=OSError("disk full"))
+    with pytest.raises(OSError):
+        parse(rcd_files[1:], output)
+    output.staging.flush()
+    mocker.stopall()
+    assert os.path.getsize(path) == size
+    assert index.scan(os.path.dirname(rcd_files[0]), "rcd") == []
+
+    output = CommittedOutput(path, index)
+    output.close()
+    assert len(output_txns(path)) == 36
+    assert index.output_offsets(os.path.abspath(path))[1] == os.path.getsize(path)
+
+
+def test_adopt_existing_output(rcd_files, index, tmp_path):
+    path = tmp_path / "recordstreams.json"
+    path.write_text('{"written": "before"}\n')
+    output = CommittedOutput(str(path), index)
+    parse(rcd_files[:1], output)
+    output.close()
+
+    lines = path.read_text().splitlines()
+    assert lines[0] == '{"written": "before"}'
+    assert len(lines) == 13
+
+
+def test_create_output(tmp_path, index):
+    output = create_output(str(tmp_path / "a.json"), index)
+    assert isinstance(output, CommittedOutput)
+    output.close()
+    output = create_output(str(tmp_path / "b.json"), MarkerProgress())
+    assert isinstance(output, LineOutput)
+    output.close()
+
+
+def test_shared_output(rcd_files, index, tmp_path):
+    expected = expected_txns(rcd_files, tmp_path, index)
+    path = str(tmp_path / "recordstreams.json")
+    # Commit after every chunk, the pipelines commit each other's chunks
+    output = CommittedOutput(path, index, commit_bytes=1)
+    lock = threading.Lock()
+    handles = [SharedOutput(output, lock) for _ in rcd_files]
+    threads = [
+        threading.Thread(target=parse, args=([rcd_file], handle)) for rcd_file, handle in zip(rcd_files, handles)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    output.close()
+
+    assert [handle.txns for handle in handles] == [12] * 3
+    assert sorted(output_txns(path)) == sorted(expected)
+    # Each file's transactions stay in order
+    for rcd_file in rcd_files:
+        name = os.path.basename(rcd_file)
+        assert [txn for txn in output_txns(path) if txn[0] == name] == [txn for txn in expected if txn[0] == name]
+    assert [(row["status"], row["committed_txns"]) for row in index.files()] == [("processed", 12)] * 3
+
+
+def test_line_output_flush(rcd_files, tmp_path, progress):
+    path = str(tmp_path / "recordstreams.json")
+    output = LineOutput(path, progress, flush_bytes=1024 * 1024, flush_seconds=60)
+    pipeline = RecordFilePipeline(RcdParser(), InlineParserExecutor(), output.write, logger, progress=output)
+    pipeline.run(list(rcd_files), f"{os.path.dirname(rcd_files[0])}/")
+
+    # Buffered, the files are only marked as processed once their transactions are written
+    assert os.path.getsize(path) == 0
+    assert progress.finished == []
+    output.commit()
+    assert len(output_txns(path)) == 36
+    assert progress.finished == [(rcd_file, 12) for rcd_file in rcd_files]
+    assert progress.output_offsets == [os.path.getsize(path)] * 3
+    output.close()
+
+
+def test_line_output_flush_bytes(rcd_files, tmp_path, progress):
+    path = str(tmp_path / "recordstreams.json")
+    # Flushed after every chunk
+    output = LineOutput(path, progress, flush_bytes=1)
+    parse(rcd_files[:1], output)
+    output.close()
+
+    assert len(output_txns(path)) == 12
+    assert progress.finished == [(rcd_files[0], 12)]
+    assert progress.output_offsets == [os.path.getsize(path)]
+
+
+def test_line_output_markers(rcd_files, tmp_path):
+    path = str(tmp_path / "recordstreams.json")
+    output = LineOutput(path, MarkerProgress(), flush_bytes=1024 * 1024, flush_seconds=60)
+    pipeline = RecordFilePipeline(RcdParser(), InlineParserExecutor(), output.write, logger, progress=output)
+    pipeline.run(list(rcd_files), f"{os.path.dirname(rcd_files[0])}/")
+
+    # Nothing is marked before the transactions are written
+    assert os.path.getsize(path) == 0
+    assert not any(os.path.exists(f"{rcd_file}_processed") for rcd_file in rcd_files)
+    # Closing flushes the buffered transactions
+    output.close()
+    assert len(output_txns(path)) == 36
+    assert all(os.path.exists(f"{rcd_file}_processed") for rcd_file in rcd_files)
+    assert MarkerProgress().scan(os.path.dirname(rcd_files[0]), "rcd") == []
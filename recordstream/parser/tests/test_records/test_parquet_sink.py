@@ -0,0 +1,307 @@
+import json
+import logging
+import os
+import shutil
+import sys
+
+import pytest
+
+from hedera.errors import ParquetOutputError
+from hedera.records.output import create_output
+from hedera.records.parquet_sink import (
+    EXTRA_COLUMN,
+    ColumnBuffer,
+    ParquetOutput,
+    flatten_txn,
+    infer_schema,
+    txn_family,
+    txn_partition,
+)
+
+RCD_GZ_FILE = "tests/test_records/data/rcd_gz/2022-10-14T00_00_00.626345694Z.rcd.gz"
+logger = logging.getLogger(__name__)
+
+
+def make_txn(i, txn_type="CRYPTOTRANSFER", **fields):
+    return {
+        "record.transactionHash": f"{i:04x}",
+        "record.consensusTimestamp.seconds": 1665705600 + i * 1800,
+        "record.consensusTimestamp.nanos": 5,
+        "record.accountNum.1": 98,
+        "record.accountNum.2": 1000 + i,
+        "record.amount.1": 10,
+        "record.amount.2": -10,
+        "txn_type": txn_type,
+        "scheduled": False,
+        "txn_sign_keys": ["ed25519"],
+        "txn_sign_key_counts": {"ed25519": 1},
+        **fields,
+    }
+
+
+def write_rcd(output, path, txns, finish=True):
+    output.start(path)
+    output.write(txns)
+    output.written([[path, len(txns)]])
+    if finish:
+        output.finish(path, len(txns))
+
+
+def read_hashes(pq, directory):
+    hashes = []
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if name.endswith(".parquet"):
+                hashes += pq.read_table(os.path.join(root, name)).column("record.transactionHash").to_pylist()
+    return sorted(hashes)
+
+
+def test_txn_family():
+    assert txn_family("CRYPTOTRANSFER") == "crypto"
+    assert txn_family("NFTMINT") == "token"
+    assert txn_family("TOKENMINT") == "token"
+    assert txn_family("ETHEREUMTRANSACTION") == "contract"
+    assert txn_family("NODESTAKEUPDATE") == "other"
+    assert txn_family(None) == "other"
+
+
+def test_txn_partition():
+    assert txn_partition(make_txn(0)) == ("crypto", "2022-10-14", "00")
+    assert txn_partition(make_txn(3)) == ("crypto", "2022-10-14", "01")
+    assert txn_partition({"consensusTimestamp": "2022-10-14T23:59:59.626Z", "txn_type": "TOKENMINT"}) == (
+        "token",
+        "2022-10-14",
+        "23",
+    )
+    assert txn_partition({"txn_type": "OTHER"}) == ("other", "unknown", "unknown")
+
+
+def test_flatten_txn():
+    row = flatten_txn(make_txn(1, **{"record.accountNum.10": 7}))
+
+    assert row["record.accountNum"] == [98, 1001, 7]
+    assert row["record.amount"] == [10, -10]
+    assert "record.accountNum.1" not in row
+    # Not a numbered key
+    assert row["record.consensusTimestamp.seconds"] == 1665707400
+
+
+def test_infer_schema():
+    rows = [
+        flatten_txn(make_txn(0, memo="a", txn_sign_keys=[])),
+        flatten_txn(make_txn(1, memo="b", fee=1)),
+        flatten_txn(make_txn(2, fee=1.5)),
+    ]
+    schema = dict(infer_schema(rows))
+
+    assert schema["record.accountNum"] == "list<int64>"
+    assert schema["record.consensusTimestamp.seconds"] == "int64"
+    assert schema["scheduled"] == "bool"
+    assert schema["memo"] == "string"
+    assert schema["fee"] == "float64"
+    assert schema["txn_sign_keys"] == "list<string>"
+    assert schema["txn_sign_key_counts"] == "json"
+    assert infer_schema(rows)[-1] == (EXTRA_COLUMN, "json")
+
+
+def test_column_buffer():
+    buffer = ColumnBuffer(infer_schema([flatten_txn(make_txn(0, memo="a"))]))
+    buffer.append(flatten_txn(make_txn(0, memo="a")))
+    # memo missing, a new field and a field that doesn't have its column's type
+    txn = make_txn(1, new_field=3)
+    txn["scheduled"] = "yes"
+    buffer.append(flatten_txn(txn))
+
+    assert len(buffer) == 2
+    assert all(len(values) == 2 for values in buffer.columns.values())
+    assert buffer.columns["memo"] == ["a", None]
+    assert buffer.columns["scheduled"] == [False, None]
+    assert buffer.columns["txn_sign_key_counts"] == ['{"ed25519":1}'] * 2
+    assert buffer.columns[EXTRA_COLUMN][0] is None
+    assert json.loads(buffer.columns[EXTRA_COLUMN][1]) == {"new_field": 3, "scheduled": "yes"}
+
+    buffer.clear()
+    assert len(buffer) == 0
+
+
+def test_pyarrow_missing(mocker, tmp_path, progress):
+    mocker.patch.dict(sys.modules, {"pyarrow": None, "pyarrow.parquet": None})
+
+    with pytest.raises(ParquetOutputError):
+        ParquetOutput(str(tmp_path / "recordstreams.parquet"), progress)
+
+
+def test_parquet_output(tmp_path, progress):
+    pq = pytest.importorskip("pyarrow.parquet")
+    directory = str(tmp_path / "recordstreams.parquet")
+    # Every file is due on commit
+    output = ParquetOutput(directory, progress, row_group_size=2, max_seconds=0, logger=logger)
+    output.write([make_txn(0), make_txn(1), make_txn(2, "TOKENMINT"), make_txn(3)])
+    output.finish("a.rcd", 4)
+    output.write([make_txn(4, new_field="x")])
+    output.finish("b.rcd", 1)
+    # Nothing can be read before the commit
+    assert progress.finished == []
+
+    output.commit()
+    output.close()
+
+    assert progress.finished == [("a.rcd", 4), ("b.rcd", 1)]
+    assert output.tell() == 5
+    crypto = os.path.join(directory, "family=crypto", "date=2022-10-14")
+    assert sorted(os.listdir(crypto)) == ["hour=00", "hour=01", "hour=02"]
+    hour_0 = os.path.join(crypto, "hour=00", os.listdir(os.path.join(crypto, "hour=00"))[0])
+    assert hour_0.endswith(".parquet")
+    parquet_file = pq.ParquetFile(hour_0)
+    assert parquet_file.metadata.num_row_groups == 1
+    table = parquet_file.read()
+    assert table.column("record.accountNum").to_pylist() == [[98, 1000], [98, 1001]]
+    assert os.path.exists(os.path.join(directory, "_schemas", "crypto.json"))
+    assert os.path.exists(os.path.join(directory, "_schemas", "token.json"))
+
+    hour_2 = os.path.join(crypto, "hour=02")
+    table = pq.read_table(os.path.join(hour_2, os.listdir(hour_2)[0]))
+    assert json.loads(table.column(EXTRA_COLUMN).to_pylist()[0]) == {"new_field": "x"}
+
+
+def test_parquet_output_commits_into_open_file(tmp_path, progress):
+    pq = pytest.importorskip("pyarrow.parquet")
+    directory = str(tmp_path / "recordstreams.parquet")
+    hour_0 = os.path.join(directory, "family=crypto", "date=2022-10-14", "hour=00")
+    output = ParquetOutput(directory, progress, logger=logger)
+    for i in range(5):
+        write_rcd(output, f"{i}.rcd", [make_txn(0, **{"record.transactionHash": f"{i:04x}"})])
+        output.commit()
+
+    # The commits don't close the hour's file (its transactions are still buffered), so nothing is finished yet
+    assert not os.path.exists(hour_0)
+    assert progress.finished == []
+
+    output.close()
+    assert progress.finished == [(f"{i}.rcd", 1) for i in range(5)]
+    [name] = os.listdir(hour_0)
+    parquet_file = pq.ParquetFile(os.path.join(hour_0, name))
+    assert parquet_file.metadata.num_rows == 5
+    assert parquet_file.metadata.num_row_groups == 1
+
+
+def test_parquet_output_max_bytes(tmp_path, progress):
+    pytest.importorskip("pyarrow")
+    directory = str(tmp_path / "recordstreams.parquet")
+    hour_0 = os.path.join(directory, "family=crypto", "date=2022-10-14", "hour=00")
+    output = ParquetOutput(directory, progress, row_group_size=1, max_bytes=1, logger=logger)
+    output.start("a.rcd")
+    output.write([make_txn(0)])
+    output.written([["a.rcd", 1]])
+    output.finish("a.rcd", 1)
+    output.commit()
+    assert [name.endswith(".tmp") for name in os.listdir(hour_0)] == [False]
+    assert progress.finished == [("a.rcd", 1)]
+
+    output.start("b.rcd")
+    output.write([make_txn(0, **{"record.transactionHash": "ffff"})])
+    output.written([["b.rcd", 1]])
+    output.commit()
+    # Due, but b.rcd isn't finished
+    assert sorted(name.endswith(".tmp") for name in os.listdir(hour_0)) == [False, True]
+    assert progress.finished == [("a.rcd", 1)]
+    output.close()
+    # b.rcd was only partly written, it is parsed again
+    assert len(os.listdir(hour_0)) == 1
+    assert progress.finished == [("a.rcd", 1)]
+
+
+def test_parquet_output_crash_no_duplicates(tmp_path, progress):
+    pq = pytest.importorskip("pyarrow.parquet")
+    directory = str(tmp_path / "recordstreams.parquet")
+    a_txns = [
+        make_txn(0, **{"record.transactionHash": "a1"}),
+        make_txn(0, "TOKENMINT", **{"record.transactionHash": "a2"}),
+    ]
+    b_txns = [make_txn(0, **{"record.transactionHash": "b1"}), make_txn(3, **{"record.transactionHash": "b2"})]
+    output = ParquetOutput(directory, progress, row_group_size=1, max_bytes=1, logger=logger)
+    write_rcd(output, "a.rcd", a_txns)
+    # b.rcd shares the crypto hour 00 file with a.rcd, whose token file is due too
+    write_rcd(output, "b.rcd", b_txns[:1], finish=False)
+    output.commit()
+    # Crash - the files holding transactions of a.rcd weren't renamed, since one of them holds b.rcd's too
+    assert read_hashes(pq, directory) == []
+    assert progress.finished == []
+
+    output = ParquetOutput(directory, progress, logger=logger)
+    write_rcd(output, "a.rcd", a_txns)
+    write_rcd(output, "b.rcd", b_txns)
+    output.commit()
+    output.close()
+
+    assert progress.finished == [("a.rcd", 2), ("b.rcd", 2)]
+    assert read_hashes(pq, directory) == ["a1", "a2", "b1", "b2"]
+
+
+def test_parquet_output_crash_in_commit_step(mocker, tmp_path, progress):
+    pq = pytest.importorskip("pyarrow.parquet")
+    directory = str(tmp_path / "recordstreams.parquet")
+    output = ParquetOutput(directory, progress, max_seconds=0, logger=logger)
+    write_rcd(output, "a.rcd", [make_txn(0), make_txn(3)])
+    replace = os.replace
+    renamed = []
+
+    def crash_after_first_rename(src, dst):
+        if src.endswith(".parquet.tmp") and renamed:
+            raise OSError("crash")
+        replace(src, dst)
+        if dst.endswith(".parquet"):
+            renamed.append(dst)
+
+    mocker.patch("os.replace", side_effect=crash_after_first_rename)
+    with pytest.raises(OSError):
+        output.commit()
+    mocker.stopall()
+    assert len(renamed) == 1
+    assert progress.finished == []
+
+    # The next start completes the commit step rather than parsing a.rcd again
+    ParquetOutput(directory, progress, logger=logger)
+    assert progress.finished == [("a.rcd", 2)]
+    assert read_hashes(pq, directory) == ["0000", "0003"]
+    assert not os.path.exists(os.path.join(directory, "_commit.json"))
+
+
+def test_parquet_output_recover(tmp_path, progress):
+    pytest.importorskip("pyarrow")
+    directory = str(tmp_path / "recordstreams.parquet")
+    output = ParquetOutput(directory, progress, logger=logger)
+    output.write([make_txn(0)])
+    output._write_row_group(("crypto", "2022-10-14", "00"))
+    output.finish("a.rcd", 1)
+    # Stopped before the commit
+    hour_0 = os.path.join(directory, "family=crypto", "date=2022-10-14", "hour=00")
+    assert os.listdir(hour_0)[0].endswith(".parquet.tmp")
+
+    ParquetOutput(directory, progress, logger=logger)
+    assert os.listdir(hour_0) == []
+    assert progress.finished == []
+
+
+def test_pipeline_to_parquet(tmp_path, progress):
+    pytest.importorskip("pyarrow")
+    pd = pytest.importorskip("pandas")
+    from hedera.records.parser_pool import InlineParserExecutor
+    from hedera.records.pipeline import RecordFilePipeline
+    from hedera.records.record_file_parser import RcdParser
+
+    rcd_file = str(tmp_path / "2022-10-14T00_00_00.626345694Z.rcd.gz")
+    shutil.copyfile(RCD_GZ_FILE, rcd_file)
+    output = create_output(str(tmp_path / "recordstreams.json"), progress, logger, sink="parquet")
+    assert isinstance(output, ParquetOutput)
+
+    pipeline = RecordFilePipeline(RcdParser(), InlineParserExecutor(), output.write, logger, progress=output)
+    pipeline.run([rcd_file], f"{tmp_path}/")
+    output.commit()
+    output.close()
+
+    assert output.progress.finished == [(rcd_file, 12)]
+    df = pd.read_parquet(str(tmp_path / "recordstreams.parquet" / "family=crypto"))
+    assert len(df) == 10
+    assert set(df["txn_type"]) == {"CRYPTOTRANSFER"}
+    assert not os.path.exists(tmp_path / "recordstreams.json")
@@ -0,0 +1,57 @@
+import os
+
+import pytest
+
+from hedera.config import settings
+from hedera.records.parser_pool import ParserWorker, create_parser_executor, get_pool_size
+
+
+def test_get_pool_size(mocker):
+    assert get_pool_size(3) == 3
+
+    mocker.patch.object(settings, "PARSER_POOL_SIZE", 0)
+    assert get_pool_size() == os.cpu_count()
+    mocker.patch.object(settings, "PARSER_POOL_SIZE", "2")
+    assert get_pool_size() == 2
+
+
+def test_parser_worker(parse_v6_transaction_in, parser_v6_transaction_out):
+    worker = ParserWorker()
+    parser = worker.parser
+
+    for _ in range(2):
+        out = worker.parse_chunk("v6", parse_v6_transaction_in, "2022-10-14T00_00_00.626345694Z")
+        assert out == parser_v6_transaction_out
+    # The same parser is used for every chunk
+    assert worker.parser is parser
+
+
+@pytest.mark.parametrize("executor", ["inline", "processes"])
+def test_parser_worker_errors(executor, parse_v6_transaction_in, parser_v6_transaction_out):
+    invalid_txn = {"transaction_body": None, "transaction_record": None, "txn_sign_keys": [], "filename": "f.rcd"}
+    parser_executor = create_parser_executor(executor, 1)
+    try:
+        out = parser_executor.map("v6", [parse_v6_transaction_in + [invalid_txn]], "2022-10-14T00_00_00.626345694Z")
+    finally:
+        parser_executor.shutdown()
+
+    # The skipped transactions are counted per exception class, in the worker
+    assert out == [parser_v6_transaction_out]
+    assert out[0].errors == {"TypeError": 1}
+
+
+@pytest.mark.parametrize("executor", ["inline", "processes"])
+def test_parser_executor(executor, parse_v6_transaction_in, parser_v6_transaction_out):
+    parser_executor = create_parser_executor(executor, 2)
+    try:
+        chunks = [parse_v6_transaction_in, [], parse_v6_transaction_in]
+        out = parser_executor.map("v6", chunks, "2022-10-14T00_00_00.626345694Z")
+    finally:
+        parser_executor.shutdown()
+
+    assert out == [parser_v6_transaction_out, [], parser_v6_transaction_out]
+
+
+def test_unknown_parser_executor():
+    with pytest.raises(ValueError):
+        create_parser_executor("threads")
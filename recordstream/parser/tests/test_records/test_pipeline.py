@@ -0,0 +1,187 @@
+import concurrent.futures
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+
+import pytest
+
+from hedera.records.chunk_controller import AdaptiveChunkController
+from hedera.records.parser_pool import InlineParserExecutor
+from hedera.records.pipeline import RecordFilePipeline
+from hedera.records.record_file_parser import RcdParser
+from hedera.util import metrics
+from hedera.util.progress_index import ProgressIndex
+
+logger = logging.getLogger(__name__)
+
+
+class SlowExecutor:
+    """
+    Parses chunks on threads, the first chunks taking the longest, so results complete out of order
+    """
+
+    size = 4
+
+    def __init__(self, fail_on: int = None):
+        self.worker = InlineParserExecutor()
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=4)
+        self.submitted = 0
+        self.collected = 0
+        self.max_in_flight = 0
+        self.fail_on = fail_on
+        self.lock = threading.Lock()
+
+    def submit(self, version, chunk, timestamp):
+        n = self.submitted
+        self.submitted += 1
+        with self.lock:
+            self.max_in_flight = max(self.max_in_flight, self.submitted - self.collected)
+
+        def parse():
+            time.sleep(0.02 / (n + 1))
+            if n == self.fail_on:
+                raise ValueError("parse failed")
+            return self.worker.map(version, [chunk], timestamp)[0]
+
+        return self.pool.submit(parse)
+
+    def collect(self, txns):
+        with self.lock:
+            self.collected += 1
+
+
+def expected_txns(rcd_files):
+    parser = RcdParser()
+    worker = InlineParserExecutor()
+    txns = []
+    for f in rcd_files:
+        loaded, version = parser.load_txns(f, "")
+        txns.extend(worker.map(version, [loaded], "")[0])
+    return without_processed(txns)
+
+
+def without_processed(txns):
+    return [{k: v for k, v in txn.items() if k != "@processed"} for txn in txns]
+
+
+def test_pipeline(rcd_files):
+    written = []
+    files_to_parse = list(rcd_files)
+    pipeline = RecordFilePipeline(RcdParser(), InlineParserExecutor(), written.append, logger, chunk_size=5)
+    pipeline.run(files_to_parse, f"{os.path.dirname(rcd_files[0])}/")
+
+    assert files_to_parse == []
+    # Chunks group the transactions across files
+    assert [len(chunk) for chunk in written] == [5] * 7 + [1]
+    assert without_processed([txn for chunk in written for txn in chunk]) == expected_txns(rcd_files)
+
+
+def test_pipeline_keeps_order(rcd_files):
+    executor = SlowExecutor()
+    written = []
+
+    def write(txns):
+        executor.collect(txns)
+        time.sleep(0.01)
+        written.extend(txns)
+
+    pipeline = RecordFilePipeline(RcdParser(), executor, write, logger, chunk_size=2, queue_size=2)
+    pipeline.run(list(rcd_files), f"{os.path.dirname(rcd_files[0])}/")
+
+    assert without_processed(written) == expected_txns(rcd_files)
+    # Backpressure - chunks queued for the writer, the one being written and the one waiting to be queued
+    assert executor.max_in_flight <= 2 + 2
+
+
+def test_pipeline_error(rcd_files):
+    files_to_parse = list(rcd_files)
+    pipeline = RecordFilePipeline(RcdParser(), SlowExecutor(fail_on=3), lambda txns: None, logger, chunk_size=2)
+
+    with pytest.raises(ValueError):
+        pipeline.run(files_to_parse, f"{os.path.dirname(rcd_files[0])}/")
+    # Files are only removed once all their transactions have been written
+    assert files_to_parse == rcd_files
+
+
+def test_pipeline_adaptive_controller(rcd_files):
+    executor = SlowExecutor()
+    controller = AdaptiveChunkController(executor.size, target_latency=0.001, chunk_size=8, min_chunk_size=2, window=2)
+    written = []
+    pipeline = RecordFilePipeline(RcdParser(), executor, written.append, logger, controller=controller)
+    pipeline.run(list(rcd_files), f"{os.path.dirname(rcd_files[0])}/")
+
+    assert without_processed([txn for chunk in written for txn in chunk]) == expected_txns(rcd_files)
+    assert len(written[0]) == 8
+    # Every parsed chunk is reported, chunks slower than the target latency shrink
+    assert len(controller.history) == len(written) // 2
+    assert controller.chunk_size < 8
+
+
+def test_pipeline_progress_index(rcd_files, tmp_path):
+    index = ProgressIndex(str(tmp_path / "progress.sqlite3"))
+    written = []
+    pipeline = RecordFilePipeline(
+        RcdParser(),
+        InlineParserExecutor(),
+        written.extend,
+        logger,
+        chunk_size=5,
+        progress=index,
+        output_offset=lambda: len(written),
+    )
+    pipeline.run(list(rcd_files), f"{os.path.dirname(rcd_files[0])}/")
+
+    rows = index.files()
+    assert [row["path"] for row in rows] == rcd_files
+    assert [(row["status"], row["txn_count"], row["output_offset"]) for row in rows] == [
+        ("processed", 12, 15),
+        ("processed", 12, 25),
+        ("processed", 12, 36),
+    ]
+    # No marker files
+    assert not any(name.endswith("_processed") for name in os.listdir(os.path.dirname(rcd_files[0])))
+    index.close()
+
+
+def test_pipeline_metrics(rcd_files):
+    metrics.REGISTRY.reset()
+    written = []
+    pipeline = RecordFilePipeline(RcdParser(), InlineParserExecutor(), written.extend, logger, chunk_size=5)
+    pipeline.run(list(rcd_files), f"{os.path.dirname(rcd_files[0])}/")
+
+    assert metrics.BYTES_READ.get() == 3 * os.path.getsize(rcd_files[0])
+    assert metrics.TXNS_DECODED.get(version="v6") == 36
+    parsed = metrics.TXNS_PARSED.samples()
+    assert sum(value for _, _, value in parsed) == 36
+    assert {labels for _, labels, _ in parsed} == {(("txn_type", txn["txn_type"]),) for txn in written}
+    assert metrics.STAGE_LATENCY.get(stage="file")[1] == 3
+    assert metrics.STAGE_LATENCY.get(stage="parse")[1] == metrics.STAGE_LATENCY.get(stage="write")[1] == 8
+    assert metrics.QUEUE_DEPTH.get(queue="in_flight") is not None
+    # Files of 2022, far behind the wall clock
+    assert metrics.CONSENSUS_LAG.get(stage="parse") > 0
+    assert 'hedera_transactions_decoded_total{version="v6"} 36' in metrics.REGISTRY.render().splitlines()
+
+
+@pytest.mark.parametrize("decode_in_workers", [False, True])
+def test_pipeline_signature_stats(rcd_files, caplog, decode_in_workers):
+    metrics.SIGNATURES.reset()
+    pipeline = RecordFilePipeline(
+        RcdParser(decode_in_workers=decode_in_workers), InlineParserExecutor(), lambda txns: None, logger, chunk_size=5
+    )
+    with caplog.at_level(logging.DEBUG, logger=__name__):
+        pipeline.run(list(rcd_files), f"{os.path.dirname(rcd_files[0])}/")
+
+    # Each file gets the stats of its own transactions, across the chunks holding them
+    stats_lines = [r.getMessage() for r in caplog.records if r.getMessage().startswith("Signature stats")]
+    assert [line.split(": ")[0] for line in stats_lines] == [f"Signature stats for {f}" for f in rcd_files]
+    assert all('"txn_count": 12,' in line for line in stats_lines)
+    assert pipeline.signature_stats == {}
+    # And exported as a counter
+    key_type_counts = Counter()
+    for line in stats_lines:
+        key_type_counts.update(json.loads(line.split(": ", 1)[1])["key_type_counts"])
+    assert key_type_counts
+    assert {key_type: metrics.SIGNATURES.get(key_type=key_type) for key_type in key_type_counts} == key_type_counts
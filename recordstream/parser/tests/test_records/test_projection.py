@@ -0,0 +1,137 @@
+import json
+import logging
+import os
+import sys
+
+import pytest
+
+from hedera.config import settings
+from hedera.errors import ProjectionProfileError
+from hedera.records.projection import ProjectionPlan, load_projection_profile
+from hedera.records.record_file_parser import RECLASSIFIED_TXN_TYPES, RcdParser, parse_txn_chunk_v6
+
+PROFILE = {
+    "common": ["txn_type", "consensusTimestamp"],
+    "CRYPTOTRANSFER": ["body.accountNum.*", "body.amount.*"],
+    "TOKENTRANSFERS": ["token_number", "token_transfer_list"],
+    "NODESTAKEUPDATE": ["node_stake_*"],
+    "CONSENSUSSUBMITMESSAGE": ["consensus_submit_topicID"],
+}
+
+
+@pytest.fixture
+def profile_yaml(tmp_path):
+    filename = tmp_path / "profile.yaml"
+    filename.write_text(
+        "common:\n"
+        "  - txn_type\n"
+        "  - consensusTimestamp\n"
+        "CRYPTOTRANSFER:\n"
+        "  - body.accountNum.*\n"
+        "  - body.amount.*\n"
+        "TOKENTRANSFERS: [token_number, token_transfer_list]\n"
+        "NODESTAKEUPDATE: [node_stake_*]\n"
+        "CONSENSUSSUBMITMESSAGE: [consensus_submit_topicID]\n"
+    )
+    return filename
+
+
+@pytest.fixture
+def profile_json(tmp_path):
+    filename = tmp_path / "profile.json"
+    filename.write_text(json.dumps(PROFILE))
+    return filename
+
+
+def test_load_projection_profile(profile_yaml, profile_json):
+    assert load_projection_profile(profile_yaml) == PROFILE
+    assert load_projection_profile(profile_json) == PROFILE
+
+
+def test_load_projection_profile_invalid(tmp_path):
+    filename = tmp_path / "profile.json"
+    filename.write_text(json.dumps({"CRYPTOTRANSFER": "body.amount.1"}))
+
+    with pytest.raises(ProjectionProfileError):
+        load_projection_profile(filename)
+    with pytest.raises(ProjectionProfileError):
+        load_projection_profile(tmp_path / "missing.json")
+
+
+def test_load_projection_profile_yaml_missing(mocker, profile_yaml, profile_json):
+    mocker.patch.dict(sys.modules, {"yaml": None})
+
+    with pytest.raises(ProjectionProfileError, match="PyYAML"):
+        load_projection_profile(profile_yaml)
+    assert load_projection_profile(profile_json) == PROFILE
+
+
+def test_project():
+    plan = ProjectionPlan(PROFILE)
+    txn = {
+        "txn_type": "CRYPTOTRANSFER",
+        "consensusTimestamp": "2022-10-14T00:00:00.626Z",
+        "body.accountNum.1": 98,
+        "body.amount.1": -10,
+        "record.amount.1": 10,
+        "transfer_list": [],
+    }
+
+    assert plan.project(txn) == {
+        "txn_type": "CRYPTOTRANSFER",
+        "consensusTimestamp": "2022-10-14T00:00:00.626Z",
+        "body.accountNum.1": 98,
+        "body.amount.1": -10,
+    }
+    # txn_types that aren't in the profile keep all of their fields
+    assert plan.project({**txn, "txn_type": "TOKENMINT"}) == {**txn, "txn_type": "TOKENMINT"}
+
+
+def test_project_default():
+    plan = ProjectionPlan({**PROFILE, "default": ["record.transactionHash"]})
+
+    assert plan.project({"txn_type": "TOKENMINT", "record.transactionHash": "ab", "token_mint_amount": 1}) == {
+        "txn_type": "TOKENMINT",
+        "record.transactionHash": "ab",
+    }
+
+
+def test_needs_reclassified_txn_types():
+    plan = ProjectionPlan(PROFILE, RECLASSIFIED_TXN_TYPES)
+
+    # CRYPTOTRANSFER transactions can become TOKENTRANSFERS (kept in the profile) or NFTTRANSFER (all fields kept)
+    assert plan.needs("CRYPTOTRANSFER", "token_transfer_list")
+    assert not ProjectionPlan(PROFILE).needs("CRYPTOTRANSFER", "token_transfer_list")
+    assert not plan.needs("NODESTAKEUPDATE", "transfer_list")
+
+
+def test_parse_transaction_v6_projection(mocker, profile_yaml, parse_v6_transaction_in, parser_v6_transaction_out):
+    mocker.patch.object(settings, "OUTPUT_PROFILE", str(profile_yaml))
+    out = parse_txn_chunk_v6(parse_v6_transaction_in, "2022-10-14T00_00_00.626345694Z", logging.Logger)
+
+    plan = ProjectionPlan(PROFILE)
+    assert out == [plan.project(txn) for txn in parser_v6_transaction_out]
+
+
+def test_fast_engine_projection(profile_json):
+    rcd_file = "tests/test_records/data/rcd_v6/2022-10-14T00_00_00.626345694Z.rcd"
+    parser = RcdParser(engine="fast", output_profile=profile_json)
+    full_parser = RcdParser(engine="fast")
+    txns, _ = parser.iter_v6_file(rcd_file, "2022-10-14T00_00_00.626345694Z.rcd")
+    txns = list(txns)
+    os.remove(f"{rcd_file}_processed")
+
+    for txn in txns:
+        tx_item = parser.parse_transaction_item(txn["transaction_body"], txn["transaction_data_type"])
+        tx_record = parser.parse_transaction_record(txn["transaction_record"], tx_item["txn_type"])
+        full_tx_item = full_parser.parse_transaction_item(txn["transaction_body"], txn["transaction_data_type"])
+        full_tx_record = full_parser.parse_transaction_record(txn["transaction_record"], full_tx_item["txn_type"])
+
+        if tx_item["txn_type"] == "CONSENSUSSUBMITMESSAGE":
+            # Dropped by the profile, so never converted
+            assert "transfer_list" not in tx_record
+            assert "transfer_list" in full_tx_record
+
+        output = parser.project_fields(parser.reclassify_token_txns({**tx_record, **tx_item}))
+        full_output = full_parser.reclassify_token_txns({**full_tx_record, **full_tx_item})
+        assert output == parser.projection.project(full_output)
@@ -1,19 +1,28 @@
+import logging
 import os
+from collections import Counter
 
 import pytest
 from pydantic import ValidationError
 
+from hedera.config import settings
+from hedera.errors import ParseSignKeysError
+from hedera.records.parse_tx_item import TRANSACTION_TYPE_PARSERS, register_transaction_type
 from hedera.records.record_file_parser import (
     RcdParser,
+    count_signature_key_types,
+    get_signature_key_types,
+    parse_txn_chunk_v6,
 )
 from hedera.util.common.serializable import RecordStreamObject
 from hedera.util.common.stream import SerializableDataInputStream
+from hedera.util.proto_pb import basic_types_pb2, record_stream_file_pb2, transaction_contents_pb2
 
-parser = RcdParser()
+# The fixtures hold the parsed bytes fields as bytes
+parser = RcdParser(bytes_encoding="raw")
 
 
 @pytest.fixture(scope="module")
-
 def test_check_version():
     filename = "2022-03-02T00_00_00.063618034Z.rcd"
 
@@ -63,6 +72,120 @@ def test_read_v6_file():
     os.remove("tests/test_records/data/rcd_v6/2022-10-14T00_00_00.626345694Z.rcd_processed")
 
 
+def test_iter_v6_file_batches():
+    txns, version = parser.iter_v6_file(
+        "tests/test_records/data/rcd_v6/2022-10-14T00_00_00.626345694Z.rcd",
+        "2022-10-14T00_00_00.626345694Z.rcd",
+        batch_size=5,
+    )
+    batches = list(txns)
+    assert version == "v6"
+    assert [len(batch) for batch in batches] == [5, 5, 2]
+    assert set(batches[0][0]) == {
+        "filename",
+        "transaction_record",
+        "transaction_body",
+        "transaction_data_type",
+        "txn_sign_keys",
+    }
+
+    os.remove("tests/test_records/data/rcd_v6/2022-10-14T00_00_00.626345694Z.rcd_processed")
+
+
+@pytest.mark.parametrize("engine", ["pydantic", "fast"])
+def test_decode_in_workers(engine):
+    rcd_file = "tests/test_records/data/rcd_v6/2022-10-14T00_00_00.626345694Z.rcd"
+    driver_parser = RcdParser(engine=engine, decode_in_workers=True)
+    raw_txns, version = driver_parser.iter_v6_file(rcd_file, "2022-10-14T00_00_00.626345694Z.rcd")
+    raw_txns = list(raw_txns)
+    txns, _ = RcdParser(engine=engine).iter_v6_file(rcd_file, "2022-10-14T00_00_00.626345694Z.rcd")
+    txns = list(txns)
+    os.remove(f"{rcd_file}_processed")
+
+    assert version == "v6"
+    assert set(raw_txns[0]) == {"filename", "record_stream_item"}
+    assert isinstance(raw_txns[0]["record_stream_item"], bytes)
+
+    worker_parser = RcdParser(engine=engine)
+    assert [worker_parser.load_record_stream_item(t["record_stream_item"], t["filename"]) for t in raw_txns] == txns
+    assert parse_txn_chunk_v6(raw_txns, "2022-10-14T00_00_00.626345694Z", logging.Logger) == parse_txn_chunk_v6(
+        txns, "2022-10-14T00_00_00.626345694Z", logging.Logger
+    )
+
+
+def test_get_signature_key_types():
+    sig_pairs = [
+        basic_types_pb2.SignaturePair(pubKeyPrefix=b"\x01", ed25519=b"\x02"),
+        basic_types_pb2.SignaturePair(ECDSA_secp256k1=b"\x03"),
+        basic_types_pb2.SignaturePair(pubKeyPrefix=b"\x04", ed25519=b"\x05"),
+        basic_types_pb2.SignaturePair(pubKeyPrefix=b"\x06"),
+    ]
+
+    key_types = get_signature_key_types(sig_pairs)
+    assert key_types == ["ed25519", "ECDSA_secp256k1", "ed25519", "pubKeyPrefix"]
+    assert count_signature_key_types(key_types) == {
+        "txn_sign_count": 4,
+        "txn_sign_key_counts": {"ed25519": 2, "ECDSA_secp256k1": 1, "pubKeyPrefix": 1},
+    }
+    with pytest.raises(ParseSignKeysError):
+        get_signature_key_types([basic_types_pb2.SignaturePair()])
+
+
+def test_signature_stats():
+    txns, _ = RcdParser().iter_v6_file(
+        "tests/test_records/data/rcd_v6/2022-10-14T00_00_00.626345694Z.rcd",
+        "2022-10-14T00_00_00.626345694Z.rcd",
+    )
+    txns = list(txns)
+    os.remove("tests/test_records/data/rcd_v6/2022-10-14T00_00_00.626345694Z.rcd_processed")
+
+    # Stats are collected per file while the chunks are parsed, and merged across chunks
+    signature_stats = {}
+    parse_txn_chunk_v6(txns[:5], "2022-10-14T00_00_00.626345694Z", logging.Logger, signature_stats=signature_stats)
+    other_chunk_stats = {}
+    parse_txn_chunk_v6(txns[5:], "2022-10-14T00_00_00.626345694Z", logging.Logger, signature_stats=other_chunk_stats)
+    stats = signature_stats["2022-10-14T00_00_00.626345694Z.rcd"]
+    stats.update(other_chunk_stats["2022-10-14T00_00_00.626345694Z.rcd"])
+
+    assert stats.as_dict() == {
+        "txn_count": 12,
+        "sign_count": 11,
+        "max_txn_sign_count": 1,
+        "key_type_counts": {"ed25519": 11},
+        "txn_sign_count_histogram": {"0": 1, "1": 11},
+    }
+
+
+@pytest.mark.parametrize("decode_in_workers", [False, True])
+def test_bad_signature_pair_skips_transaction(decode_in_workers):
+    with open("tests/test_records/data/rcd_v6/2022-10-14T00_00_00.626345694Z.rcd", "rb") as f:
+        data = f.read()
+    record_stream_file = record_stream_file_pb2.RecordStreamFile()
+    record_stream_file.ParseFromString(data[4:])
+    # Add a pair without a signature or public key prefix to the second transaction
+    transaction = record_stream_file.record_stream_items[1].transaction
+    signed_transaction = transaction_contents_pb2.SignedTransaction()
+    signed_transaction.ParseFromString(transaction.signedTransactionBytes)
+    signed_transaction.sigMap.sigPair.add()
+    transaction.signedTransactionBytes = signed_transaction.SerializeToString()
+
+    bad_parser = RcdParser(decode_in_workers=decode_in_workers)
+    txns, _ = bad_parser.iter_v6_bytes(data[:4] + record_stream_file.SerializeToString(), "bad_signature.rcd")
+    errors = Counter()
+    out = parse_txn_chunk_v6(list(txns), "2022-10-14T00_00_00.626345694Z", logging.getLogger(__name__), errors=errors)
+
+    # Only the bad transaction is skipped, in the driver or in the worker decoding it
+    assert len(out) == 11
+    assert errors == (Counter({"ParseSignKeysError": 1}) if decode_in_workers else Counter())
+
+
+def test_iter_txns_is_lazy():
+    txns, version = parser.iter_txns("tests/test_records/data/scan_path/2022-03-02T00_00_00.063618034Z.rcd", "")
+    assert version == "v5"
+    assert isinstance(next(txns)["txn_object"], RecordStreamObject)
+    assert len(list(txns)) == 47
+
+
 def test_consensus_submit_message(tx_item_consensus_submit_message_in, tx_item_consensus_submit_message_out):
     out = parser.parse_transaction_item(tx_item_consensus_submit_message_in)
     assert out == tx_item_consensus_submit_message_out
@@ -188,6 +311,20 @@ def test_token_mint(tx_item_token_mint_in, tx_item_token_mint_out):
     assert out == tx_item_token_mint_out
 
 
+@pytest.mark.parametrize(
+    "bytes_encoding, metadata",
+    [("hex", "6d65746164617461"), ("base64", "bWV0YWRhdGE="), ("raw", b"metadata")],
+)
+def test_token_mint_bytes_encoding(tx_item_token_mint_in, bytes_encoding, metadata):
+    out = RcdParser(bytes_encoding=bytes_encoding).parse_transaction_item(tx_item_token_mint_in)
+    assert out["token_mint_metadata"] == [metadata]
+
+
+def test_unknown_bytes_encoding():
+    with pytest.raises(ValueError):
+        RcdParser(bytes_encoding="unknown")
+
+
 def test_token_wipe(tx_item_token_wipe_in, tx_item_token_wipe_out):
     out = parser.parse_transaction_item(tx_item_token_wipe_in)
     assert out == tx_item_token_wipe_out
@@ -258,6 +395,23 @@ def test_unknown_type(tx_item_unknown_in, tx_item_unknown_out):
     assert out == tx_item_unknown_out
 
 
+def test_crypto_transfer_data_type_hint(tx_item_crypto_transfer_in, tx_item_crypto_transfer_out):
+    out = parser.parse_transaction_item(tx_item_crypto_transfer_in, "cryptoTransfer")
+    assert out == tx_item_crypto_transfer_out
+
+
+def test_register_transaction_type(tx_item_common_in, tx_item_common_out, mocker):
+    mocker.patch.dict(TRANSACTION_TYPE_PARSERS)
+    register_transaction_type(
+        "util_prng",
+        lambda util_prng: {"prng_range": util_prng["range"]},
+        lambda parsed: {**parsed, "txn_type": "UTILPRNG"},
+    )
+
+    out = parser.parse_transaction_item({**tx_item_common_in, "util_prng": {"range": 10}}, "util_prng")
+    assert out == {**tx_item_common_out, "prng_range": 10, "txn_type": "UTILPRNG"}
+
+
 def test_tx_item_validation_error(tx_item_validation_error_in):
     with pytest.raises(ValidationError):
         parser.parse_transaction_item(tx_item_validation_error_in)
@@ -339,7 +493,8 @@ def test_add_txn_metadata(add_txn_metadata_in, add_txn_metadata_out):
     assert out == add_txn_metadata_out
 
 
-def test_load_txns():
+def test_load_txns(mocker):
+    mocker.patch.object(settings, "RCD_GZ_IN_MEMORY", False)
     out = parser.load_txns(
         "tests/test_records/data/rcd_gz/2022-10-14T00_00_00.626345694Z.rcd.gz",
         "tests/test_records/data/rcd_gz/",
@@ -351,3 +506,23 @@ def test_load_txns():
 
     os.remove("tests/test_records/data/rcd_gz/2022-10-14T00_00_00.626345694Z.rcd_processed")
     os.remove("tests/test_records/data/rcd_gz/2022-10-14T00_00_00.626345694Z.rcd")
+
+
+def test_load_txns_gz_in_memory(mocker):
+    mocker.patch.object(settings, "RCD_GZ_IN_MEMORY", True)
+    out = parser.load_txns(
+        "tests/test_records/data/rcd_gz/2022-10-14T00_00_00.626345694Z.rcd.gz",
+        "tests/test_records/data/rcd_gz/",
+    )
+    assert out[1] == "v6"
+    assert len(out[0]) == 12
+    assert (
+        out[0]
+        == parser.read_v6_file(
+            "tests/test_records/data/rcd_v6/2022-10-14T00_00_00.626345694Z.rcd",
+            "tests/test_records/data/rcd_gz/2022-10-14T00_00_00.626345694Z.rcd.gz",
+        )[0]
+    )
+    assert os.listdir("tests/test_records/data/rcd_gz/") == ["2022-10-14T00_00_00.626345694Z.rcd.gz"]
+
+    os.remove("tests/test_records/data/rcd_v6/2022-10-14T00_00_00.626345694Z.rcd_processed")
@@ -0,0 +1,211 @@
+import gzip
+import logging
+import os
+import shutil
+import sys
+
+import pytest
+
+from hedera.errors import SegmentOutputError
+from hedera.records.output import create_output
+from hedera.records.parser_pool import InlineParserExecutor
+from hedera.records.pipeline import RecordFilePipeline
+from hedera.records.record_file_parser import RcdParser
+from hedera.records.segment_sink import (
+    SegmentedOutput,
+    find_segments,
+    format_consensus_ns,
+    get_consensus_ns,
+    read_manifest,
+    read_segment,
+    segment_partition,
+)
+from hedera.util.progress_index import MarkerProgress
+
+RCD_GZ_FILE = "tests/test_records/data/rcd_gz/2022-10-14T00_00_00.626345694Z.rcd.gz"
+logger = logging.getLogger(__name__)
+
+
+def hashes(txns):
+    return [txn["record.transactionHash"] for txn in txns]
+
+
+def test_consensus_time(make_txns):
+    txn = make_txns(1, step=600)[0]
+    assert get_consensus_ns(txn) == 1665705600000000005
+    assert format_consensus_ns(get_consensus_ns(txn)) == "2022-10-14T00:00:00.000000005Z"
+    assert get_consensus_ns({"consensusTimestamp": "2022-10-14T00:00:00.626Z"}) == 1665705600626000000
+    assert get_consensus_ns({}) is None
+    assert segment_partition(get_consensus_ns(txn)) == "2022/10/14/00"
+    assert segment_partition(None) == "unknown"
+
+
+def test_segmented_output(tmp_path, progress, make_txns):
+    directory = str(tmp_path / "recordstreams")
+    output = SegmentedOutput(directory, progress, logger=logger)
+    # 00:00 - 01:50
+    txns = make_txns(12, step=600)
+    output.write(txns[:8])
+    output.finish("a.rcd", 8)
+    output.write(txns[8:])
+    output.finish("b.rcd", 4)
+    # Nothing committed yet
+    assert progress.finished == []
+    assert read_manifest(directory) == []
+
+    output.commit()
+    assert progress.finished == [("a.rcd", 8), ("b.rcd", 4)]
+    assert output.tell() == 12
+    entries = read_manifest(directory)
+    assert [(entry["segment"], entry["status"], entry["txns"]) for entry in entries] == [
+        ("2022/10/14/00-00001.jsonl.gz", "open", 6),
+        ("2022/10/14/01-00001.jsonl.gz", "open", 6),
+    ]
+    assert entries[0]["start"] == "2022-10-14T00:00:00.000000005Z"
+    assert entries[0]["end"] == "2022-10-14T00:50:00.000000005Z"
+    assert entries[0]["bytes"] == os.path.getsize(os.path.join(directory, entries[0]["segment"]))
+
+    # Segments are appended to with a gzip member per commit
+    output.write(make_txns(1, start=2, step=600))
+    output.commit()
+    output.close()
+    segment = os.path.join(directory, "2022/10/14/00-00001.jsonl.gz")
+    assert hashes(read_segment(segment)) == hashes(txns[:6] + make_txns(1, start=2, step=600))
+    with gzip.open(segment) as f:
+        assert len(f.read().splitlines()) == 7
+    assert [entry["status"] for entry in read_manifest(directory)] == ["closed", "closed"]
+    assert read_manifest(directory)[0]["txns"] == 7
+
+
+def test_segment_rotation(tmp_path, mocker, progress, make_txns):
+    directory = str(tmp_path / "recordstreams")
+    # Rotated by size
+    output = SegmentedOutput(directory, progress, max_bytes=1, logger=logger)
+    for i in range(3):
+        output.write(make_txns(1, start=i, step=1))
+    output.commit()
+    output.close()
+    assert [entry["segment"] for entry in read_manifest(directory)] == [
+        f"2022/10/14/00-0000{i}.jsonl.gz" for i in (1, 2, 3)
+    ]
+
+    # Rotated by age, also when the segment isn't written to anymore
+    now = mocker.patch("hedera.records.segment_sink.time.monotonic", return_value=100.0)
+    output = SegmentedOutput(directory, progress, max_seconds=60, logger=logger)
+    output.write(make_txns(2, step=1))
+    output.commit()
+    now.return_value = 200.0
+    output.commit()
+    entries = read_manifest(directory)
+    assert [(entry["segment"], entry["status"], entry["txns"]) for entry in entries[3:]] == [
+        ("2022/10/14/00-00004.jsonl.gz", "closed", 2)
+    ]
+    output.write(make_txns(1, step=1))
+    output.commit()
+    output.close()
+    assert read_manifest(directory)[-1]["segment"] == "2022/10/14/00-00005.jsonl.gz"
+
+
+def test_segment_recover(tmp_path, progress, make_txns):
+    directory = str(tmp_path / "recordstreams")
+    output = SegmentedOutput(directory, progress, logger=logger)
+    output.write(make_txns(3, step=600))
+    output.finish("a.rcd", 3)
+    output.commit()
+    # Stopped before the commit, with a segment that was never committed
+    output.write(make_txns(2, start=3, step=600))
+    output.write(make_txns(1, start=10, step=600))
+    output.finish("b.rcd", 3)
+    for segment in output.segments.values():
+        segment.stream.flush()
+    output.close()
+    assert os.path.exists(os.path.join(directory, "2022/10/14/01-00001.jsonl.gz"))
+
+    output = SegmentedOutput(directory, progress, logger=logger)
+    output.close()
+    assert progress.finished == [("a.rcd", 3)]
+    assert not os.path.exists(os.path.join(directory, "2022/10/14/01-00001.jsonl.gz"))
+    entries = read_manifest(directory)
+    assert [(entry["segment"], entry["status"], entry["txns"]) for entry in entries] == [
+        ("2022/10/14/00-00001.jsonl.gz", "closed", 3)
+    ]
+    assert hashes(read_segment(os.path.join(directory, entries[0]["segment"]))) == hashes(make_txns(3, step=600))
+
+    # The next segment of the hour is a new one
+    output = SegmentedOutput(directory, progress, logger=logger)
+    output.write(make_txns(1, start=3, step=600))
+    output.commit()
+    output.close()
+    assert read_manifest(directory)[-1]["segment"] == "2022/10/14/00-00002.jsonl.gz"
+
+
+def test_find_segments(tmp_path, progress, make_txns):
+    directory = str(tmp_path / "recordstreams")
+    output = SegmentedOutput(directory, progress, logger=logger)
+    # 00:00 - 03:50
+    output.write(make_txns(24, step=600))
+    output.commit()
+    # Read while the segments are still open
+    segments = find_segments(directory, "2022-10-14T01:30:00Z", "2022-10-14T02:10:00Z")
+    assert [segment["segment"] for segment in segments] == [
+        "2022/10/14/01-00001.jsonl.gz",
+        "2022/10/14/02-00001.jsonl.gz",
+    ]
+    txns = [txn for segment in segments for txn in read_segment(segment["path"], segment["bytes"])]
+    assert hashes(txns) == hashes(make_txns(12, start=6, step=600))
+    output.write(make_txns(1, start=12, step=600))
+    output.close()
+
+    assert len(find_segments(directory)) == 4
+    assert len(find_segments(directory, "2022-10-14T03:00:00Z")) == 1
+    assert find_segments(directory, "2022-10-15") == []
+    assert len(find_segments(directory, end="2022-10-14T00:30:00Z")) == 1
+    # Removed segments are skipped
+    os.remove(os.path.join(directory, "2022/10/14/00-00001.jsonl.gz"))
+    assert find_segments(directory, end="2022-10-14T00:30:00Z") == []
+
+
+def test_zstd_missing(tmp_path, mocker, progress):
+    mocker.patch.dict(sys.modules, {"zstandard": None})
+
+    with pytest.raises(SegmentOutputError):
+        SegmentedOutput(str(tmp_path / "recordstreams"), progress, compression="zstd")
+    with pytest.raises(ValueError):
+        SegmentedOutput(str(tmp_path / "recordstreams"), progress, compression="lz4")
+
+
+def test_zstd_segments(tmp_path, progress, make_txns):
+    pytest.importorskip("zstandard")
+    directory = str(tmp_path / "recordstreams")
+    output = SegmentedOutput(directory, progress, compression="zstd", logger=logger)
+    output.write(make_txns(3, step=1))
+    output.commit()
+    output.write(make_txns(2, start=3, step=1))
+    output.commit()
+    output.close()
+
+    segments = find_segments(directory)
+    assert [segment["segment"] for segment in segments] == ["2022/10/14/00-00001.jsonl.zst"]
+    assert hashes(read_segment(segments[0]["path"])) == hashes(make_txns(5, step=1))
+
+
+def test_pipeline_to_segments(tmp_path):
+    rcd_file = str(tmp_path / "2022-10-14T00_00_00.626345694Z.rcd.gz")
+    shutil.copyfile(RCD_GZ_FILE, rcd_file)
+    output = create_output(str(tmp_path / "recordstreams.json"), MarkerProgress(), logger, sink="segments")
+    assert isinstance(output, SegmentedOutput)
+
+    pipeline = RecordFilePipeline(RcdParser(), InlineParserExecutor(), output.write, logger, progress=output)
+    pipeline.run([rcd_file], f"{tmp_path}/")
+    # The marker is only touched once the transactions are committed
+    assert not os.path.exists(f"{rcd_file}_processed")
+    output.commit()
+    output.close()
+
+    assert os.path.exists(f"{rcd_file}_processed")
+    segments = find_segments(str(tmp_path / "recordstreams"))
+    assert [(segment["segment"], segment["txns"]) for segment in segments] == [("2022/10/14/00-00001.jsonl.gz", 12)]
+    txns = list(read_segment(segments[0]["path"]))
+    assert {txn["rcd_filename"] for txn in txns} == {os.path.basename(rcd_file)}
+    assert txns[0]["txn_type"] == "NODESTAKEUPDATE"
+    assert not os.path.exists(tmp_path / "recordstreams.json")
@@ -0,0 +1,118 @@
+import threading
+
+import pytest
+
+from hedera.config import settings
+from hedera.errors import BackfillError
+from hedera.util.backfill import backfill_partitions, format_backfill_summary, run_partitions
+
+
+def test_backfill_partitions():
+    partitions = backfill_partitions("2022-10-30", "2022-11-02")
+    assert [partition.label for partition in partitions] == ["2022-10-30", "2022-10-31", "2022-11-01", "2022-11-02"]
+    assert partitions[2].directory("/records/") == "/records/2022/11/01/"
+
+    partitions = backfill_partitions("2022-10-14T22", "2022-10-15T01", "hour")
+    assert [partition.label for partition in partitions] == [
+        "2022-10-14T22",
+        "2022-10-14T23",
+        "2022-10-15T00",
+        "2022-10-15T01",
+    ]
+    assert partitions[2].directory("/records/") == "/records/2022/10/15/"
+    assert partitions[0].matches("/records/2022/10/14/2022-10-14T22_00_00.626345694Z.rcd.gz")
+    assert not partitions[0].matches("/records/2022/10/14/2022-10-14T23_00_00.626345694Z.rcd.gz")
+
+    # A single day, or the hours of a day
+    assert [partition.label for partition in backfill_partitions("2022-10-14")] == ["2022-10-14"]
+    assert len(backfill_partitions("2022-10-14", "2022-10-14", "hour")) == 1
+    assert len(backfill_partitions("2022-10-14", "2022-10-14T23", "hour")) == 24
+
+
+def test_backfill_partitions_invalid():
+    with pytest.raises(BackfillError):
+        backfill_partitions("2022-10-15", "2022-10-14")
+    with pytest.raises(BackfillError):
+        backfill_partitions("yesterday")
+    with pytest.raises(ValueError):
+        backfill_partitions("2022-10-14", granularity="minute")
+
+
+def test_run_partitions():
+    partitions = backfill_partitions("2022-10-14", "2022-10-17")
+    running = []
+    max_running = []
+    lock = threading.Lock()
+    all_started = threading.Barrier(2)
+
+    def process(partition):
+        with lock:
+            running.append(partition.label)
+            max_running.append(len(running))
+        if partition.label < "2022-10-16":
+            # The first two partitions only finish once both are running
+            all_started.wait(timeout=5)
+        with lock:
+            running.remove(partition.label)
+        if partition.label == "2022-10-16":
+            raise RuntimeError("bucket not found")
+        return {"files": 2, "txns": 10}
+
+    results = run_partitions(partitions, process, parallelism=2)
+
+    assert max(max_running) == 2
+    assert [(result["partition"], result["files"], result["txns"]) for result in results] == [
+        ("2022-10-14", 2, 10),
+        ("2022-10-15", 2, 10),
+        ("2022-10-16", 0, None),
+        ("2022-10-17", 2, 10),
+    ]
+    # A failed partition doesn't stop the others
+    assert [result["error"] for result in results] == [None, None, "bucket not found", None]
+
+
+def test_format_backfill_summary():
+    results = [
+        {"partition": "2022-10-14", "files": 2, "txns": 24, "seconds": 1.25, "error": None},
+        {"partition": "2022-10-15", "files": 0, "txns": None, "seconds": 0.5, "error": "bucket not found"},
+    ]
+    lines = format_backfill_summary(results).splitlines()
+
+    assert lines[0].split() == ["partition", "files", "txns", "time", "status"]
+    assert lines[1].split() == ["2022-10-14", "2", "24", "1.2s", "ok"]
+    assert lines[2].split() == ["2022-10-15", "0", "-", "0.5s", "failed:", "bucket", "not", "found"]
+    assert lines[3].split() == ["total", "2", "24", "1", "failed"]
+
+
+def test_downloader_run_backfill(mocker, tmp_path):
+    mocker.patch.object(settings, "GOOGLE_APP_CREDENTIALS", str(tmp_path / "credentials.json"))
+    mocker.patch.object(settings, "LOG_DIR", str(tmp_path))
+    mocker.patch.object(settings, "RECORDS_FILE_EXTENSION", "rcd")
+    from hedera.records.downloader import RecordFileDownloader
+
+    markers = []
+
+    def run(self, bucket_name, local_path, download_to_directory, prefix, delimiter, marker, **kwargs):
+        markers.append((marker, kwargs["follow"]))
+        return {"2022-10-14T00": 3, "2022-10-14T01": 5}.get(marker, 0)
+
+    mocker.patch("hedera.records.downloader.GoogleDownloader.run", run)
+    downloader = RecordFileDownloader(
+        {
+            "log_level": "INFO",
+            "backfill_marker": None,
+            "backfill_from": "2022-10-14T00",
+            "backfill_to": "2022-10-14T02",
+            "backfill_partition": "hour",
+            "backfill_parallelism": 3,
+        }
+    )
+    results = downloader.run_backfill()
+
+    # Each partition is scanned once, the run ends with the range
+    assert sorted(markers) == [("2022-10-14T00", False), ("2022-10-14T01", False), ("2022-10-14T02", False)]
+    assert [(result["partition"], result["files"], result["error"]) for result in results] == [
+        ("2022-10-14T00", 3, None),
+        ("2022-10-14T01", 5, None),
+        ("2022-10-14T02", 0, None),
+    ]
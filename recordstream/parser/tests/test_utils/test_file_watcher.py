@@ -0,0 +1,103 @@
+import os
+import shutil
+
+import pytest
+
+from hedera.errors import FileWatchError
+from hedera.util.file_watcher import RecordFileWatcher
+from hedera.util.utilities import is_record_file_name
+
+RCD_NAME = "2022-10-14T00_00_0{}.626345694Z.rcd.gz"
+
+
+def download(tmp_path, day_dir, second: int) -> str:
+    """
+    Write a file outside the day directory and rename it in, like the downloader
+    """
+    tmp_file = tmp_path / f"tmpdld-{second}"
+    tmp_file.write_bytes(b"rcd")
+    path = os.path.join(day_dir, RCD_NAME.format(second))
+    os.rename(tmp_file, path)
+    return path
+
+
+@pytest.fixture
+def watcher():
+    watcher = RecordFileWatcher("rcd")
+    if not watcher.event_driven:
+        pytest.skip("inotify is not available")
+    yield watcher
+    watcher.close()
+
+
+def test_is_record_file_name():
+    assert is_record_file_name("2022-10-14T00_00_00.626345694Z.rcd.gz", "rcd")
+    assert is_record_file_name("2022-10-14T00_00_00.626345694Z.rcd", "rcd")
+    assert not is_record_file_name("2022-10-14T00_00_00.626345694Z.rcd_processed", "rcd")
+    assert not is_record_file_name("2022-10-14T00_00_00.626345694Z.rcd.gz_processing", "rcd")
+    assert not is_record_file_name("2022-10-14T00_00_00.626345694Z.rcd_sig", "rcd")
+
+
+def test_watch_day_reconciliation(tmp_path, watcher):
+    day_dir = str(tmp_path / "2022/10/14")
+    os.makedirs(day_dir)
+    existing = download(tmp_path, day_dir, 0)
+    processed = download(tmp_path, day_dir, 1)
+    open(f"{processed}_processed", "w").close()
+
+    assert watcher.watch_day(day_dir) == [existing]
+    assert watcher.wait_for_files(0.01) == []
+
+
+def test_wait_for_files(tmp_path, watcher):
+    day_dir = str(tmp_path / "2022/10/14")
+    # Missing day directories are created
+    assert watcher.watch_day(day_dir) == []
+
+    files = [download(tmp_path, day_dir, second) for second in (2, 1)]
+    # Files written in place and marker files aren't notified
+    (tmp_path / "2022/10/14" / RCD_NAME.format(3)).write_bytes(b"rcd")
+    open(f"{files[0]}_processed", "w").close()
+
+    assert watcher.wait_for_files(1) == [files[1]]
+    assert watcher.wait_for_files(0.01) == []
+
+
+def test_day_rollover(tmp_path, watcher):
+    day_dir = str(tmp_path / "2022/10/14")
+    next_day_dir = str(tmp_path / "2022/10/15")
+    watcher.watch_day(day_dir)
+    late = download(tmp_path, day_dir, 5)
+    os.makedirs(next_day_dir)
+    early = download(tmp_path, next_day_dir, 0)
+
+    # The previous day is scanned one last time for late files
+    assert watcher.watch_day(next_day_dir) == [late, early]
+    download(tmp_path, day_dir, 6)
+    assert watcher.wait_for_files(0.01) == []
+    new = download(tmp_path, next_day_dir, 1)
+    assert watcher.wait_for_files(1) == [new]
+
+
+def test_day_directory_removed(tmp_path, watcher):
+    day_dir = str(tmp_path / "2022/10/14")
+    watcher.watch_day(day_dir)
+    shutil.rmtree(day_dir)
+
+    assert watcher.wait_for_files(1) == []
+    assert os.path.isdir(day_dir)
+    path = download(tmp_path, day_dir, 0)
+    assert watcher.wait_for_files(1) == [path]
+
+
+def test_polling_fallback(tmp_path):
+    day_dir = str(tmp_path / "2022/10/14")
+    os.makedirs(day_dir)
+    watcher = RecordFileWatcher("rcd", use_inotify=False)
+    assert not watcher.event_driven
+    with pytest.raises(FileWatchError):
+        watcher.wait_for_files(0)
+
+    assert watcher.watch_day(day_dir) == []
+    path = download(tmp_path, day_dir, 0)
+    assert watcher.wait_for_files(0) == [path]
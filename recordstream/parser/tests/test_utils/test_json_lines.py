@@ -0,0 +1,79 @@
+import io
+import json
+
+from hedera.util import json_lines
+from hedera.util.json_lines import BufferedLineWriter, dumps, encode_lines
+
+
+class CountingFile(io.BytesIO):
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, data):
+        self.writes += 1
+        return super().write(data)
+
+
+TXN = {
+    "record.transactionHash": "a25c36ee",
+    "record.consensusTimestamp.seconds": 1665705600,
+    "record.memo": "Café",
+    "scheduled": False,
+    "transfer_list": [{"accountID": {"accountNum": 9}, "amount": 6267}],
+    "txn_sign_key_counts": {"ed25519": 1},
+}
+
+
+def test_dumps():
+    assert json.loads(dumps(TXN)) == TXN
+    assert b" " not in dumps({"a": 1, "b": [1, 2]})
+    assert "Café".encode("utf-8") in dumps(TXN)
+    # Integers over 64 bits, keys that aren't strings
+    assert json.loads(dumps({"amount": 2**70})) == {"amount": 2**70}
+    assert json.loads(dumps({1: "a"})) == {"1": "a"}
+
+
+def test_dumps_json_module(mocker):
+    mocker.patch.object(json_lines, "orjson", None)
+
+    assert dumps({"a": 1, "memo": "Café"}) == '{"a":1,"memo":"Café"}'.encode("utf-8")
+
+
+def test_encode_lines():
+    lines = encode_lines([TXN, {"a": 1}]).decode("utf-8").splitlines()
+
+    assert [json.loads(line) for line in lines] == [TXN, {"a": 1}]
+    assert encode_lines([]) == b""
+
+
+def test_buffered_writer_bytes():
+    f = CountingFile()
+    writer = BufferedLineWriter(f, flush_bytes=1000, flush_seconds=60)
+
+    assert not writer.write_all([TXN] * 2)
+    assert f.writes == 0 and len(writer) > 0
+    assert writer.write_all([TXN] * 10)
+    # One write for the whole buffer
+    assert f.writes == 1
+    assert len(writer) == 0
+    assert writer.tell() == len(f.getvalue())
+    assert len(f.getvalue().splitlines()) == 12
+
+
+def test_buffered_writer_seconds(mocker):
+    f = CountingFile()
+    now = mocker.patch("hedera.util.json_lines.time.monotonic", return_value=100.0)
+    writer = BufferedLineWriter(f, flush_bytes=1024 * 1024, flush_seconds=1.0)
+
+    assert not writer.write_all([TXN])
+    assert not writer.due()
+    now.return_value = 101.5
+    assert writer.due()
+    assert writer.write_all([TXN])
+    assert f.writes == 1
+    assert not writer.due()
+
+    writer.write_all([TXN])
+    writer.close()
+    assert len(f.getvalue().splitlines()) == 3
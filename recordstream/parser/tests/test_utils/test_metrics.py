@@ -0,0 +1,90 @@
+import urllib.error
+import urllib.request
+
+import pendulum
+import pytest
+
+from hedera.util import metrics
+from hedera.util.metrics import MetricsRegistry, start_metrics_server, stop_metrics_server
+
+
+@pytest.fixture
+def registry():
+    return MetricsRegistry()
+
+
+def test_counter_and_gauge(registry):
+    files = registry.counter("files_total", "Files", ("source",))
+    depth = registry.gauge("queue_depth", "Queue depth", ("queue",))
+    files.inc(source="bucket")
+    files.inc(2, source="bucket")
+    files.inc(source="directory")
+    depth.set(3, queue="chunks")
+    depth.set(1, queue="chunks")
+
+    assert files.get(source="bucket") == 3
+    assert depth.get(queue="chunks") == 1
+    assert depth.get(queue="files") is None
+    assert registry.render() == (
+        "# HELP files_total Files\n"
+        "# TYPE files_total counter\n"
+        'files_total{source="bucket"} 3\n'
+        'files_total{source="directory"} 1\n'
+        "# HELP queue_depth Queue depth\n"
+        "# TYPE queue_depth gauge\n"
+        'queue_depth{queue="chunks"} 1\n'
+    )
+
+    with pytest.raises(ValueError):
+        files.inc(-1, source="bucket")
+    with pytest.raises(ValueError):
+        files.inc(stage="parse")
+    with pytest.raises(ValueError):
+        registry.counter("files_total", "Files again")
+
+
+def test_histogram(registry):
+    latency = registry.histogram("latency_seconds", "Latency", ("stage",), buckets=(0.1, 1))
+    for value in (0.05, 0.5, 0.5, 2):
+        latency.observe(value, stage="parse")
+
+    assert latency.get(stage="parse") == (3.05, 4)
+    assert registry.render().splitlines()[2:] == [
+        'latency_seconds_bucket{stage="parse",le="0.1"} 1',
+        'latency_seconds_bucket{stage="parse",le="1"} 3',
+        'latency_seconds_bucket{stage="parse",le="+Inf"} 4',
+        'latency_seconds_sum{stage="parse"} 3.05',
+        'latency_seconds_count{stage="parse"} 4',
+    ]
+
+
+def test_label_escaping(registry):
+    errors = registry.counter("errors_total", "Errors", ("exception",))
+    errors.inc(exception='Bad "value"\n')
+    assert registry.render().splitlines()[-1] == 'errors_total{exception="Bad \\"value\\"\\n"} 1'
+
+
+def test_observe_consensus_lag(mocker):
+    metrics.CONSENSUS_LAG.reset()
+    now = pendulum.datetime(2022, 10, 14, 0, 1, 0).timestamp()
+    mocker.patch("hedera.util.metrics.time.time", return_value=now)
+
+    metrics.observe_consensus_lag("/records/2022/10/14/2022-10-14T00_00_00.626345694Z.rcd.gz", "parse")
+    assert metrics.CONSENSUS_LAG.get(stage="parse") == 60
+    # Not a record file
+    metrics.observe_consensus_lag("/records/metadata.json", "download")
+    assert metrics.CONSENSUS_LAG.get(stage="download") is None
+
+
+def test_metrics_server(registry):
+    registry.counter("files_total", "Files").inc(5)
+    server = start_metrics_server(0, registry=registry)
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with urllib.request.urlopen(f"{url}/metrics", timeout=5) as response:
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            assert "files_total 5" in response.read().decode().splitlines()
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"{url}/other", timeout=5)
+    finally:
+        stop_metrics_server(server)
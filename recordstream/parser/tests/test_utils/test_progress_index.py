@@ -0,0 +1,131 @@
+import os
+
+import pytest
+
+from hedera.config import settings
+from hedera.util.progress_index import MarkerProgress, ProgressIndex, create_progress
+
+NAMES = [f"2022-10-14T0{hour}_00_00.626345694Z.rcd.gz" for hour in range(4)]
+
+
+@pytest.fixture
+def day_dir(tmp_path):
+    day_dir = tmp_path / "2022" / "10" / "14"
+    day_dir.mkdir(parents=True)
+    for name in NAMES:
+        (day_dir / name).write_bytes(b"rcd")
+    return day_dir
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = ProgressIndex(str(tmp_path / "progress.sqlite3"))
+    yield index
+    index.close()
+
+
+def test_scan(index, day_dir):
+    paths = [str(day_dir / name) for name in NAMES]
+    # Decompressed copy of a .rcd.gz file
+    (day_dir / NAMES[0][:-3]).write_bytes(b"rcd")
+    (day_dir / "2022-10-14T00_00_00.626345694Z.rcd_sig").write_bytes(b"sig")
+    assert index.scan(f"{day_dir}/", "rcd") == paths
+
+    assert index.start(paths[0]) == 0
+    index.start(paths[1])
+    index.finish(paths[1], 12, 1024)
+    # Files a run stopped in the middle of are parsed again
+    assert not index.is_done(paths[0])
+    assert index.is_done(paths[1])
+    assert not index.is_done(paths[2])
+    assert index.scan(f"{day_dir}/", "rcd") == paths[:1] + paths[2:]
+    assert index.scan(str(day_dir / "missing"), "rcd") == []
+
+
+def test_files_and_reset(index, day_dir):
+    paths = [str(day_dir / name) for name in NAMES]
+    for path in paths:
+        index.start(path)
+    for path in paths[:3]:
+        index.finish(path, 10, 100)
+
+    rows = index.files()
+    assert [row["path"] for row in rows] == paths
+    assert [row["status"] for row in rows] == ["processed"] * 3 + ["processing"]
+    assert rows[0]["txn_count"] == 10
+    assert rows[0]["output_offset"] == 100
+    assert rows[0]["finished_at"] >= rows[0]["started_at"]
+
+    assert [row["path"] for row in index.files("2022-10-14T01", "2022-10-14T03")] == paths[1:3]
+    assert [row["path"] for row in index.files(status="processing")] == paths[3:]
+    assert index.files("2022-10-15") == []
+
+    # Reprocess a time range
+    assert index.reset("2022-10-14T01:00:00", "2022-10-14T02") == 1
+    assert index.scan(str(day_dir), "rcd") == [paths[1], paths[3]]
+
+
+def test_migrate_markers(index, day_dir):
+    paths = [str(day_dir / name) for name in NAMES]
+    open(f"{paths[0]}_processed", "w").close()
+    open(f"{paths[1]}_processing", "w").close()
+    index.start(paths[2])
+    index.finish(paths[2], 12, 2048)
+    open(f"{paths[2]}_processed", "w").close()
+
+    assert not index.markers_migrated
+    assert index.migrate_markers(str(day_dir.parent.parent), remove=True) == 2
+    assert index.markers_migrated
+    assert [(row["status"], row["txn_count"]) for row in index.files()] == [
+        ("processed", None),
+        ("processed", None),
+        ("processed", 12),
+    ]
+    assert index.scan(str(day_dir), "rcd") == paths[3:]
+    assert sorted(os.listdir(day_dir)) == NAMES
+
+
+def test_create_progress(tmp_path, day_dir, mocker):
+    mocker.patch.object(settings, "PARSED_RECORD_STREAM_FILES_PATH", f"{tmp_path}/")
+    mocker.patch.object(settings, "PROGRESS_INDEX_PATH", None)
+    path = str(day_dir / NAMES[0])
+    open(f"{path}_processed", "w").close()
+
+    assert isinstance(create_progress("markers"), MarkerProgress)
+    index = create_progress("sqlite")
+    assert index.path == str(tmp_path / "progress.sqlite3")
+    assert index.is_done(path)
+    index.reset()
+    index.close()
+    # Markers are only imported once
+    index = create_progress("sqlite")
+    assert not index.is_done(path)
+    index.close()
+
+    with pytest.raises(ValueError):
+        create_progress("redis")
+
+
+def test_commit_batch(index, day_dir):
+    paths = [str(day_dir / name) for name in NAMES[:2]]
+    assert index.output_offsets("out.json") == (None, None)
+    for path in paths:
+        index.start(path)
+
+    index.commit_batch({paths[0]: (12, True), paths[1]: (3, False)}, "out.json", 0, 100)
+    assert index.output_offsets("out.json") == (0, 100)
+    assert [(row["status"], row["txn_count"], row["output_offset"]) for row in index.files()] == [
+        ("processed", 12, 100),
+        ("processing", None, None),
+    ]
+    # A restarted file resumes after its committed transactions
+    assert index.start(paths[1]) == 3
+
+
+def test_marker_progress(day_dir):
+    progress = MarkerProgress()
+    path = str(day_dir / NAMES[0])
+    progress.start(path)
+    progress.finish(path, 12)
+    assert progress.is_done(path)
+    assert progress.scan(str(day_dir), "rcd") == [str(day_dir / name) for name in NAMES[1:]]
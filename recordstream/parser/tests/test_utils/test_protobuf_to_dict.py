@@ -0,0 +1,46 @@
+from hedera.util.proto_pb import basic_types_pb2, transaction_body_pb2
+from hedera.util.protobuf_to_dict import _CONVERSION_PLANS, protobuf_to_dict
+
+
+def test_protobuf_to_dict_nested_and_repeated():
+    transaction_body = transaction_body_pb2.TransactionBody()
+    transaction_body.transactionID.transactionValidStart.seconds = 1665705589
+    transaction_body.transactionID.transactionValidStart.nanos = 242461200
+    transaction_body.transactionID.accountID.accountNum = 48524011
+    transaction_body.transactionFee = 100000000
+    account_amount = transaction_body.cryptoTransfer.transfers.accountAmounts.add()
+    account_amount.accountID.accountNum = 9
+    account_amount.amount = 15
+
+    out = protobuf_to_dict(transaction_body)
+
+    assert out == {
+        "transactionID": {
+            "transactionValidStart": {"seconds": 1665705589, "nanos": 242461200},
+            "accountID": {"accountNum": 48524011},
+        },
+        "transactionFee": 100000000,
+        "cryptoTransfer": {"transfers": {"accountAmounts": [{"accountID": {"accountNum": 9}, "amount": 15}]}},
+    }
+
+
+def test_protobuf_to_dict_reuses_conversion_plan():
+    sig_pair = basic_types_pb2.SignaturePair(pubKeyPrefix=b"prefix", ed25519=b"signature")
+
+    assert protobuf_to_dict(sig_pair) == {"pubKeyPrefix": b"prefix", "ed25519": b"signature"}
+    plans = len(_CONVERSION_PLANS)
+
+    assert protobuf_to_dict(basic_types_pb2.SignaturePair(contract=b"contract")) == {"contract": b"contract"}
+    assert len(_CONVERSION_PLANS) == plans
+
+
+def test_protobuf_to_dict_enum_labels():
+    token_creation = transaction_body_pb2.TransactionBody()
+    token_creation.tokenCreation.tokenType = basic_types_pb2.NON_FUNGIBLE_UNIQUE
+    token_creation.tokenCreation.treasury.accountNum = 5
+
+    assert protobuf_to_dict(token_creation)["tokenCreation"] == {"tokenType": 1, "treasury": {"accountNum": 5}}
+    assert protobuf_to_dict(token_creation, use_enum_labels=True)["tokenCreation"] == {
+        "tokenType": "NON_FUNGIBLE_UNIQUE",
+        "treasury": {"accountNum": 5},
+    }
@@ -1,7 +1,38 @@
-from hedera.util.utilities import scan_for_new_files
+import datetime
+
+import pytest
+
+from hedera.util.proto_pb import record_stream_file_pb2
+from hedera.util.utilities import format_epoch_seconds, iter_message_fields, scan_for_new_files
 
 
 def test_scan_for_new_files():
     files = scan_for_new_files("tests/test_utils/data/scan_path/", "rcd")
 
     assert len(files) == 13
+
+
+def test_format_epoch_seconds():
+    assert format_epoch_seconds(0) == "1970-01-01T00:00:00"
+    assert format_epoch_seconds(1665705830) == "2022-10-14T00:03:50"
+    assert format_epoch_seconds(951782400) == "2000-02-29T00:00:00"
+    assert format_epoch_seconds(-1) == "1969-12-31T23:59:59"
+
+    for seconds in range(-(10**10), 10**11, 987654321):
+        expected = datetime.datetime.fromtimestamp(seconds, datetime.timezone.utc).isoformat("T")[:19]
+        assert format_epoch_seconds(seconds) == expected
+
+
+def test_iter_message_fields():
+    record_stream_file = record_stream_file_pb2.RecordStreamFile(block_number=300)
+    record_stream_file.hapi_proto_version.minor = 30
+    for i in range(3):
+        record_stream_file.record_stream_items.add().record.memo = f"memo {i}"
+    record_stream_file.end_object_running_hash.hash = b"hash"
+    data = record_stream_file.SerializeToString()
+
+    items = list(iter_message_fields(data, 3))
+    assert items == [item.SerializeToString() for item in record_stream_file.record_stream_items]
+    assert list(iter_message_fields(data, 7)) == []
+    with pytest.raises(ValueError):
+        list(iter_message_fields(data[:-2], 3))